@@ -0,0 +1,385 @@
+"""Scalable benchmarks for the budget, file and task models.
+
+Synthetic generators build deep (chain), wide (flat) and random trees and task
+graphs of a given size; every operation is timed and its peak memory measured
+with tracemalloc, and results are stored as JSON so later runs can be compared
+against a baseline.
+
+    python Benchmark.py run --sizes 1e3,1e4,1e5 --output current.json
+    python Benchmark.py compare benchmark_baseline.json current.json --threshold 0.2
+
+benchmark_baseline.json holds a committed run at the default sizes; rerun it
+with --output benchmark_baseline.json after an intended change in performance.
+
+Operations that recurse once per level fail with RecursionError on deep
+inputs; that is recorded as the result rather than aborting the run.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+SHAPES = ("deep", "wide", "random")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+# ================= Generators =================
+# Nodes are linked directly instead of through add_category / create_folder,
+# which search the whole tree per insert and would make building O(n^2).
+
+def _parent_index(shape, i, rng):
+    """Index of the parent of node i (1..n-1) in a tree whose node 0 is the root."""
+    if shape == "deep":
+        return i - 1
+    if shape == "wide":
+        return 0
+    return rng.randrange(i)
+
+
+def build_budget_tree(size, shape, seed=0):
+    """man_system_test.BudgetTree with size categories; returns (tree, deepest/last category)."""
+    from man_system_test import BudgetNode, BudgetTree
+
+    rng = random.Random(seed)
+    tree = BudgetTree()
+    nodes = [tree.root]
+    for i in range(1, size):
+        parent = nodes[_parent_index(shape, i, rng)]
+        node = BudgetNode(f"Category {i}", limit=rng.choice((None, 100, 500, 1000)))
+        node.parent = parent
+        node.expenses = rng.randint(0, 200)
+        parent.add_child(node)
+        nodes.append(node)
+    return tree, nodes[-1].category
+
+
+def build_total_tree(size, shape, seed=0):
+    """management_system3.BudgetTree with size categories; returns (tree, root node)."""
+    from management_system3 import BudgetTree
+
+    rng = random.Random(seed)
+    tree = BudgetTree()
+    nodes = [tree.root]
+    for i in range(1, size):
+        parent = nodes[_parent_index(shape, i, rng)]
+        node = BudgetTree.Node(f"Category {i}", 1000, rng.randint(0, 200))
+        node.parent = parent
+        parent.add_child(node)
+        nodes.append(node)
+    return tree, tree.root
+
+
+def build_file_tree(size, shape, seed=0):
+    """FileSystem.FileManager with about size folders and files.
+
+    Returns (manager, name of the last file, path of the deepest folder).
+    """
+    from FileSystem import FileManager, FileNode, FolderNode
+
+    rng = random.Random(seed)
+    manager = FileManager()
+    folders = [manager.root]
+    parents = [None]
+    depths = [0]
+    last_file = None
+    folder_count = max(1, size // 2)
+    for i in range(1, folder_count):
+        parent_index = _parent_index(shape, i, rng)
+        folder = FolderNode(f"folder{i}")
+        folders[parent_index].add_folder(folder)
+        folders.append(folder)
+        parents.append(parent_index)
+        depths.append(depths[parent_index] + 1)
+    deepest = max(range(folder_count), key=depths.__getitem__)
+    for i in range(size - folder_count):
+        # Files are spread over all folders; the last one lands in the deepest folder
+        last_file = FileNode(f"file{i}.txt", size=rng.randint(0, 1 << 20))
+        folders[deepest if i == size - folder_count - 1 else rng.randrange(folder_count)].add_file(last_file)
+    names = []
+    index = deepest
+    while parents[index] is not None:
+        names.append(folders[index].name)
+        index = parents[index]
+    return manager, last_file.name if last_file else None, "/".join(reversed(names))
+
+
+def build_task_graph(size, shape, seed=0):
+    """TaskSystem.TaskDatabase: a chain, a star or a random DAG of size tasks."""
+    from TaskSystem import TaskDatabase
+
+    rng = random.Random(seed)
+    db = TaskDatabase()
+    tasks = [db.add_node(f"task {i}") for i in range(size)]
+    for i in range(1, size):
+        if shape == "random":
+            for _ in range(2):
+                tasks[i].add_connections(tasks[rng.randrange(i)])
+        else:
+            tasks[i].add_connections(tasks[_parent_index(shape, i, rng)])
+    return db
+
+
+# ================= Operations =================
+# Each entry: name -> setup(size, shape) returning a zero-argument callable.
+
+def _op_budget_build(size, shape):
+    return lambda: build_budget_tree(size, shape)
+
+
+def _op_budget_search(size, shape):
+    tree, target = build_budget_tree(size, shape)
+    return lambda: tree.search(tree.root, target)
+
+
+def _op_budget_calculate_total(size, shape):
+    tree, root = build_total_tree(size, shape)
+    return lambda: tree.calculate_total(root)
+
+
+def _op_files_build(size, shape):
+    return lambda: build_file_tree(size, shape)
+
+
+def _op_files_search(size, shape):
+    manager, filename, _path = build_file_tree(size, shape)
+    return lambda: manager.search_file(filename)
+
+
+def _op_files_navigate(size, shape):
+    manager, _filename, path = build_file_tree(size, shape)
+    return lambda: manager._navigate_to_folder(path)
+
+
+def _op_tasks_build(size, shape):
+    return lambda: build_task_graph(size, shape)
+
+
+def _op_tasks_detect_cycle(size, shape):
+    db = build_task_graph(size, shape)
+    return db.detect_cycle
+
+
+_tk_root = None  # one hidden Tk root per benchmark run, destroyed by _teardown_tk
+
+
+def _treeview():
+    global _tk_root
+    if _tk_root is None:
+        try:
+            import tkinter as tk
+            _tk_root = tk.Tk()
+        except Exception as e:  # no display or no Tk available
+            raise RuntimeError(f"Tk unavailable: {e}")
+        _tk_root.withdraw()
+    from tkinter import ttk
+    return ttk.Treeview(_tk_root)
+
+
+def _teardown_tk(final=False):
+    """Destroy the treeviews of the last measurement, and with final=True the Tk root too."""
+    global _tk_root
+    if _tk_root is None:
+        return
+    if final:
+        _tk_root.destroy()
+        _tk_root = None
+    else:
+        for widget in _tk_root.winfo_children():
+            widget.destroy()
+
+
+def _op_treeview_rebuild(size, shape, lazy=False):
+    from TreeviewBinding import TreeviewBinding
+
+    tree, _target = build_budget_tree(size, shape)
+    binding = TreeviewBinding(_treeview(), lambda node: node.children, lambda node: node.category, lazy=lazy)
+    return lambda: binding.rebuild([tree.root])
+
+
+def _op_treeview_update_path(size, shape):
+    from TreeviewBinding import TreeviewBinding
+
+    tree, target = build_budget_tree(size, shape)
+    node = tree.search(tree.root, target) if shape != "deep" else None
+    if node is None:
+        node = tree.root
+        while node.children:
+            node = node.children[-1]
+    binding = TreeviewBinding(_treeview(), lambda n: n.children, lambda n: f"{n.category}: {n.expenses}",
+                              lazy=True, parent_of=lambda n: n.parent)
+    binding.rebuild([tree.root])
+
+    def update():
+        node.expenses += 1
+        binding.update_path(node)
+    return update
+
+
+OPERATIONS = {
+    "budget.build": _op_budget_build,
+    "budget.search": _op_budget_search,
+    "budget.calculate_total": _op_budget_calculate_total,
+    "files.build": _op_files_build,
+    "files.search_file": _op_files_search,
+    "files.navigate_to_folder": _op_files_navigate,
+    "tasks.build": _op_tasks_build,
+    "tasks.detect_cycle": _op_tasks_detect_cycle,
+    "treeview.rebuild_eager": _op_treeview_rebuild,
+    "treeview.rebuild_lazy": lambda size, shape: _op_treeview_rebuild(size, shape, lazy=True),
+    "treeview.update_path": _op_treeview_update_path,
+}
+
+
+# ================= Measurement =================
+
+def measure(fn, min_time=0.2, max_repeats=50):
+    """Best wall time of fn over repeated runs, then the peak memory of one more run."""
+    best = float("inf")
+    spent = 0.0
+    repeats = 0
+    while repeats < max_repeats and (repeats == 0 or spent < min_time):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        del result
+        best = min(best, elapsed)
+        spent += elapsed
+        repeats += 1
+
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    del result
+    return best, peak, repeats
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, shapes=SHAPES, ops=None, min_time=0.2, verbose=True):
+    results = []
+    try:
+        for name in ops or OPERATIONS:
+            setup = OPERATIONS[name]
+            for shape in shapes:
+                for size in sizes:
+                    entry = {"op": name, "shape": shape, "size": size}
+                    try:
+                        fn = setup(size, shape)
+                        seconds, peak, repeats = measure(fn, min_time)
+                        entry.update(seconds=seconds, peak_bytes=peak, repeats=repeats)
+                    except RecursionError:
+                        entry["error"] = "RecursionError"
+                    except (RuntimeError, MemoryError) as e:
+                        entry["error"] = f"{type(e).__name__}: {e}"
+                    results.append(entry)
+                    if verbose:
+                        print(format_entry(entry))
+                    fn = None
+                    _teardown_tk()
+                    gc.collect()
+    finally:
+        _teardown_tk(final=True)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def format_entry(entry):
+    label = f"{entry['op']:26} {entry['shape']:7} {entry['size']:>10}"
+    if "error" in entry:
+        return f"{label}  {entry['error']}"
+    return f"{label}  {entry['seconds'] * 1000:12.3f} ms  {entry['peak_bytes'] / 1024:12.1f} KiB"
+
+
+def compare(baseline, current, threshold=0.2, memory_threshold=0.2):
+    """Return a list of regression messages between two result documents."""
+    def key(entry):
+        return entry["op"], entry["shape"], entry["size"]
+
+    base = {key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        old = base.get(key(entry))
+        if old is None:
+            continue
+        label = "/".join(str(part) for part in key(entry))
+        if "error" in entry and "error" not in old:
+            regressions.append(f"{label}: now fails with {entry['error']}")
+            continue
+        if "error" in entry or "error" in old:
+            continue
+        # Sub-100us timings jitter too much to compare by ratio alone
+        if entry["seconds"] > max(old["seconds"] * (1 + threshold), old["seconds"] + 1e-4):
+            regressions.append(f"{label}: time {old['seconds'] * 1000:.3f} ms -> {entry['seconds'] * 1000:.3f} ms")
+        # Tiny allocations are noise; only flag memory growth above 64 KiB
+        if entry["peak_bytes"] > max(old["peak_bytes"] * (1 + memory_threshold), old["peak_bytes"] + 65536):
+            regressions.append(f"{label}: peak memory {old['peak_bytes']} -> {entry['peak_bytes']} bytes")
+    return regressions
+
+
+def _parse_sizes(text):
+    return [int(float(part)) for part in text.split(",") if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the workplace models.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run benchmarks and write a JSON result file")
+    run.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                     help="comma separated, e.g. 1e3,1e4,1e5,1e6,1e7")
+    run.add_argument("--shapes", default=",".join(SHAPES))
+    run.add_argument("--ops", default="", help="comma separated operation names (default: all)")
+    run.add_argument("--min-time", type=float, default=0.2, help="seconds of repeats per measurement")
+    run.add_argument("--output", default="benchmark_results.json")
+
+    cmp = sub.add_parser("compare", help="flag regressions of a result file against a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    cmp.add_argument("--memory-threshold", type=float, default=0.2, help="allowed relative memory growth")
+
+    sub.add_parser("list", help="list operation names")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        print("\n".join(OPERATIONS))
+        return 0
+    if args.command == "run":
+        ops = [op for op in args.ops.split(",") if op] or None
+        unknown = [op for op in ops or [] if op not in OPERATIONS]
+        if unknown:
+            parser.error(f"unknown operations: {', '.join(unknown)}")
+        document = run_benchmarks(_parse_sizes(args.sizes), args.shapes.split(","), ops, args.min_time)
+        with open(args.output, "w") as out:
+            json.dump(document, out, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold, args.memory_threshold)
+    for line in regressions:
+        print("REGRESSION", line)
+    if not regressions:
+        print("No regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
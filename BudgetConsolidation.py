@@ -0,0 +1,358 @@
+"""Group consolidation of many departmental budget trees across processes.
+
+Trees are sharded into groups, and each shard is flattened into pre-order
+arrays (parent index, limit, expense, subtree total and a UTF-8 name blob)
+held in one multiprocessing.shared_memory block. Workers roll totals up
+inside the block and return only the block name and the breached categories,
+so no node objects are pickled in either direction; the parent then merges
+every block into one group-level tree.
+
+When it is safe to fork (Linux, no other threads running), workers inherit
+the trees and flatten their own shard, so flattening runs in parallel too.
+Otherwise workers are started with forkserver or spawn and the parent
+flattens each shard into its block before handing it to a worker.
+
+    result = consolidate({"Sales": sales_tree, "R&D": rnd_tree}, report_dir="reports")
+    result["group"].total, result["over_limit"]["Sales"]
+"""
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+
+from BudgetReport import ReportRow, format_text_row, own_expenses
+
+
+class ConsolidatedNode:
+    """A category of the group tree; total already includes all subcategories."""
+
+    def __init__(self, category, limit=None, expenses=0, total=0):
+        self.category = category
+        self.limit = limit
+        self.expenses = expenses
+        self.total = total
+        self.children = []
+        self.parent = None
+
+    def add_child(self, child):
+        child.parent = self
+        self.children.append(child)
+
+    def is_over_limit(self) -> bool:
+        return bool(self.limit and self.total > self.limit)
+
+    def __repr__(self):
+        return f"ConsolidatedNode({self.category}, total={self.total}, limit={self.limit})"
+
+
+class FlatTrees:
+    """Pre-order arrays for many trees; parents always precede their children."""
+
+    def __init__(self):
+        self.parents = array("q")
+        self.limits = array("d")    # NaN when a category has no limit
+        self.expenses = array("d")
+        self.name_offsets = array("q", [0])
+        self.names = bytearray()
+        self.ranges = []            # (department, first node, node count)
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_tree(self, department, root):
+        parents, limits, expenses, names = self.parents, self.limits, self.expenses, self.names
+        name_offsets = self.name_offsets
+        start = index = len(parents)
+        stack = [(root, -1)]
+        while stack:
+            node, parent_index = stack.pop()
+            parents.append(parent_index)
+            limits.append(node.limit or math.nan)
+            expenses.append(own_expenses(node))
+            names += str(node.category).encode("utf-8")
+            name_offsets.append(len(names))
+            children = node.children
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], index))
+            index += 1
+        self.ranges.append((department, start, index - start))
+
+    def to_shared(self):
+        """Copy the arrays into a new shared memory block; returns (block, offsets)."""
+        offsets, size = self.layout()
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        views = _views(shm.buf, offsets, len(self))
+        for name in ("parents", "limits", "expenses", "name_offsets"):
+            views[name][:] = getattr(self, name)
+        views["names"][:len(self.names)] = self.names
+        _release(views)
+        return shm, offsets
+
+    def layout(self):
+        """Byte offsets of the arrays inside the shared block, and its total size."""
+        n = len(self.parents)
+        offsets = {}
+        position = 0
+        for name, size in (("parents", 8 * n), ("limits", 8 * n), ("expenses", 8 * n),
+                           ("totals", 8 * n), ("name_offsets", 8 * (n + 1)), ("names", len(self.names))):
+            offsets[name] = position
+            position += size
+        return offsets, max(position, 1)
+
+
+def _views(buf, offsets, n):
+    return {
+        "parents": buf[offsets["parents"]:offsets["parents"] + 8 * n].cast("q"),
+        "limits": buf[offsets["limits"]:offsets["limits"] + 8 * n].cast("d"),
+        "expenses": buf[offsets["expenses"]:offsets["expenses"] + 8 * n].cast("d"),
+        "totals": buf[offsets["totals"]:offsets["totals"] + 8 * n].cast("d"),
+        "name_offsets": buf[offsets["name_offsets"]:offsets["name_offsets"] + 8 * (n + 1)].cast("q"),
+        "names": buf[offsets["names"]:],
+    }
+
+
+def _release(views):
+    for view in views.values():
+        view.release()
+
+
+# ================= Worker side =================
+
+# Set in the parent before the pool forks, so workers inherit the trees
+_source = {}
+
+
+def _rollup(views, ranges, parents_aggregate, report_dir) -> List[tuple]:
+    """Roll up every tree in the block; returns (department, breached categories) pairs."""
+    parents, limits, expenses, totals = views["parents"], views["limits"], views["expenses"], views["totals"]
+    results = []
+    for department, start, count in ranges:
+        end = start + count
+        if parents_aggregate:
+            # Parents already carry their children's sum, so only leaves count
+            has_children = set(parents[i] for i in range(start + 1, end))
+            for i in range(start, end):
+                totals[i] = 0.0 if i in has_children else expenses[i]
+        else:
+            for i in range(start, end):
+                totals[i] = expenses[i]
+        # Children come after their parent in pre-order, so one backwards pass rolls up
+        for i in range(end - 1, start, -1):
+            totals[parents[i]] += totals[i]
+        breaches = [_name(views, i) for i in range(start, end)
+                    if limits[i] == limits[i] and limits[i] and totals[i] > limits[i]]
+        if report_dir:
+            _write_report(views, report_dir, department, start, end)
+        results.append((department, breaches))
+    return results
+
+
+def _rollup_shared(shm, offsets, n, ranges, parents_aggregate, report_dir):
+    views = _views(shm.buf, offsets, n)
+    try:
+        return _rollup(views, ranges, parents_aggregate, report_dir)
+    finally:
+        _release(views)
+
+
+def _consolidate_block(task):
+    """Roll up a shard that the parent already put in shared memory."""
+    shm_name, offsets, n, ranges, parents_aggregate, report_dir = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        breaches = _rollup_shared(shm, offsets, n, ranges, parents_aggregate, report_dir)
+    finally:
+        shm.close()
+    return shm_name, offsets, n, ranges, breaches
+
+
+def _consolidate_inherited(indices):
+    """Flatten and roll up a shard of the inherited trees into a new shared block."""
+    flat = FlatTrees()
+    for i in indices:
+        department, root = _source["trees"][i]
+        flat.add_tree(department, root)
+    shm, offsets = flat.to_shared()
+    try:
+        breaches = _rollup_shared(shm, offsets, len(flat), flat.ranges,
+                                  _source["parents_aggregate"], _source["report_dir"])
+    except BaseException:
+        shm.close()
+        shm.unlink()  # nobody else knows the block yet
+        raise
+    shm.close()
+    # From here the parent owns the block and unlinks it, so this process must stop tracking
+    # it: a tracker of its own would report it as leaked, or unlink it before the merge
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm.name, offsets, len(flat), flat.ranges, breaches
+
+
+def _name(views, index):
+    offsets = views["name_offsets"]
+    return bytes(views["names"][offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+
+def _write_report(views, report_dir, department, start, end):
+    parents, limits, expenses, totals = views["parents"], views["limits"], views["expenses"], views["totals"]
+    levels = {}
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in department)
+    with open(os.path.join(report_dir, f"{safe_name}.txt"), "w") as out:
+        for i in range(start, end):
+            level = levels[i] = levels[parents[i]] + 1 if parents[i] >= 0 else 0
+            limit = limits[i] if limits[i] == limits[i] else None
+            row = ReportRow(level, _name(views, i), expenses[i], totals[i], limit,
+                            totals[i] / limit if limit else None)
+            out.write(format_text_row(row))
+            out.write("\n")
+
+
+# ================= Parent side =================
+
+def _start_method(requested):
+    if requested:
+        return requested
+    # Forking copies only the calling thread and is unsafe on macOS, so it is
+    # used only where it is safe; the GUI and the service run other threads
+    if sys.platform.startswith("linux") and threading.active_count() == 1:
+        return "fork"
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _shards(count, shard_count):
+    """Consecutive index ranges; more shards than workers lets the pool balance uneven trees."""
+    size = max(1, -(-count // shard_count))
+    return [list(range(i, min(i + size, count))) for i in range(0, count, size)]
+
+
+def _merge_block(group, views, ranges, depth):
+    parents, limits, expenses, totals = views["parents"], views["limits"], views["expenses"], views["totals"]
+    for department, start, count in ranges:
+        nodes = {}
+        levels = {}
+        for i in range(start, start + count):
+            level = levels[i] = levels[parents[i]] + 1 if parents[i] >= 0 else 0
+            if depth is not None and level >= depth:
+                continue
+            limit = limits[i] if limits[i] == limits[i] else None
+            # Department roots are named after their department in the group tree
+            name = department if parents[i] < 0 else _name(views, i)
+            node = nodes[i] = ConsolidatedNode(name, limit, expenses[i], totals[i])
+            (nodes[parents[i]] if parents[i] >= 0 else group).add_child(node)
+        group.total += totals[start]
+
+
+def consolidate(trees: Dict[str, object], max_workers: Optional[int] = None, report_dir: Optional[str] = None,
+                depth: Optional[int] = 2, parents_aggregate=False, group_name="Group",
+                shards_per_worker=4, start_method: Optional[str] = None) -> dict:
+    """Consolidate department trees (BudgetTree objects or root nodes) into one group tree.
+
+    depth limits how many levels of each department appear in the group tree
+    (None keeps all of them); totals and breaches always cover every category.
+    Node classes that set AGGREGATES_CHILDREN (man_system_test) are counted
+    by their own expenses automatically; set parents_aggregate for other trees
+    whose parents already hold the sum of their children's expenses.
+    max_workers=0 runs everything in this process, which is the serial
+    baseline. start_method overrides the multiprocessing start method.
+    """
+    items = [(department, getattr(tree, "root", tree)) for department, tree in trees.items()]
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    shards = _shards(len(items), max(1, workers) * shards_per_worker)
+    method = _start_method(start_method)
+
+    _source.update(trees=items, parents_aggregate=parents_aggregate, report_dir=report_dir)
+    owned = []  # blocks the parent created before submitting them
+    returned = set()  # names of worker-created blocks not unlinked yet
+    results = []
+    try:
+        if workers == 0:
+            for shard in shards:
+                results.append(_consolidate_inherited(shard))
+                returned.add(results[-1][0])
+        elif method == "fork":
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                futures = [pool.submit(_consolidate_inherited, shard) for shard in shards]
+            # Leaving the pool waited for every shard, so each block is either returned or was never kept
+            returned.update(future.result()[0] for future in futures if future.exception() is None)
+            results = [future.result() for future in futures]
+        else:
+            tasks = []
+            for shard in shards:
+                flat = FlatTrees()
+                for i in shard:
+                    flat.add_tree(*items[i])
+                shm, offsets = flat.to_shared()
+                owned.append(shm)
+                tasks.append((shm.name, offsets, len(flat), flat.ranges, parents_aggregate, report_dir))
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method)) as pool:
+                results = list(pool.map(_consolidate_block, tasks))
+
+        group = ConsolidatedNode(group_name)
+        totals = {}
+        over_limit = {}
+        for shm_name, offsets, n, ranges, breaches in results:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            views = _views(shm.buf, offsets, n)
+            _merge_block(group, views, ranges, depth)
+            totals.update((department, views["totals"][start]) for department, start, _count in ranges)
+            _release(views)
+            shm.close()
+            shm.unlink()
+            returned.discard(shm_name)
+            over_limit.update(breaches)
+    finally:
+        _source.clear()
+        for shm in owned:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:  # already merged and unlinked above
+                pass
+        # A failed shard or merge must not leave the other shards' blocks in /dev/shm
+        for name in returned:
+            shm = shared_memory.SharedMemory(name=name)
+            shm.close()
+            shm.unlink()
+    # Departments in the order they were given
+    return {"group": group, "totals": {d: totals[d] for d, _root in items},
+            "over_limit": {d: over_limit[d] for d, _root in items}}
+
+
+def _synthetic_trees(departments, categories, seed=0):
+    import random
+    from man_system_test import BudgetNode
+
+    rng = random.Random(seed)
+    trees = {}
+    for d in range(departments):
+        nodes = [BudgetNode(f"Department {d}")]
+        for i in range(1, categories):
+            node = BudgetNode(f"Category {d}.{i}", limit=rng.choice((None, 200, 1000, 5000)))
+            node.expenses = rng.randint(0, 300)
+            node.parent = nodes[rng.randrange(max(1, i // 4), i) if i > 4 else 0]
+            node.parent.add_child(node)
+            nodes.append(node)
+        # Like man_system_test, parents also hold the sum of their children; parents precede children
+        for node in reversed(nodes[1:]):
+            node.parent.expenses += node.expenses
+        trees[f"Department {d}"] = nodes[0]
+    return trees
+
+
+if __name__ == "__main__":
+    departments = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    categories = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    trees = _synthetic_trees(departments, categories)
+    for workers in (0, 1, 2, 4, os.cpu_count() or 1):
+        start = time.perf_counter()
+        result = consolidate(trees, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        breaches = sum(len(b) for b in result["over_limit"].values())
+        print(f"workers={workers:<3} {elapsed:7.2f} s  group total {result['group'].total:,.0f}  breaches {breaches}")
@@ -0,0 +1,146 @@
+import sys
+from collections import namedtuple
+
+# Streaming budget reports. Trees are walked with an explicit stack, rows are
+# yielded one at a time and writers emit each row as soon as it is produced, so
+# neither deep nor very large trees build up recursion or big strings.
+# The module avoids importing typing, csv and json up front because the models
+# import it and headless jobs should start quickly.
+
+# spent: expenses booked on the category itself
+# total: rollup including subcategories, None when not computed
+# utilization: total / limit, None without a limit or rollup
+ReportRow = namedtuple("ReportRow", ["level", "category", "spent", "total", "limit", "utilization"])
+
+
+def _recorded(node):
+    # BudgetNode classes call it expenses, management_system3 calls it expense
+    expenses = getattr(node, "expenses", None)
+    if expenses is None:
+        expenses = getattr(node, "expense", 0)
+    return expenses or 0
+
+
+def own_expenses(node):
+    """Expenses booked on the category itself, for any of the budget node classes.
+
+    Node classes whose parents already hold the sum of their children's
+    expenses (man_system_test.BudgetNode) set AGGREGATES_CHILDREN; their own
+    share is what is left after taking the children's sums off.
+    """
+    expenses = _recorded(node)
+    if node.children and getattr(node, "AGGREGATES_CHILDREN", False):
+        expenses -= sum(_recorded(child) for child in node.children)
+    return expenses
+
+
+def compute_rollups(root) -> dict:
+    """Subtree totals keyed by id(node), computed with an iterative post-order walk.
+
+    The result holds one entry per category, so it is O(n) memory.
+    """
+    totals = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            totals[id(node)] = own_expenses(node) + sum(totals[id(child)] for child in node.children)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children)
+    return totals
+
+
+def iter_budget_rows(root, rollup=True, level=0):
+    """Yield one ReportRow per category in pre-order.
+
+    Without rollup only the walk stack is kept: the categories still pending
+    beside each node on the current path. With rollup a parent's total is
+    needed before its children are reported, so compute_rollups keeps one
+    number per category (O(n) memory). Trees whose parents aggregate their
+    children carry the total on every node already; for them no totals are
+    precomputed and the total is reported even without rollup.
+    """
+    aggregated = getattr(root, "AGGREGATES_CHILDREN", False)
+    totals = compute_rollups(root) if rollup and not aggregated else None
+    stack = [(root, level)]
+    while stack:
+        node, depth = stack.pop()
+        if totals is not None:
+            total = totals[id(node)]
+        else:
+            total = _recorded(node) if aggregated else None
+        utilization = total / node.limit if total is not None and node.limit else None
+        yield ReportRow(depth, node.category, own_expenses(node), total, node.limit, utilization)
+        children = node.children
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], depth + 1))
+
+
+def format_text_row(row: ReportRow) -> str:
+    """Report line: Spent is the category's own expenses, Total and utilization follow when known.
+
+    For trees whose parents aggregate, a parent's Spent is therefore what was
+    booked on it directly; the aggregated amount is its Total.
+    """
+    line = "  " * row.level + f"{row.category}: Spent {row.spent}, Limit {row.limit}"
+    if row.total is not None and row.total != row.spent:
+        line += f", Total {row.total}"
+    if row.utilization is not None:
+        line += f" ({row.utilization:.0%})"
+    return line
+
+
+def iter_text_lines(root, rollup=True, level=0):
+    for row in iter_budget_rows(root, rollup, level):
+        yield format_text_row(row)
+
+
+def iter_overview_lines(root, level=0):
+    """The models' original "Category: Spent X, Limit Y" overview, streamed.
+
+    Spent is the amount stored on the node, as the recursive overviews
+    printed it; aggregating trees therefore show their subtree sum there.
+    """
+    stack = [(root, level)]
+    while stack:
+        node, depth = stack.pop()
+        spent = node.expenses if hasattr(node, "expenses") else node.expense
+        yield "  " * depth + f"{node.category}: Spent {spent}, Limit {node.limit}"
+        children = node.children
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], depth + 1))
+
+
+def write_text(root, out=sys.stdout, rollup=True):
+    for line in iter_text_lines(root, rollup):
+        out.write(line)
+        out.write("\n")
+
+
+def write_csv(root, out, rollup=True):
+    import csv
+
+    writer = csv.writer(out)
+    writer.writerow(ReportRow._fields)
+    for row in iter_budget_rows(root, rollup):
+        writer.writerow(row)
+
+
+def write_jsonl(root, out, rollup=True):
+    import json
+
+    for row in iter_budget_rows(root, rollup):
+        out.write(json.dumps(row._asdict()))
+        out.write("\n")
+
+
+WRITERS = {"text": write_text, "csv": write_csv, "jsonl": write_jsonl}
+
+
+def export_report(root, path, fmt="text", rollup=True):
+    """Stream a report for the tree under root into a file."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format '{fmt}'.")
+    with open(path, "w", newline="" if fmt == "csv" else None) as out:
+        WRITERS[fmt](root, out, rollup)
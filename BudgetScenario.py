@@ -0,0 +1,228 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import Instrumentation
+from BudgetSnapshot import BudgetLedger, BudgetSnapshot
+
+
+class BudgetScenario:
+    """What-if overlay recorded as deltas on top of a frozen BudgetSnapshot.
+
+    The base is never modified. Totals are the base's cached rollups corrected
+    only along the paths that the recorded changes touch, so evaluating a
+    scenario costs O(changes * depth) rather than a copy of the whole tree.
+    """
+
+    def __init__(self, base: BudgetSnapshot, name=None):
+        self.base = base
+        self.name = name
+        self.limits = {}  # category -> overridden limit
+        self.moves = {}  # category -> new parent category
+        self.expense_deltas = {}  # category -> amount added to its own expenses
+        self.new_categories = {}  # category -> parent, for categories added here
+        self._deltas: Optional[Dict[str, float]] = None
+
+    def __repr__(self):
+        return f"BudgetScenario(name={self.name}, changes={self.change_count()})"
+
+    def change_count(self) -> int:
+        return len(self.limits) + len(self.moves) + len(self.expense_deltas) + len(self.new_categories)
+
+    def __contains__(self, category):
+        return category in self.new_categories or category in self.base
+
+    # ----- recording changes -----
+
+    def set_limit(self, category, limit) -> bool:
+        if category not in self:
+            print(f"Category '{category}' not found.")
+            return False
+        self.limits[category] = limit
+        return True
+
+    def add_expense(self, category, amount) -> bool:
+        if category not in self:
+            print(f"Category '{category}' not found.")
+            return False
+        self.expense_deltas[category] = self.expense_deltas.get(category, 0) + amount
+        self._deltas = None
+        return True
+
+    def scale_expenses(self, category, factor) -> bool:
+        """Grow a category's base rollup by a factor, e.g. 1.1 for "add 10% to Food"."""
+        base_total = self.base.get_total(category)
+        if base_total is None:
+            print(f"Category '{category}' not found in the base budget.")
+            return False
+        return self.add_expense(category, base_total * (factor - 1))
+
+    def add_category(self, parent_category, category, limit=None) -> bool:
+        parent_category = parent_category or self.base.root_category
+        if parent_category not in self:
+            print(f"Parent category '{parent_category}' not found.")
+            return False
+        if category in self:
+            print(f"Category '{category}' already exists.")
+            return False
+        self.new_categories[category] = parent_category
+        if limit is not None:
+            self.limits[category] = limit
+        return True
+
+    def move_category(self, category, new_parent) -> bool:
+        """Re-parent a base category, e.g. move Restaurants under Entertainment."""
+        if category not in self.base or category == self.base.root_category:
+            print(f"Cannot move category '{category}'.")
+            return False
+        if new_parent not in self:
+            print(f"Parent category '{new_parent}' not found.")
+            return False
+        ancestor = new_parent
+        while ancestor is not None:
+            if ancestor == category:
+                print(f"Cannot move '{category}' under its own subcategory '{new_parent}'.")
+                return False
+            ancestor = self.get_parent(ancestor)
+        self.moves[category] = new_parent
+        self._deltas = None
+        return True
+
+    # ----- queries -----
+
+    def get_parent(self, category) -> Optional[str]:
+        if category in self.moves:
+            return self.moves[category]
+        if category in self.new_categories:
+            return self.new_categories[category]
+        return self.base.get_parent(category)
+
+    def get_limit(self, category):
+        if category in self.limits:
+            return self.limits[category]
+        return self.base.get_limit(category)
+
+    def _ancestors(self, category, parent_of) -> Iterable[str]:
+        parent = parent_of(category)
+        while parent is not None:
+            yield parent
+            parent = parent_of(parent)
+
+    def _compute_deltas(self) -> Dict[str, float]:
+        """Difference between scenario and base rollups, for touched categories only."""
+        deltas: Dict[str, float] = {}
+
+        # Expense changes flow up the scenario ancestry
+        for category, amount in self.expense_deltas.items():
+            deltas[category] = deltas.get(category, 0) + amount
+            for ancestor in self._ancestors(category, self.get_parent):
+                deltas[ancestor] = deltas.get(ancestor, 0) + amount
+
+        # A moved category carries its base subtree, minus any nested subtree
+        # that is itself moved elsewhere, from its old ancestors to its new ones.
+        carried = {category: self.base.get_total(category) for category in self.moves}
+        for category in self.moves:
+            for ancestor in self._ancestors(category, self.base.get_parent):
+                if ancestor in carried:
+                    carried[ancestor] -= self.base.get_total(category)
+                    break
+        for category, amount in carried.items():
+            for ancestor in self._ancestors(category, self.base.get_parent):
+                deltas[ancestor] = deltas.get(ancestor, 0) - amount
+            for ancestor in self._ancestors(category, self.get_parent):
+                deltas[ancestor] = deltas.get(ancestor, 0) + amount
+        return deltas
+
+    def deltas(self) -> Dict[str, float]:
+        if self._deltas is None:
+            Instrumentation.cache_miss("scenario.deltas")
+            self._deltas = self._compute_deltas()
+        else:
+            Instrumentation.cache_hit("scenario.deltas")
+        return self._deltas
+
+    def get_total(self, category) -> Optional[float]:
+        if category not in self:
+            return None
+        base_total = self.base.get_total(category) or 0
+        return base_total + self.deltas().get(category, 0)
+
+    def is_over_limit(self, category) -> bool:
+        limit = self.get_limit(category)
+        return bool(limit and self.get_total(category) > limit)
+
+    def over_limit(self) -> List[str]:
+        """Breaches in the scenario: the base's cached breaches re-checked where changed."""
+        touched = set(self.deltas()) | set(self.limits) | set(self.new_categories)
+        breaches = [category for category in self.base.over_limit() if category not in touched]
+        breaches.extend(category for category in touched if self.is_over_limit(category))
+        return breaches
+
+    def evaluate(self) -> dict:
+        """Summary of the scenario: changed rollups and the resulting breaches."""
+        totals = {category: self.get_total(category)
+                  for category in set(self.deltas()) | set(self.new_categories)}
+        return {
+            "name": self.name,
+            "root_total": self.get_total(self.base.root_category),
+            "totals": totals,
+            "over_limit": sorted(self.over_limit()),
+        }
+
+
+# ================= Parallel evaluation =================
+# The base snapshot is shipped to each worker process once through the pool
+# initializer; only the small scenario deltas are pickled per task.
+
+_worker_base: Optional[BudgetSnapshot] = None
+
+
+def _init_worker(categories, root_category):
+    global _worker_base
+    _worker_base = BudgetSnapshot(categories, root_category)
+
+
+def _evaluate_in_worker(state) -> dict:
+    scenario = BudgetScenario(_worker_base)
+    scenario.__dict__.update(state)
+    return scenario.evaluate()
+
+
+def _scenario_state(scenario: BudgetScenario) -> dict:
+    state = dict(scenario.__dict__)
+    del state["base"]
+    state["_deltas"] = None
+    return state
+
+
+def evaluate_scenarios(base: BudgetSnapshot, scenarios: List[BudgetScenario],
+                       max_workers: Optional[int] = None, chunksize: int = 16) -> List[dict]:
+    """Evaluate many scenarios over the same base across a process pool."""
+    if not scenarios:
+        return []
+    states = [_scenario_state(scenario) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(base.categories, base.root_category)) as pool:
+        return list(pool.map(_evaluate_in_worker, states, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    ledger = BudgetLedger()
+    ledger.add_category(None, "Food", 500)
+    ledger.add_category("Food", "Groceries", 300)
+    ledger.add_category("Food", "Restaurants", 200)
+    ledger.add_category(None, "Entertainment", 400)
+    ledger.add_category(None, "Travel", 1000)
+    ledger.add_expense("Groceries", 250)
+    ledger.add_expense("Restaurants", 180)
+    ledger.add_expense("Entertainment", 300)
+    base = ledger.snapshot("plan base")
+
+    scenario = BudgetScenario(base, "reshuffle")
+    scenario.set_limit("Travel", 1500)
+    scenario.move_category("Restaurants", "Entertainment")
+    scenario.scale_expenses("Food", 1.1)
+
+    print("Food:", base.get_total("Food"), "->", scenario.get_total("Food"))
+    print("Entertainment:", base.get_total("Entertainment"), "->", scenario.get_total("Entertainment"))
+    print("Over limit:", scenario.over_limit())
+    print(evaluate_scenarios(base, [scenario], max_workers=2))
@@ -0,0 +1,389 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import Instrumentation
+from BudgetReport import own_expenses
+
+# ================= Persistent hash map =================
+# A small hash array mapped trie (HAMT). Every update copies only the nodes on
+# the path from the trie root to the changed slot, so older versions of the map
+# stay valid and share everything else with the new version.
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+
+class _Leaf:
+    __slots__ = ("key", "value", "hash")
+
+    def __init__(self, key, value, h):
+        self.key = key
+        self.value = value
+        self.hash = h
+
+
+class _Branch:
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap  # bit i set -> slot i is present in entries
+        self.entries = entries  # _Leaf, _Branch or _Collision per present slot
+
+
+class _Collision:
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, h: int, leaves: tuple):
+        self.hash = h
+        self.leaves = leaves  # keys that share the full 64-bit hash
+
+
+def _hash(key) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _merge(a: _Leaf, b: _Leaf, shift: int):
+    """Build the smallest subtree holding two leaves with different keys."""
+    if shift >= 64:
+        return _Collision(a.hash, (a, b))
+    ia = (a.hash >> shift) & _MASK
+    ib = (b.hash >> shift) & _MASK
+    if ia == ib:
+        return _Branch(1 << ia, (_merge(a, b, shift + _BITS),))
+    if ia < ib:
+        return _Branch((1 << ia) | (1 << ib), (a, b))
+    return _Branch((1 << ia) | (1 << ib), (b, a))
+
+
+def _assoc(node, shift: int, leaf: _Leaf):
+    """Return (new_node, added) with leaf stored under node."""
+    if isinstance(node, _Collision):
+        leaves = list(node.leaves)
+        for i, old in enumerate(leaves):
+            if old.key == leaf.key:
+                leaves[i] = leaf
+                return _Collision(node.hash, tuple(leaves)), False
+        return _Collision(node.hash, tuple(leaves) + (leaf,)), True
+
+    bit = 1 << ((leaf.hash >> shift) & _MASK)
+    pos = (node.bitmap & (bit - 1)).bit_count()
+    if not node.bitmap & bit:
+        entries = node.entries[:pos] + (leaf,) + node.entries[pos:]
+        return _Branch(node.bitmap | bit, entries), True
+
+    current = node.entries[pos]
+    if isinstance(current, _Leaf):
+        if current.key == leaf.key:
+            replacement, added = leaf, False
+        else:
+            replacement, added = _merge(current, leaf, shift + _BITS), True
+    else:
+        replacement, added = _assoc(current, shift + _BITS, leaf)
+    entries = node.entries[:pos] + (replacement,) + node.entries[pos + 1:]
+    return _Branch(node.bitmap, entries), added
+
+
+def _lookup(node, key, h: int):
+    shift = 0
+    while True:
+        if isinstance(node, _Collision):
+            for leaf in node.leaves:
+                if leaf.key == key:
+                    return leaf
+            return None
+        bit = 1 << ((h >> shift) & _MASK)
+        if not node.bitmap & bit:
+            return None
+        node = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+        if isinstance(node, _Leaf):
+            return node if node.key == key else None
+        shift += _BITS
+
+
+_EMPTY_BRANCH = _Branch(0, ())
+
+
+class PersistentMap:
+    """Immutable mapping; set() returns a new map sharing structure with this one."""
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, _root=_EMPTY_BRANCH, _size=0):
+        self._root = _root
+        self._size = _size
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return _lookup(self._root, key, _hash(key)) is not None
+
+    def __getitem__(self, key):
+        leaf = _lookup(self._root, key, _hash(key))
+        if leaf is None:
+            raise KeyError(key)
+        return leaf.value
+
+    def get(self, key, default=None):
+        leaf = _lookup(self._root, key, _hash(key))
+        return default if leaf is None else leaf.value
+
+    def set(self, key, value) -> "PersistentMap":
+        root, added = _assoc(self._root, 0, _Leaf(key, value, _hash(key)))
+        return PersistentMap(root, self._size + 1 if added else self._size)
+
+    def items(self) -> Iterator[Tuple[object, object]]:
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, _Leaf):
+                yield node.key, node.value
+            elif isinstance(node, _Collision):
+                for leaf in node.leaves:
+                    yield leaf.key, leaf.value
+            else:
+                stack.extend(node.entries)
+
+
+# ================= Budget snapshots =================
+
+class CategoryRecord:
+    """Immutable state of one category inside a budget version."""
+    __slots__ = ("category", "parent", "limit", "expenses", "total", "children")
+
+    def __init__(self, category, parent, limit, expenses, total, children):
+        self.category = category
+        self.parent = parent  # parent category name, None for the root
+        self.limit = limit
+        self.expenses = expenses  # expenses booked directly on this category
+        self.total = total  # expenses of this category and all subcategories
+        self.children = children  # cons list (newest_child, rest) or None
+
+    def replace(self, **changes) -> "CategoryRecord":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return CategoryRecord(**values)
+
+    def __repr__(self):
+        return f"CategoryRecord({self.category}, spent={self.total}, limit={self.limit})"
+
+
+def _iter_children(cons) -> List[str]:
+    names = []
+    while cons is not None:
+        names.append(cons[0])
+        cons = cons[1]
+    names.reverse()  # cons lists are newest first, report in insertion order
+    return names
+
+
+class BudgetSnapshot:
+    """Read-only view of the budget at one point in time.
+
+    Snapshots share all unchanged categories with each other and with the live
+    ledger, so keeping one per closed period costs only the categories that were
+    touched during that period.
+    """
+
+    def __init__(self, categories: PersistentMap, root_category: str, label=None):
+        self._categories = categories
+        self.root_category = root_category
+        self.label = label
+        self._over_limit: Optional[List[str]] = None
+
+    def __repr__(self):
+        return f"BudgetSnapshot(label={self.label}, categories={len(self._categories)})"
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __contains__(self, category):
+        return category in self._categories
+
+    @property
+    def categories(self) -> PersistentMap:
+        """The immutable category -> CategoryRecord map; sharing or pickling it is safe."""
+        return self._categories
+
+    def record(self, category) -> Optional[CategoryRecord]:
+        return self._categories.get(category)
+
+    def get_total(self, category) -> Optional[float]:
+        """Expenses of the category including all of its subcategories."""
+        record = self._categories.get(category)
+        return record.total if record else None
+
+    def get_expenses(self, category) -> Optional[float]:
+        record = self._categories.get(category)
+        return record.expenses if record else None
+
+    def get_limit(self, category):
+        record = self._categories.get(category)
+        return record.limit if record else None
+
+    def get_parent(self, category) -> Optional[str]:
+        record = self._categories.get(category)
+        return record.parent if record else None
+
+    def get_children(self, category) -> List[str]:
+        record = self._categories.get(category)
+        return _iter_children(record.children) if record else []
+
+    def is_over_limit(self, category) -> bool:
+        record = self._categories.get(category)
+        return bool(record and record.limit and record.total > record.limit)
+
+    def over_limit(self) -> List[str]:
+        """All categories whose rolled-up expenses exceed their limit."""
+        if self._over_limit is None:
+            Instrumentation.cache_miss("snapshot.over_limit")
+            # Snapshots never change, so the full scan is done at most once
+            self._over_limit = [name for name, record in self._categories.items()
+                                if record.limit and record.total > record.limit]
+        else:
+            Instrumentation.cache_hit("snapshot.over_limit")
+        return self._over_limit
+
+    def walk(self) -> Iterator[Tuple[int, CategoryRecord]]:
+        """Yield (level, record) in pre-order without recursion."""
+        stack = [(0, self.root_category)]
+        while stack:
+            level, name = stack.pop()
+            record = self._categories[name]
+            yield level, record
+            for child in reversed(_iter_children(record.children)):
+                stack.append((level + 1, child))
+
+
+class BudgetLedger:
+    """Budget tree built on persistent storage so snapshots are O(1)."""
+
+    def __init__(self, root_category: str = "Company Budget", limit=None):
+        self.root_category = root_category
+        self._categories = PersistentMap().set(
+            root_category, CategoryRecord(root_category, None, limit, 0, 0, None))
+        self.periods: Dict[object, BudgetSnapshot] = {}
+
+    @classmethod
+    def from_tree(cls, root) -> "BudgetLedger":
+        """Load any of the BudgetNode / BudgetTree.Node trees in this project.
+
+        Records keep the expenses booked on each category itself, also for
+        trees whose parents already hold their children's sum.
+        """
+        ledger = cls(root.category, root.limit)
+        categories = ledger._categories
+        stack = [(root, None)]
+        visited = []
+        while stack:
+            node, parent = stack.pop()
+            expenses = own_expenses(node)
+            if parent is not None:
+                if node.category in categories:
+                    print(f"Duplicate category '{node.category}' skipped.")
+                    continue
+                parent_record = categories[parent]
+                categories = categories.set(parent, parent_record.replace(
+                    children=(node.category, parent_record.children)))
+            categories = categories.set(node.category, CategoryRecord(
+                node.category, parent, node.limit, expenses, expenses, None))
+            visited.append(node.category)
+            for child in reversed(node.children):
+                stack.append((child, node.category))
+
+        # Roll totals up from the leaves; visited is in pre-order
+        for name in reversed(visited):
+            record = categories[name]
+            if record.parent is not None:
+                parent_record = categories[record.parent]
+                categories = categories.set(record.parent, parent_record.replace(
+                    total=parent_record.total + record.total))
+        ledger._categories = categories
+        return ledger
+
+    def __contains__(self, category):
+        return category in self._categories
+
+    def __len__(self):
+        return len(self._categories)
+
+    def add_category(self, parent_category, category, limit=None) -> bool:
+        parent_category = parent_category or self.root_category
+        parent_record = self._categories.get(parent_category)
+        if parent_record is None:
+            print(f"Parent category '{parent_category}' not found.")
+            return False
+        if category in self._categories:
+            print(f"Category '{category}' already exists.")
+            return False
+
+        categories = self._categories.set(parent_category, parent_record.replace(
+            children=(category, parent_record.children)))
+        self._categories = categories.set(
+            category, CategoryRecord(category, parent_category, limit, 0, 0, None))
+        return True
+
+    def add_expense(self, category, amount) -> bool:
+        record = self._categories.get(category)
+        if record is None:
+            print(f"Category '{category}' not found.")
+            return False
+
+        # Copy only the category and its ancestors; everything else is shared
+        categories = self._categories.set(category, record.replace(
+            expenses=record.expenses + amount, total=record.total + amount))
+        if record.limit and record.total + amount > record.limit:
+            print(f"Warning: Budget exceeded for {category}")
+        parent = record.parent
+        while parent is not None:
+            parent_record = categories[parent]
+            categories = categories.set(parent, parent_record.replace(
+                total=parent_record.total + amount))
+            parent = parent_record.parent
+        self._categories = categories
+        return True
+
+    def set_limit(self, category, limit) -> bool:
+        record = self._categories.get(category)
+        if record is None:
+            print(f"Category '{category}' not found.")
+            return False
+        self._categories = self._categories.set(category, record.replace(limit=limit))
+        return True
+
+    def snapshot(self, label=None) -> BudgetSnapshot:
+        """Freeze the current state. O(1): the snapshot shares the live storage."""
+        return BudgetSnapshot(self._categories, self.root_category, label)
+
+    def close_period(self, label) -> BudgetSnapshot:
+        """Snapshot the budget and keep it queryable under the given period label."""
+        snapshot = self.snapshot(label)
+        self.periods[label] = snapshot
+        return snapshot
+
+    def get_period(self, label) -> Optional[BudgetSnapshot]:
+        return self.periods.get(label)
+
+    def get_total(self, category):
+        return self.snapshot().get_total(category)
+
+    def get_limit(self, category):
+        return self.snapshot().get_limit(category)
+
+
+if __name__ == "__main__":
+    ledger = BudgetLedger()
+    ledger.add_category(None, "Food", 500)
+    ledger.add_category("Food", "Groceries", 300)
+    ledger.add_category(None, "Travel", 1000)
+    ledger.add_expense("Groceries", 120)
+    january = ledger.close_period("2024-01")
+
+    ledger.add_expense("Groceries", 250)
+    ledger.add_expense("Travel", 400)
+    february = ledger.close_period("2024-02")
+
+    print("January Food total:", january.get_total("Food"))    # 120
+    print("February Food total:", february.get_total("Food"))  # 370
+    print("February over limit:", february.over_limit())       # ['Groceries']
+    for level, record in february.walk():
+        print("  " * level + f"{record.category}: Spent {record.total}, Limit {record.limit}")
@@ -0,0 +1,333 @@
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from BudgetReport import own_expenses
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER REFERENCES categories(id),
+    category TEXT NOT NULL,
+    limit_amount REAL,
+    expenses REAL NOT NULL DEFAULT 0,
+    saved_expenses REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_categories_parent ON categories(parent_id);
+CREATE INDEX IF NOT EXISTS idx_categories_name ON categories(category);
+CREATE TABLE IF NOT EXISTS postings (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    amount REAL NOT NULL,
+    posted_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_postings_category ON postings(category_id);
+"""
+
+# Statements are kept as module constants so sqlite3's statement cache reuses
+# the compiled (prepared) form on every call.
+_SELECT_ROOT = "SELECT id, category, limit_amount, expenses FROM categories WHERE parent_id IS NULL LIMIT 1"
+_SELECT_BY_NAME = "SELECT id, category, limit_amount, expenses, parent_id FROM categories WHERE category = ? LIMIT 1"
+_SELECT_CHILDREN = "SELECT id, category, limit_amount, expenses FROM categories WHERE parent_id = ? ORDER BY id"
+_INSERT_CATEGORY = "INSERT INTO categories (id, parent_id, category, limit_amount, expenses) VALUES (?, ?, ?, ?, ?)"
+_INSERT_SAVED = ("INSERT INTO categories (id, parent_id, category, limit_amount, expenses, saved_expenses) "
+                 "VALUES (?, ?, ?, ?, ?, ?)")
+_UPDATE_SAVED = ("UPDATE categories SET category = ?, limit_amount = ?, expenses = expenses + ?, saved_expenses = ? "
+                 "WHERE id = ?")
+_SELECT_SAVED = "SELECT id, parent_id, category, limit_amount, saved_expenses FROM categories ORDER BY id"
+_INSERT_POSTING = "INSERT INTO postings (category_id, amount) VALUES (?, ?)"
+_UPDATE_EXPENSES = "UPDATE categories SET expenses = expenses + ? WHERE id = ?"
+_UPDATE_LIMIT = "UPDATE categories SET limit_amount = ? WHERE id = ?"
+_NEXT_ID = "SELECT COALESCE(MAX(id), 0) + 1 FROM categories"
+
+_SUBTREE_TOTAL = """
+WITH RECURSIVE subtree(id) AS (
+    SELECT id FROM categories WHERE id = ?
+    UNION ALL
+    SELECT c.id FROM categories c JOIN subtree s ON c.parent_id = s.id
+)
+SELECT COALESCE(SUM(c.expenses), 0) FROM categories c JOIN subtree s ON c.id = s.id
+"""
+
+# Every category's expenses are pushed up to all of its ancestors, so one pass
+# produces the rollup of every category that has a limit.
+_OVER_LIMIT = """
+WITH RECURSIVE up(ancestor_id, amount) AS (
+    SELECT id, expenses FROM categories WHERE expenses != 0
+    UNION ALL
+    SELECT c.parent_id, up.amount FROM up JOIN categories c ON c.id = up.ancestor_id
+    WHERE c.parent_id IS NOT NULL
+)
+SELECT c.category, c.limit_amount, SUM(up.amount) AS total
+FROM up JOIN categories c ON c.id = up.ancestor_id
+WHERE c.limit_amount IS NOT NULL AND c.limit_amount > 0
+GROUP BY up.ancestor_id
+HAVING total > c.limit_amount
+ORDER BY c.id
+"""
+
+
+class LazyBudgetNode:
+    """Budget category backed by a BudgetStore; children are read on first access."""
+
+    def __init__(self, store: "BudgetStore", node_id, category, limit=None, expenses=0, parent=None):
+        self.store = store
+        self.node_id = node_id
+        self.category = category
+        self.limit = limit
+        self.expenses = expenses
+        self.parent = parent
+        self._children: Optional[List["LazyBudgetNode"]] = None
+
+    def __repr__(self):
+        return f"LazyBudgetNode({self.category}, spent={self.expenses}, limit={self.limit})"
+
+    @property
+    def children(self) -> List["LazyBudgetNode"]:
+        if self._children is None:
+            self._children = [LazyBudgetNode(self.store, *row, parent=self)
+                              for row in self.store.fetch_children(self.node_id)]
+        return self._children
+
+    def add_child(self, child_node):
+        """Persist a new child category; accepts any node with category/limit."""
+        new_node = self.store.add_category(self.node_id, child_node.category, child_node.limit)
+        new_node.parent = self
+        if self._children is not None:
+            self._children.append(new_node)
+        return new_node
+
+    def add_expense(self, amount):
+        if self.limit and self.expenses + amount > self.limit:
+            print(f"Warning: Budget exceeded for {self.category}")
+        self.expenses += amount
+        self.store.post_expense(self.node_id, amount)
+
+    def get_total(self):
+        """Rollup of this category and all subcategories, computed in the database."""
+        return self.store.subtree_total(self.node_id)
+
+
+class BudgetStore:
+    """SQLite storage for budget categories and expense postings.
+
+    The database runs in WAL mode so readers never block the writer, postings
+    are written in batches with executemany(), and rollups / over-limit checks
+    are recursive CTEs evaluated inside SQLite, so trees larger than memory
+    never have to be loaded to answer them.
+
+    Queued postings are written once batch_size of them are waiting, when a
+    posting arrives flush_interval seconds after the oldest queued one, before
+    any read, and on flush() / close(). Postings still queued when the process
+    dies are lost; call flush() where they must be durable.
+    """
+
+    def __init__(self, path="budget.db", batch_size=10000, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(categories)")}
+        if "saved_expenses" not in columns:  # databases written before save_tree kept postings
+            with self.conn:
+                self.conn.execute("ALTER TABLE categories ADD COLUMN saved_expenses REAL NOT NULL DEFAULT 0")
+                self.conn.execute("UPDATE categories SET saved_expenses = expenses")
+        self._pending_postings: List[Tuple[int, float]] = []
+        self._pending_postings_since = 0.0  # time.monotonic() of the oldest queued posting
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ----- writing -----
+
+    def save_tree(self, root):
+        """Write any BudgetNode / BudgetTree.Node hierarchy into the store.
+
+        Categories are matched by their parent and name: new ones are
+        inserted, and changed names (of the root), limits and expenses are
+        updated in place. Categories that are only in the store are kept, and
+        so are all postings: a category's stored expenses move by how much its
+        own expenses in the tree changed since the last save, so amounts
+        posted through the store are not overwritten.
+
+        Each category stores only the expenses booked on itself, so the
+        recursive queries can sum subtrees even for trees whose parents
+        already hold their children's sum.
+        """
+        self.flush()
+        stored = {}  # (parent id, name) -> rows in id order, matched first come first served
+        stored_root = None
+        for row in self.conn.execute(_SELECT_SAVED):
+            if row[1] is None and stored_root is None:
+                stored_root = row
+            else:
+                stored.setdefault((row[1], row[2]), []).append(row)
+        with self.conn:
+            next_id = self.conn.execute(_NEXT_ID).fetchone()[0]
+            inserts, updates = [], []
+            stack = [(root, None)]
+            while stack:
+                node, parent_id = stack.pop()
+                expenses = own_expenses(node)
+                if parent_id is None:
+                    row, stored_root = stored_root, None
+                else:
+                    rows = stored.get((parent_id, node.category))
+                    row = rows.pop(0) if rows else None
+                if row is None:
+                    node_id = next_id
+                    next_id += 1
+                    inserts.append((node_id, parent_id, node.category, node.limit, expenses, expenses))
+                else:
+                    node_id, _parent_id, category, limit, saved = row
+                    if category != node.category or limit != node.limit or saved != expenses:
+                        updates.append((node.category, node.limit, expenses - saved, expenses, node_id))
+                if len(inserts) >= self.batch_size:
+                    self.conn.executemany(_INSERT_SAVED, inserts)
+                    inserts.clear()
+                for child in reversed(node.children):
+                    stack.append((child, node_id))
+            self.conn.executemany(_INSERT_SAVED, inserts)
+            self.conn.executemany(_UPDATE_SAVED, updates)
+
+    def add_category(self, parent, category, limit=None) -> LazyBudgetNode:
+        """Insert a category under a parent given by id or by category name."""
+        parent_id = parent if isinstance(parent, int) or parent is None else self._id_of(parent)
+        with self.conn:
+            node_id = self.conn.execute(_NEXT_ID).fetchone()[0]
+            self.conn.execute(_INSERT_CATEGORY, (node_id, parent_id, category, limit, 0))
+        return LazyBudgetNode(self, node_id, category, limit, 0)
+
+    def set_limit(self, category, limit):
+        with self.conn:
+            self.conn.execute(_UPDATE_LIMIT, (limit, self._id_of(category)))
+
+    def post_expense(self, category, amount):
+        """Queue a posting; it is written with the next batch flush (see the class docstring)."""
+        node_id = category if isinstance(category, int) else self._id_of(category)
+        now = time.monotonic()
+        if not self._pending_postings:
+            self._pending_postings_since = now
+        self._pending_postings.append((node_id, amount))
+        if (len(self._pending_postings) >= self.batch_size
+                or now - self._pending_postings_since >= self.flush_interval):
+            self.flush()
+
+    def post_expenses(self, postings: Iterable[Tuple[object, float]]):
+        for category, amount in postings:
+            self.post_expense(category, amount)
+
+    def flush(self):
+        """Write queued postings and their balance updates in one transaction."""
+        if not self._pending_postings:
+            return
+        with self.conn:
+            self.conn.executemany(_INSERT_POSTING, self._pending_postings)
+            self.conn.executemany(_UPDATE_EXPENSES,
+                                  [(amount, node_id) for node_id, amount in self._pending_postings])
+        self._pending_postings.clear()
+
+    # ----- reading -----
+
+    def _id_of(self, category) -> int:
+        row = self.conn.execute(_SELECT_BY_NAME, (category,)).fetchone()
+        if row is None:
+            raise ValueError(f"Category '{category}' does not exist.")
+        return row[0]
+
+    def fetch_children(self, node_id) -> List[tuple]:
+        self.flush()
+        return self.conn.execute(_SELECT_CHILDREN, (node_id,)).fetchall()
+
+    def load_root(self) -> Optional[LazyBudgetNode]:
+        """Return the root category; nothing below it is read until accessed."""
+        self.flush()
+        row = self.conn.execute(_SELECT_ROOT).fetchone()
+        return LazyBudgetNode(self, *row) if row else None
+
+    def find(self, category) -> Optional[LazyBudgetNode]:
+        """Indexed lookup of a category by name."""
+        self.flush()
+        row = self.conn.execute(_SELECT_BY_NAME, (category,)).fetchone()
+        return LazyBudgetNode(self, *row[:4]) if row else None
+
+    def subtree_total(self, category) -> float:
+        self.flush()
+        node_id = category if isinstance(category, int) else self._id_of(category)
+        return self.conn.execute(_SUBTREE_TOTAL, (node_id,)).fetchone()[0]
+
+    def over_limit(self) -> List[Tuple[str, float, float]]:
+        """(category, limit, rolled-up total) for every category over its limit."""
+        self.flush()
+        return self.conn.execute(_OVER_LIMIT).fetchall()
+
+    def postings(self, category) -> List[Tuple[float, str]]:
+        self.flush()
+        return self.conn.execute(
+            "SELECT amount, posted_at FROM postings WHERE category_id = ? ORDER BY id",
+            (self._id_of(category),)).fetchall()
+
+    def load_into(self, tree):
+        """Eagerly rebuild a BudgetTree's in-memory nodes from the store.
+
+        Works with the trees in Budget_user, man_system_test and
+        management_system3: new nodes are created with the class of tree.root.
+        The tree now holds every stored amount, so a later save_tree of it only
+        writes what changed after this load.
+        """
+        self.flush()
+        node_class = type(tree.root)
+        track_parent = hasattr(tree.root, "parent")
+        rows = self.conn.execute(
+            "SELECT id, parent_id, category, limit_amount, expenses FROM categories ORDER BY id")
+        nodes = {}
+        for node_id, parent_id, category, limit, expenses in rows:
+            if parent_id is None:
+                node = tree.root
+                node.category, node.limit = category, limit
+            else:
+                node = node_class(category, limit)
+                if track_parent:
+                    node.parent = nodes[parent_id]
+                nodes[parent_id].add_child(node)
+            if hasattr(node, "expenses"):
+                node.expenses = expenses
+            else:
+                node.expense = expenses
+            nodes[node_id] = node
+        with self.conn:
+            self.conn.execute("UPDATE categories SET saved_expenses = expenses WHERE saved_expenses != expenses")
+        if getattr(node_class, "AGGREGATES_CHILDREN", False):
+            # Stored expenses are the category's own; children have higher ids than their parents
+            for node in reversed(list(nodes.values())):
+                for child in node.children:
+                    node.expenses += child.expenses
+        if hasattr(tree, "reindex"):
+            tree.reindex()  # nodes were attached without add_category
+        return tree
+
+
+if __name__ == "__main__":
+    with BudgetStore(":memory:") as store:
+        root = store.add_category(None, "Company Budget")
+        food = root.add_child(LazyBudgetNode(store, None, "Food", 500))
+        food.add_child(LazyBudgetNode(store, None, "Groceries", 300))
+        root.add_child(LazyBudgetNode(store, None, "Travel", 1000))
+        store.post_expense("Groceries", 350)
+        store.post_expense("Travel", 200)
+
+        print("Food total:", store.subtree_total("Food"))
+        print("Over limit:", store.over_limit())
+        reloaded = store.load_root()
+        print([child.category for child in reloaded.children])
@@ -1,12 +1,21 @@
-import tkinter as tk
-from tkinter import messagebox
+import sys
+
+from BudgetReport import iter_overview_lines
+from LazyImport import lazy_import
+
+# tkinter is only loaded once the GUI is created, so the models import headless
+tk = lazy_import("tkinter")
+messagebox = lazy_import("tkinter.messagebox")
 
 class BudgetNode:
+    __slots__ = ("category", "limit", "expenses", "children", "parent")
+
     def __init__(self, category, limit=None):
-        self.category = category
+        self.category = sys.intern(category) if type(category) is str else category
         self.limit = limit
         self.expenses = 0
         self.children = []
+        self.parent = None
 
     def add_expense(self, amount):
         if self.limit and self.expenses + amount > self.limit:
@@ -17,10 +26,9 @@ class BudgetNode:
         self.children.append(child_node)
 
     def display_categories(self, level=0):
-        # Display the category with its expenses and limit
-        print("  " * level + f"{self.category}: Spent {self.expenses}, Limit {self.limit}")
-        for child in self.children:
-            child.display_categories(level + 1)  # Recursively display children
+        # Display each category with its expenses and limit, streamed line by line
+        for line in iter_overview_lines(self, level=level):
+            print(line)
 
 class BudgetTree:
     def __init__(self):
@@ -32,6 +40,7 @@ class BudgetTree:
             "Travel": 1000,
             "Entertainment": 400
         }
+        self.search_index = None  # optional SearchIndex.TrigramIndex notified of new categories
 
     def add_category(self, parent_category, category, limit=None):
         parent_node = self.search(self.root, parent_category)
@@ -39,7 +48,10 @@ class BudgetTree:
             if category in self.limits:
                 limit = self.limits[category]  # Predefined limit
             new_category = BudgetNode(category, limit)
+            new_category.parent = parent_node  # for the paths shown in search results
             parent_node.add_child(new_category)
+            if self.search_index is not None:
+                self.search_index.add("category", new_category, category)
             print(f"Category '{category}' added under '{parent_category}' with limit {limit}.")
         else:
             print(f"Parent category '{parent_category}' not found.")
@@ -58,7 +70,10 @@ class BudgetApp:
         self.root = root
         self.root.title("Budget Management System")
 
+        from TkWorker import BackgroundWorker
+
         self.budget = BudgetTree()
+        self.worker = BackgroundWorker(root)  # Budget operations run off the Tk thread
 
         self.frame = tk.Frame(root)
         self.frame.pack(pady=10)
@@ -109,6 +124,25 @@ class BudgetApp:
         self.display_button = tk.Button(self.frame, text="Display Budget", command=self.display_budget)
         self.display_button.grid(row=7, columnspan=2, pady=10)
 
+        # Search box: matching categories are listed by path as you type
+        self.search_label = tk.Label(self.frame, text="Search Categories:")
+        self.search_label.grid(row=8, column=0, padx=5)
+
+        self.search_entry = tk.Entry(self.frame)
+        self.search_entry.grid(row=8, column=1, padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+
+        self.search_results = tk.Listbox(self.frame, width=50, height=8)
+        self.search_results.grid(row=9, columnspan=2, pady=10)
+        self.search_after_id = None
+        self.search_generation = 0
+
+        from SearchIndex import TrigramIndex
+
+        # The index is filled and queried on the worker thread, in order with the budget changes
+        self.search_index = TrigramIndex()
+        self.worker.submit(self.build_search_index)
+
     def add_category(self):
         category_name = self.category_entry.get().strip()
         parent_category = self.parent_category_entry.get().strip()
@@ -123,7 +157,7 @@ class BudgetApp:
             return
 
         if category_name in self.budget.limits:
-            self.budget.add_category(parent_category, category_name)  # Use predefined limit
+            self.worker.submit(self.budget.add_category, parent_category, category_name)  # Use predefined limit
             messagebox.showinfo("Success", f"Category '{category_name}' added under '{parent_category}' with predefined limit.")
         else:
             if not limit:
@@ -132,7 +166,7 @@ class BudgetApp:
 
             try:
                 limit = float(limit)
-                self.budget.add_category(parent_category, category_name, limit)
+                self.worker.submit(self.budget.add_category, parent_category, category_name, limit)
                 messagebox.showinfo("Success", f"Category '{category_name}' added under '{parent_category}' with limit {limit}.")
             except ValueError:
                 messagebox.showerror("Input Error", "Please enter a valid number for the limit.")
@@ -148,30 +182,77 @@ class BudgetApp:
         if category_name and amount:
             try:
                 amount = float(amount)
+            except ValueError:
+                messagebox.showerror("Input Error", "Please enter a valid amount.")
+                return
+
+            def post_expense():
                 node = self.budget.search(self.budget.root, category_name)
                 if node:
                     node.add_expense(amount)
-                    messagebox.showinfo("Success", f"Expense of {amount} added to '{category_name}'.")
-                    self.expense_category_entry.delete(0, tk.END)
-                    self.expense_amount_entry.delete(0, tk.END)
-                else:
-                    messagebox.showerror("Category Not Found", f"Category '{category_name}' not found.")
-            except ValueError:
-                messagebox.showerror("Input Error", "Please enter a valid amount.")
+                return node
+
+            self.worker.submit(post_expense, on_done=lambda node: self.on_expense_added(node, category_name, amount))
         else:
             messagebox.showerror("Input Error", "Both category and amount are required.")
 
+    def on_expense_added(self, node, category_name, amount):
+        if node:
+            messagebox.showinfo("Success", f"Expense of {amount} added to '{category_name}'.")
+            self.expense_category_entry.delete(0, tk.END)
+            self.expense_amount_entry.delete(0, tk.END)
+        else:
+            messagebox.showerror("Category Not Found", f"Category '{category_name}' not found.")
+
     def display_budget(self):
-        budget_overview = self.get_budget_overview(self.budget.root)
-        messagebox.showinfo("Budget Overview", budget_overview)
+        # Building the overview walks the whole tree, so it runs on the worker thread
+        self.worker.submit(self.get_budget_overview, self.budget.root,
+                           on_done=lambda overview: messagebox.showinfo("Budget Overview", overview))
 
     def get_budget_overview(self, node, level=0):
-        overview = "  " * level + f"{node.category}: Spent {node.expenses}, Limit {node.limit}\n"
-        for child in node.children:
-            overview += self.get_budget_overview(child, level + 1)
-        return overview
+        return "".join(line + "\n" for line in iter_overview_lines(node, level=level))
+
+    def build_search_index(self):
+        stack = [self.budget.root]
+        while stack:
+            node = stack.pop()
+            self.search_index.add("category", node, node.category)
+            stack.extend(node.children)
+        # From here on add_category keeps the index up to date
+        self.budget.search_index = self.search_index
+
+    def on_search_typed(self, event=None):
+        # Wait for a pause in typing instead of searching on every key
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        self.search_generation += 1
+        generation = self.search_generation
+        self.worker.submit(self.find_matches, self.search_entry.get(),
+                           on_done=lambda paths: self.show_search_results(generation, paths))
+
+    def find_matches(self, text, limit=100):
+        from SearchIndex import item_path
+
+        return [item_path(result.item, lambda node: node.category)
+                for result in self.search_index.query(text, limit)]
+
+    def show_search_results(self, generation, paths):
+        if generation != self.search_generation:
+            return  # a newer search is already on its way
+        self.search_results.delete(0, tk.END)
+        for path in paths:
+            self.search_results.insert(tk.END, path)
 
 # Main Program
-root = tk.Tk()
-app = BudgetApp(root)
-root.mainloop()
+def main():
+    root = tk.Tk()
+    app = BudgetApp(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
+
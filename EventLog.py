@@ -0,0 +1,613 @@
+"""Event-sourced write-ahead log for the budget, file and task models.
+
+Every mutation made through EventSourcedWorkplace is applied to the in-memory
+models and appended as a compact binary record to one shared log:
+
+    record = <payload length:u32> <crc32:u32> <lsn:u64> <type:u8> <payload>
+
+The crc covers lsn, type and payload, so a torn or corrupt tail is detected
+and cut off on recovery. A single flusher thread writes everything appended
+since its last pass with one write() and one fsync(); callers that wait for
+durability while a flush is in progress are all released by the next one
+(group commit).
+
+A checkpoint writes the complete state of all three models in the same record
+format to checkpoint.bin, starts a new log segment and deletes the old ones.
+Only encoding the state happens under the workplace lock; the file is written
+and fsynced after it is released, so mutations carry on meanwhile.
+Recovery loads the checkpoint and replays only the records after it, and
+checkpoints are taken automatically every `checkpoint_every` records, which
+bounds restart time.
+
+    workplace = EventSourcedWorkplace.open("data/")
+    workplace.add_category(None, "Travel", 1000)
+    workplace.add_expense("Travel", 120)
+    workplace.close()
+"""
+import datetime
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from FileSystem import FileManager, FileNode, FolderNode, to_micros
+from TaskSystem import TaskDatabase
+from man_system_test import BudgetNode, BudgetTree
+
+_HEADER = struct.Struct("<IIQB")
+_CRC_PART = struct.Struct("<QB")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_NONE = 0xFFFFFFFF
+_CHECKPOINT_MAGIC = b"WPCK\x01"
+
+# Mutation records
+BUDGET_ADD_CATEGORY = 1
+BUDGET_ADD_EXPENSE = 2
+FILES_CREATE_FOLDER = 3
+FILES_ADD_FILE = 4
+FILES_MOVE_FILE = 5
+TASKS_ADD = 6
+TASKS_CONNECT = 7
+# Checkpoint records; parents are referenced by their position in the checkpoint
+CHECKPOINT_BUDGET_NODE = 16
+CHECKPOINT_FOLDER = 17
+CHECKPOINT_FILE = 18
+CHECKPOINT_TASK = 19
+CHECKPOINT_TASK_EDGE = 20
+
+# Field kinds: s = str, S = str or None, q = int, n = int, float or None
+SCHEMAS = {
+    BUDGET_ADD_CATEGORY: "Ssn",     # parent, category, limit
+    BUDGET_ADD_EXPENSE: "sn",       # category, amount
+    FILES_CREATE_FOLDER: "sS",      # name, parent path
+    FILES_ADD_FILE: "sSqq",         # name, parent path, size, created (us since epoch)
+    FILES_MOVE_FILE: "sss",         # name, source path, target path
+    TASKS_ADD: "s",                 # data
+    TASKS_CONNECT: "qq",            # task index, dependency index
+    CHECKPOINT_BUDGET_NODE: "qsnn",  # parent index (-1 = root), category, limit, expenses
+    CHECKPOINT_FOLDER: "qs",         # parent index (-1 = root), name
+    CHECKPOINT_FILE: "qsqq",         # folder index (-1 = root), name, size, created
+    CHECKPOINT_TASK: "s",            # data
+    CHECKPOINT_TASK_EDGE: "qq",      # task index, dependency index
+}
+
+
+# ================= Record encoding =================
+
+def encode_fields(schema, fields) -> bytes:
+    parts = []
+    for kind, value in zip(schema, fields):
+        if kind == "q":
+            parts.append(_I64.pack(value))
+        elif kind == "n":
+            if value is None:
+                parts.append(b"\x00")
+            elif isinstance(value, int):
+                parts.append(b"\x01" + _I64.pack(value))
+            else:
+                parts.append(b"\x02" + _F64.pack(value))
+        elif value is None:  # only valid for "S"
+            parts.append(_U32.pack(_NONE))
+        else:
+            data = str(value).encode("utf-8")
+            parts.append(_U32.pack(len(data)))
+            parts.append(data)
+    return b"".join(parts)
+
+
+def decode_fields(schema, payload):
+    fields = []
+    offset = 0
+    for kind in schema:
+        if kind == "q":
+            fields.append(_I64.unpack_from(payload, offset)[0])
+            offset += 8
+        elif kind == "n":
+            tag = payload[offset]
+            offset += 1
+            if tag == 0:
+                fields.append(None)
+            else:
+                fields.append((_I64 if tag == 1 else _F64).unpack_from(payload, offset)[0])
+                offset += 8
+        else:
+            length = _U32.unpack_from(payload, offset)[0]
+            offset += 4
+            if length == _NONE:
+                fields.append(None)
+            else:
+                fields.append(payload[offset:offset + length].decode("utf-8"))
+                offset += length
+    return fields
+
+
+def encode_record(lsn, event_type, payload) -> bytes:
+    crc = zlib.crc32(payload, zlib.crc32(_CRC_PART.pack(lsn, event_type)))
+    return _HEADER.pack(len(payload), crc, lsn, event_type) + payload
+
+
+def read_records(data, offset=0):
+    """Yield (lsn, event_type, fields, end_offset) until the data ends or a record is torn or corrupt."""
+    size = len(data)
+    while offset + _HEADER.size <= size:
+        length, crc, lsn, event_type = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        end = start + length
+        if end > size or event_type not in SCHEMAS:
+            return
+        payload = bytes(data[start:end])
+        if zlib.crc32(payload, zlib.crc32(_CRC_PART.pack(lsn, event_type))) != crc:
+            return
+        yield lsn, event_type, decode_fields(SCHEMAS[event_type], payload), end
+        offset = end
+
+
+# ================= Log =================
+
+class _SegmentSwitch:
+    """Queued between records: the records after it go to a segment starting at first_lsn."""
+
+    __slots__ = ("first_lsn",)
+
+    def __init__(self, first_lsn):
+        self.first_lsn = first_lsn
+
+
+class EventLog:
+    """Append-only segmented log with a group-commit flusher thread.
+
+    append() only buffers the record and returns its LSN; wait(lsn) blocks
+    until the record is on disk. With sync=False records are written but not
+    fsynced, which survives a process crash but not a power loss.
+    """
+
+    def __init__(self, directory, sync=True, commit_delay=0.0):
+        self.directory = directory
+        self.sync = sync
+        self.commit_delay = commit_delay  # seconds the flusher waits for more records to join a batch
+        os.makedirs(directory, exist_ok=True)
+        self.last_lsn = 0
+        self.durable_lsn = 0
+        self.flushes = 0
+        self._pending = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._error = None
+        self._file = None
+        self._thread = None
+        self.segment_first_lsn = 0  # first LSN of the segment being written
+
+    # ----- segments -----
+
+    def segment_paths(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("wal-") and name.endswith(".log"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _segment_path(self, first_lsn):
+        return os.path.join(self.directory, f"wal-{first_lsn:020d}.log")
+
+    def recover(self, after_lsn=0):
+        """Yield (lsn, event_type, fields) for every intact record with lsn > after_lsn.
+
+        A torn tail is truncated away so new records follow the last good one.
+        Segments after a damaged one continue past a gap, so they are deleted
+        with a warning; start() then appends to the truncated segment.
+        Must be called before start().
+        """
+        paths = self.segment_paths()
+        for position, path in enumerate(paths):
+            with open(path, "rb") as f:
+                data = f.read()
+            end = 0
+            for lsn, event_type, fields, end in read_records(data):
+                self.last_lsn = max(self.last_lsn, lsn)
+                if lsn > after_lsn:
+                    yield lsn, event_type, fields
+            if end < len(data):
+                print(f"Event log: truncating {len(data) - end} damaged bytes at the end of {os.path.basename(path)}.",
+                      file=sys.stderr)
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+                for later in paths[position + 1:]:
+                    print(f"Event log: deleting {os.path.basename(later)}, which follows the damaged segment.",
+                          file=sys.stderr)
+                    os.remove(later)
+                break
+        self.last_lsn = max(self.last_lsn, after_lsn)
+        self.durable_lsn = self.last_lsn
+
+    def start(self):
+        paths = self.segment_paths()
+        path = paths[-1] if paths else self._segment_path(self.last_lsn + 1)
+        self.segment_first_lsn = int(os.path.basename(path)[4:-4])
+        self._file = open(path, "ab")
+        self._thread = threading.Thread(target=self._flush_loop, name="event-log-flusher", daemon=True)
+        self._thread.start()
+
+    def start_segment(self) -> int:
+        """Send every record appended from now on to a new segment; returns the last LSN before it.
+
+        Does not wait: the flusher switches files once it has written the
+        records before the switch.
+        """
+        with self._cond:
+            self._pending.append(_SegmentSwitch(self.last_lsn + 1))
+            self._cond.notify_all()
+            return self.last_lsn
+
+    def drop_segments_through(self, lsn):
+        """Delete the segments holding only records up to lsn, once the flusher has moved past them."""
+        with self._cond:
+            while self.durable_lsn < lsn or self.segment_first_lsn <= lsn:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+        keep_from = os.path.basename(self._segment_path(lsn + 1))
+        for path in self.segment_paths():
+            if os.path.basename(path) < keep_from:
+                os.remove(path)
+
+    # ----- appending -----
+
+    def append(self, event_type, *fields) -> int:
+        payload = encode_fields(SCHEMAS[event_type], fields)
+        with self._cond:
+            if self._closed:
+                raise ValueError("Event log is closed.")
+            self.last_lsn += 1
+            lsn = self.last_lsn
+            self._pending.append(encode_record(lsn, event_type, payload))
+            self._cond.notify_all()
+        return lsn
+
+    def wait(self, lsn):
+        """Block until the record with this LSN is durable."""
+        with self._cond:
+            while self.durable_lsn < lsn:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                batch_lsn = self.last_lsn
+            try:
+                with self._io_lock:
+                    records = []
+                    for record in batch:
+                        if isinstance(record, _SegmentSwitch):
+                            self._write(records)
+                            records = []
+                            self._file.close()
+                            self._file = open(self._segment_path(record.first_lsn), "ab")
+                            self.segment_first_lsn = record.first_lsn
+                        else:
+                            records.append(record)
+                    self._write(records)
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.durable_lsn = batch_lsn
+                self.flushes += 1
+                self._cond.notify_all()
+
+    def _write(self, records):
+        if records:
+            self._file.write(b"".join(records))
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+
+# ================= Event-sourced models =================
+
+class EventSourcedWorkplace:
+    """The three models behind one durable, ordered log of their mutations.
+
+    Mutations are applied and logged under one lock, so the log order is the
+    order in which they took effect. Only mutations that succeed are logged.
+    With wait=True (the default) a call returns once its record is durable;
+    threads calling concurrently share fsyncs.
+    """
+
+    def __init__(self, log, budget_tree=None, file_manager=None, task_db=None, checkpoint_every=50000):
+        self.log = log
+        self.budget_tree = budget_tree or BudgetTree()
+        self.file_manager = file_manager or FileManager()
+        self.task_db = task_db or TaskDatabase()
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_lsn = 0
+        self.replayed = 0
+        self._lock = threading.RLock()
+        self._checkpoint_lock = threading.Lock()  # one checkpoint file write at a time, outside _lock
+        self._since_checkpoint = 0
+        self._appliers = {
+            BUDGET_ADD_CATEGORY: self.budget_tree.add_category,
+            BUDGET_ADD_EXPENSE: self.budget_tree.add_expense,
+            FILES_CREATE_FOLDER: self.file_manager.create_folder,
+            FILES_ADD_FILE: self._apply_add_file,
+            FILES_MOVE_FILE: self.file_manager.move_file,
+            TASKS_ADD: self.task_db.add_node,
+            TASKS_CONNECT: self._apply_connect,
+        }
+
+    @classmethod
+    def open(cls, directory, sync=True, commit_delay=0.0, checkpoint_every=50000):
+        """Restore the models from the checkpoint and log tail in directory."""
+        workplace = cls(EventLog(directory, sync, commit_delay), checkpoint_every=checkpoint_every)
+        workplace._load_checkpoint()
+        # Replayed categories and expenses would re-print messages that were shown the first time
+        workplace.budget_tree.quiet = True
+        try:
+            for _lsn, event_type, fields in workplace.log.recover(workplace.checkpoint_lsn):
+                workplace._appliers[event_type](*fields)
+                workplace.replayed += 1
+        finally:
+            workplace.budget_tree.quiet = False
+        workplace._since_checkpoint = workplace.replayed
+        workplace.log.start()
+        return workplace
+
+    def close(self, checkpoint=False):
+        if checkpoint:
+            self.checkpoint()
+        self.log.close()
+
+    # ----- mutations -----
+
+    def _mutate(self, event_type, fields, wait, apply=None):
+        snapshot = None
+        with self._lock:
+            result = (apply or self._appliers[event_type])(*fields)
+            lsn = None
+            if result is not None and result is not False:
+                lsn = self.log.append(event_type, *fields)
+                self._since_checkpoint += 1
+                if self._since_checkpoint >= self.checkpoint_every:
+                    snapshot = self._snapshot()
+        if snapshot is not None:
+            self._write_checkpoint(*snapshot)
+        # Wait outside the lock so concurrent callers can join the same flush
+        if wait and lsn is not None:
+            self.log.wait(lsn)
+        return result
+
+    def add_category(self, parent_category, category, limit=None, wait=True):
+        return self._mutate(BUDGET_ADD_CATEGORY, (parent_category, category, limit), wait)
+
+    def add_expense(self, category, amount, wait=True):
+        return self._mutate(BUDGET_ADD_EXPENSE, (category, amount), wait)
+
+    def create_folder(self, folder_name, parent_folder_path=None, wait=True):
+        return self._mutate(FILES_CREATE_FOLDER, (folder_name, parent_folder_path), wait)
+
+    def add_file(self, file_name, parent_folder_path=None, size=0, wait=True):
+        created = to_micros(datetime.datetime.now())
+        return self._mutate(FILES_ADD_FILE, (file_name, parent_folder_path, size, created), wait)
+
+    def move_file(self, filename, source_folder_path, target_folder_path, wait=True):
+        return self._mutate(FILES_MOVE_FILE, (filename, source_folder_path, target_folder_path), wait)
+
+    def add_task(self, data, wait=True):
+        return self._mutate(TASKS_ADD, (str(data),), wait)
+
+    def connect_tasks(self, task_index, depends_on_index, wait=True):
+        return self._mutate(TASKS_CONNECT, (task_index, depends_on_index), wait)
+
+    def sync(self):
+        """Wait until every mutation so far is durable."""
+        self.log.wait(self.log.last_lsn)
+
+    # ----- appliers, shared by live calls and replay -----
+
+    def _apply_add_file(self, file_name, parent_folder_path, size, created):
+        if not self.file_manager.add_file(file_name, parent_folder_path, size):
+            return False
+        folder = self.file_manager._navigate_to_folder(parent_folder_path) if parent_folder_path else self.file_manager.root
+        folder.get_file(file_name).created_us = created
+        return True
+
+    def _apply_connect(self, task_index, depends_on_index):
+        tasks = self.task_db.tasks
+        if not (0 <= task_index < len(tasks) and 0 <= depends_on_index < len(tasks)):
+            print("Unknown task index.")
+            return False
+        tasks[task_index].add_connections(tasks[depends_on_index])
+        return True
+
+    # ----- checkpoints -----
+
+    def _budget_nodes(self):
+        stack = [self.budget_tree.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def _checkpoint_records(self):
+        positions = {}
+        for node in self._budget_nodes():
+            parent = getattr(node, "parent", None)
+            positions[id(node)] = len(positions)
+            yield CHECKPOINT_BUDGET_NODE, (positions[id(parent)] if parent is not None else -1,
+                                           node.category, node.limit, node.expenses)
+
+        positions = {id(self.file_manager.root): -1}
+        stack = [self.file_manager.root]
+        count = 0
+        while stack:
+            folder = stack.pop()
+            for file_node in folder.files:
+                yield CHECKPOINT_FILE, (positions[id(folder)], file_node.name, file_node.size, file_node.created_us)
+            for sub in folder.subfolders:
+                positions[id(sub)] = count
+                count += 1
+                yield CHECKPOINT_FOLDER, (positions[id(folder)], sub.name)
+            stack.extend(reversed(folder.subfolders))
+
+        tasks = self.task_db.tasks
+        indexes = {id(task): i for i, task in enumerate(tasks)}
+        for task in tasks:
+            yield CHECKPOINT_TASK, (str(task.data),)
+        for i, task in enumerate(tasks):
+            for dependency in task.connections:
+                if id(dependency) in indexes:
+                    yield CHECKPOINT_TASK_EDGE, (i, indexes[id(dependency)])
+
+    def checkpoint(self):
+        """Write the full state, start a fresh log segment and drop the old ones."""
+        with self._lock:
+            snapshot = self._snapshot()
+        self._write_checkpoint(*snapshot)
+
+    def _snapshot(self):
+        # Called under the workplace lock: encode the state and cut the log at the same LSN.
+        # The file I/O happens in _write_checkpoint, after the lock is released.
+        records = [encode_record(0, event_type, encode_fields(SCHEMAS[event_type], fields))
+                   for event_type, fields in self._checkpoint_records()]
+        self._since_checkpoint = 0
+        return self.log.start_segment(), records
+
+    def _write_checkpoint(self, lsn, records):
+        with self._checkpoint_lock:
+            if lsn <= self.checkpoint_lsn:
+                return  # a later snapshot was written first
+            path = os.path.join(self.log.directory, "checkpoint.bin")
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as out:
+                out.write(_CHECKPOINT_MAGIC + struct.pack("<Q", lsn))
+                for start in range(0, len(records), 4096):
+                    out.write(b"".join(records[start:start + 4096]))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, path)
+            if hasattr(os, "O_DIRECTORY"):
+                fd = os.open(self.log.directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self.log.drop_segments_through(lsn)
+            self.checkpoint_lsn = lsn
+
+    def _load_checkpoint(self):
+        path = os.path.join(self.log.directory, "checkpoint.bin")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(_CHECKPOINT_MAGIC):
+            raise ValueError(f"{path} is not a workplace checkpoint.")
+        offset = len(_CHECKPOINT_MAGIC)
+        self.checkpoint_lsn = struct.unpack_from("<Q", data, offset)[0]
+        budget_nodes = []
+        folders = []
+        root_folder = self.file_manager.root
+        tasks = self.task_db.tasks
+        for _lsn, event_type, fields, end in read_records(data, offset + 8):
+            if event_type == CHECKPOINT_BUDGET_NODE:
+                parent_index, category, limit, expenses = fields
+                if parent_index < 0:
+                    node = self.budget_tree.root
+                    node.category, node.limit = category, limit
+                else:
+                    node = BudgetNode(category, limit)
+                    node.parent = budget_nodes[parent_index]
+                    node.parent.add_child(node)
+                node.expenses = expenses
+                budget_nodes.append(node)
+            elif event_type == CHECKPOINT_FOLDER:
+                parent_index, name = fields
+                folder = FolderNode(name)
+                (folders[parent_index] if parent_index >= 0 else root_folder).add_folder(folder)
+                folders.append(folder)
+            elif event_type == CHECKPOINT_FILE:
+                folder_index, name, size, created = fields
+                folder = folders[folder_index] if folder_index >= 0 else root_folder
+                file_node = FileNode(name, size)
+                file_node.created_us = created
+                folder.add_file(file_node)
+            elif event_type == CHECKPOINT_TASK:
+                self.task_db.add_node(fields[0])
+            elif event_type == CHECKPOINT_TASK_EDGE:
+                tasks[fields[0]].add_connections(tasks[fields[1]])
+            offset = end
+        if offset != len(data):
+            raise ValueError(f"{path} is damaged at byte {offset}.")
+        self.budget_tree.reindex()  # budget nodes were attached without add_category
+
+
+# ================= Benchmark =================
+
+def run_benchmark(directory, operations=100000, threads=8, batch=64, sync=True):
+    """Append budget and file mutations from several threads and report durable ops/s.
+
+    Each thread issues `batch` mutations without waiting and then waits once
+    for all of them, the way a pipelining client acknowledges its requests.
+    """
+    workplace = EventSourcedWorkplace.open(directory, sync=sync)
+    for i in range(threads):
+        workplace.add_category(None, f"Bench {i}", 1e12)
+        workplace.create_folder(f"bench{i}")
+
+    def writer(i):
+        category = f"Bench {i}"
+        for j in range(operations // threads):
+            wait = (j + 1) % batch == 0
+            if j % 4 == 0:
+                workplace.add_file(f"file{j}", f"bench{i}", j, wait=wait)
+            else:
+                workplace.add_expense(category, 1, wait=wait)
+        workplace.sync()
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    flushes = workplace.log.flushes
+    workplace.close()
+    done = operations // threads * threads
+    print(f"{done} durable operations in {elapsed:.2f} s: {done / elapsed:,.0f} ops/s, {flushes} flushes")
+
+    start = time.perf_counter()
+    restored = EventSourcedWorkplace.open(directory, sync=sync)
+    print(f"Recovery: checkpoint at LSN {restored.checkpoint_lsn}, {restored.replayed} records replayed "
+          f"in {time.perf_counter() - start:.2f} s")
+    restored.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python EventLog.py DIRECTORY [operations] [threads] [batch]")
+        sys.exit(2)
+    run_benchmark(sys.argv[1], *(int(arg) for arg in sys.argv[2:5]))
@@ -1,19 +1,54 @@
 import datetime
+import sys
 from typing import List, Optional
 
+import Instrumentation
+
+# Nodes are kept small because trees can hold millions of them: __slots__ instead
+# of a per-instance dict, interned names so repeated names share one string, and
+# creation dates as integer microseconds. The node classes of the other model
+# modules (man_system_test, management_system3, Budget_user, TaskSystem) follow
+# the same scheme.
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def to_micros(moment: datetime.datetime) -> int:
+    """Microseconds since 1970-01-01 on the same (naive, local) clock as datetime.now()."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def from_micros(micros: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=micros)
+
+
 class FileNode:
+    __slots__ = ("name", "size", "created_us", "parent")
+
     def __init__(self, name: str, size: int = 0, creation_date: Optional[datetime.datetime] = None):
-        self.name = name
+        self.name = sys.intern(name) if type(name) is str else name
         self.size = size
-        self.creation_date = creation_date or datetime.datetime.now()
+        self.created_us = to_micros(creation_date or datetime.datetime.now())
         self.parent = None  # Will be set when added to a folder
 
+    @property
+    def creation_date(self) -> datetime.datetime:
+        return from_micros(self.created_us)
+
+    @creation_date.setter
+    def creation_date(self, value: datetime.datetime):
+        self.created_us = to_micros(value)
+
     def __repr__(self):
         return f"FileNode(name={self.name}, size={self.size}, created={self.creation_date})"
 
 class FolderNode:
+    __slots__ = ("name", "parent", "subfolders", "files")
+
     def __init__(self, name: str):
-        self.name = name
+        self.name = sys.intern(name) if type(name) is str else name
         self.parent = None  # set when this folder is nested in another folder
         self.subfolders: List['FolderNode'] = []
         self.files: List[FileNode] = []
@@ -92,21 +127,26 @@ class FolderNode:
 class FileManager:
     def __init__(self):
         self.root = FolderNode("root")
+        self.search_index = None  # optional SearchIndex.TrigramIndex kept in step with added and removed nodes
 
     def create_folder(self, folder_name: str, parent_folder_path: Optional[str] = None) -> bool:
         """Create a new folder inside the specified parent folder path or root if none given."""
         parent_folder = self._navigate_to_folder(parent_folder_path) if parent_folder_path else self.root
         if not parent_folder:
             print("Parent folder not found.")
+            Instrumentation.event("files.parent_not_found")
             return False
 
         # Check if folder with same name exists at this level
         if parent_folder.get_subfolder(folder_name) is not None:
             print("Folder already exists.")
+            Instrumentation.event("files.folder_exists")
             return False
 
         new_folder = FolderNode(folder_name)
         parent_folder.add_folder(new_folder)
+        if self.search_index is not None:
+            self.search_index.add("folder", new_folder, new_folder.name)
         return True
 
     def add_file(self, file_name: str, parent_folder_path: Optional[str] = None, size=0) -> bool:
@@ -114,15 +154,57 @@ class FileManager:
         parent_folder = self._navigate_to_folder(parent_folder_path) if parent_folder_path else self.root
         if not parent_folder:
             print("Parent folder not found.")
+            Instrumentation.event("files.parent_not_found")
             return False
 
         # Check if file with same name exists
         if parent_folder.get_file(file_name):
             print("File already exists.")
+            Instrumentation.event("files.file_exists")
             return False
 
         new_file = FileNode(name=file_name, size=size)
         parent_folder.add_file(new_file)
+        if self.search_index is not None:
+            self.search_index.add("file", new_file, new_file.name)
+        return True
+
+    def remove_file(self, filename: str, folder_path: Optional[str] = None) -> bool:
+        """Remove a file from the specified folder."""
+        folder = self._navigate_to_folder(folder_path) if folder_path else self.root
+        if not folder:
+            print("Folder not found.")
+            Instrumentation.event("files.invalid_folder")
+            return False
+
+        file_node = folder.get_file(filename)
+        if not file_node:
+            print("File not found in the folder.")
+            Instrumentation.event("files.file_not_found")
+            return False
+
+        folder.remove_file(filename)
+        if self.search_index is not None:
+            self.search_index.remove(file_node)
+        return True
+
+    def remove_folder(self, folder_path: str) -> bool:
+        """Remove a folder together with everything inside it."""
+        folder = self._navigate_to_folder(folder_path)
+        if not folder or folder is self.root:
+            print("Folder not found.")
+            Instrumentation.event("files.invalid_folder")
+            return False
+
+        folder.parent.remove_folder(folder.name)
+        if self.search_index is not None:
+            stack = [folder]
+            while stack:
+                current = stack.pop()
+                self.search_index.remove(current)
+                for f in current.files:
+                    self.search_index.remove(f)
+                stack.extend(current.subfolders)
         return True
 
     def move_file(self, filename: str, source_folder_path: str, target_folder_path: str) -> bool:
@@ -132,11 +214,13 @@ class FileManager:
 
         if not source_folder or not target_folder:
             print("Invalid source or target folder.")
+            Instrumentation.event("files.invalid_folder")
             return False
 
         file_node = source_folder.get_file(filename)
         if not file_node:
             print("File not found in the source folder.")
+            Instrumentation.event("files.file_not_found")
             return False
 
         # Remove from source
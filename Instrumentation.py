@@ -0,0 +1,310 @@
+import bisect
+import importlib
+import os
+import threading
+import time
+
+# Hot-path instrumentation for the workplace models.
+#
+#     import Instrumentation
+#     Instrumentation.enable()          # wrap the registered model methods
+#     ... run the workload ...
+#     Instrumentation.snapshot()        # counters, histograms, cache hit rates
+#     Instrumentation.write_prometheus("/var/lib/node_exporter/workplace.prom")
+#     Instrumentation.disable()         # put the original methods back
+#
+# enable() replaces the registered methods on their classes with timing
+# wrappers and disable() restores the originals, so while disabled the models
+# run their own unwrapped code. event(), cache_hit() and cache_miss() are the
+# only calls compiled into the models; they return after one flag check when
+# disabled.
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+# Upper bounds of the nodes-visited buckets, powers of four
+VISIT_BUCKETS = tuple(4 ** i for i in range(13))
+
+# (module, class path, methods, recursive methods). A recursive method calls
+# itself once per node, so the number of nested calls is the nodes visited.
+# TaskDatabase.detect_cycle recurses through a local function and only gets
+# latency.
+DEFAULT_TARGETS = [
+    ("FileSystem", "FileManager",
+     ("create_folder", "add_file", "move_file", "search_file", "_navigate_to_folder", "ensure_integrity"), ()),
+    ("FileSystem", "FolderNode", ("search_file", "search_folder"), ("search_file", "search_folder")),
+    # BudgetTree.find is a name lookup; search only walks the tree for duplicate names or nodes added directly
+    ("man_system_test", "BudgetTree", ("add_category", "add_expense", "find", "search"), ("search",)),
+    ("man_system_test", "FileManager", ("create_folder",), ()),
+    ("man_system_test", "TaskGraph", ("add_task",), ()),
+    ("management_system3", "BudgetTree", ("add_node", "calculate_total"), ("calculate_total",)),
+    ("management_system3", "FileManager", ("add_node", "reparent", "delete_subtree"), ()),
+    ("TaskSystem", "TaskDatabase", ("add_node", "detect_cycle"), ()),
+]
+
+_enabled = False
+_targets = list(DEFAULT_TARGETS)
+_patched = []  # (class, attribute, original function)
+_calls = threading.local()  # per-thread {op: [depth, visits]} for recursion tracking
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty or in +Inf)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Counters, histograms and cache statistics collected while instrumentation is enabled."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}      # (op, outcome) -> count
+        self.latency = {}    # op -> Histogram of seconds
+        self.visits = {}     # op -> Histogram of nodes visited per call
+        self.events = {}     # event name -> count
+        self.caches = {}     # cache name -> [hits, misses]
+
+    def record_call(self, op, outcome, seconds, visits=None):
+        with self.lock:
+            key = (op, outcome)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            histogram = self.latency.get(op)
+            if histogram is None:
+                histogram = self.latency[op] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            if visits is not None:
+                histogram = self.visits.get(op)
+                if histogram is None:
+                    histogram = self.visits[op] = Histogram(VISIT_BUCKETS)
+                histogram.observe(visits)
+
+    def record_event(self, name, count=1):
+        with self.lock:
+            self.events[name] = self.events.get(name, 0) + count
+
+    def record_cache(self, name, hit):
+        with self.lock:
+            stats = self.caches.setdefault(name, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            calls = {}
+            for (op, outcome), count in self.calls.items():
+                calls.setdefault(op, {})[outcome] = count
+            return {
+                "enabled": _enabled,
+                "calls": calls,
+                "latency_seconds": {op: h.as_dict() for op, h in self.latency.items()},
+                "nodes_visited": {op: h.as_dict() for op, h in self.visits.items()},
+                "events": dict(self.events),
+                "caches": {name: {"hits": hits, "misses": misses,
+                                  "hit_rate": hits / (hits + misses) if hits + misses else None}
+                           for name, (hits, misses) in self.caches.items()},
+            }
+
+
+metrics = Metrics()
+
+
+def _outcome(result):
+    # The models report failures by printing and returning False or None
+    if result is False:
+        return "false"
+    if result is None:
+        return "none"
+    return "ok"
+
+
+def _wrap(op, func, recursive):
+    perf_counter = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        if recursive:
+            frames = _calls.__dict__
+            state = frames.get(op)
+            if state is not None and state[0]:
+                # Nested call of the same operation: count the node, time only the outermost call
+                state[0] += 1
+                state[1] += 1
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    state[0] -= 1
+            state = frames[op] = [1, 1]
+        outcome = "error"
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            outcome = _outcome(result)
+            return result
+        finally:
+            elapsed = perf_counter() - start
+            if recursive:
+                state[0] = 0
+                metrics.record_call(op, outcome, elapsed, state[1])
+            else:
+                metrics.record_call(op, outcome, elapsed)
+
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    wrapper._instrumented = True  # enable() never wraps a wrapper, so disable() restores the real method
+    return wrapper
+
+
+def _resolve(module_name, class_path):
+    owner = importlib.import_module(module_name)
+    for part in class_path.split("."):
+        owner = getattr(owner, part)
+    return owner
+
+
+def register(module_name, class_path, methods, recursive=()):
+    """Add methods to instrument; takes effect on the next enable()."""
+    target = (module_name, class_path, tuple(methods), tuple(recursive))
+    if target not in _targets:
+        _targets.append(target)
+
+
+def enable():
+    """Wrap every registered method. Calling it again while enabled does nothing."""
+    global _enabled
+    if _enabled:
+        return
+    for module_name, class_path, methods, recursive in _targets:
+        cls = _resolve(module_name, class_path)
+        for name in methods:
+            original = cls.__dict__.get(name)
+            if original is None:
+                print(f"Instrumentation: {module_name}.{class_path} has no method '{name}'.")
+                continue
+            if getattr(original, "_instrumented", False):
+                continue  # listed by more than one target
+            op = f"{module_name}.{class_path}.{name}"
+            setattr(cls, name, _wrap(op, original, name in recursive))
+            _patched.append((cls, name, original))
+    _enabled = True
+
+
+def disable():
+    """Restore the original methods; collected metrics are kept."""
+    global _enabled
+    while _patched:
+        cls, name, original = _patched.pop()
+        setattr(cls, name, original)
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    global metrics
+    metrics = Metrics()
+
+
+def event(name, count=1):
+    """Count a notable model event, such as an exceeded budget."""
+    if _enabled:
+        metrics.record_event(name, count)
+
+
+def cache_hit(name):
+    if _enabled:
+        metrics.record_cache(name, True)
+
+
+def cache_miss(name):
+    if _enabled:
+        metrics.record_cache(name, False)
+
+
+def snapshot() -> dict:
+    return metrics.snapshot()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name, label, key, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label}="{_label(key)}",le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{label}="{_label(key)}",le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{label}="{_label(key)}"}} {histogram.sum}')
+    lines.append(f'{name}_count{{{label}="{_label(key)}"}} {histogram.count}')
+    return lines
+
+
+def to_prometheus() -> str:
+    """Render the metrics in the Prometheus text exposition format."""
+    m = metrics
+    with m.lock:
+        lines = ["# HELP workplace_calls_total Model operation calls by outcome.",
+                 "# TYPE workplace_calls_total counter"]
+        for (op, outcome), count in sorted(m.calls.items()):
+            lines.append(f'workplace_calls_total{{op="{_label(op)}",outcome="{outcome}"}} {count}')
+        lines += ["# HELP workplace_latency_seconds Model operation latency.",
+                  "# TYPE workplace_latency_seconds histogram"]
+        for op, histogram in sorted(m.latency.items()):
+            lines += _histogram_lines("workplace_latency_seconds", "op", op, histogram)
+        lines += ["# HELP workplace_nodes_visited Nodes visited per recursive search.",
+                  "# TYPE workplace_nodes_visited histogram"]
+        for op, histogram in sorted(m.visits.items()):
+            lines += _histogram_lines("workplace_nodes_visited", "op", op, histogram)
+        lines += ["# HELP workplace_events_total Notable model events.",
+                  "# TYPE workplace_events_total counter"]
+        for name, count in sorted(m.events.items()):
+            lines.append(f'workplace_events_total{{event="{_label(name)}"}} {count}')
+        lines += ["# HELP workplace_cache_requests_total Cache lookups by result.",
+                  "# TYPE workplace_cache_requests_total counter"]
+        for name, (hits, misses) in sorted(m.caches.items()):
+            lines.append(f'workplace_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+            lines.append(f'workplace_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write the metrics for the node_exporter textfile collector.
+
+    The file is written next to its final name and renamed into place, so the
+    collector never reads a half-written file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as out:
+        out.write(to_prometheus())
+    os.replace(temp_path, path)
@@ -0,0 +1,26 @@
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is only imported when one of its attributes is used.
+
+    Lets the model modules keep `tk.END` / `ttk.Treeview` style code in their GUI
+    classes without paying for (or requiring) tkinter when only the models are used.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__dict__["_lazy_target"])
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self.__dict__['_lazy_target']}'>"
+
+
+def lazy_import(name) -> LazyModule:
+    return LazyModule(name)
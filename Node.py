@@ -1,4 +1,6 @@
 class Node:
+    __slots__ = ("data",)
+
     def __init__(self, data=None):
         self.data = data
 
@@ -0,0 +1,232 @@
+import heapq
+from array import array
+from collections import Counter, namedtuple
+
+# Trigram inverted index over the names shown in the apps: file and folder
+# names, budget categories and task descriptions.
+#
+# Every entry is split into its overlapping three-character pieces
+# ("travel" -> tra, rav, ave, vel) and each piece maps to the ids of the
+# entries containing it. A substring query only looks at entries holding all
+# of the query's trigrams, and a fuzzy query ranks entries by how many
+# trigrams they share with it, so neither walks the trees. Queries of one or
+# two characters only find names that short: matching them as substrings would
+# mean scanning every trigram on each keystroke.
+#
+# Models notify the index from their add / remove methods when their
+# search_index attribute is set. Only names are indexed, never paths, so a
+# move needs no index update. The index is not thread safe; the apps update
+# and query it on their model worker thread.
+
+SearchResult = namedtuple("SearchResult", ["kind", "item", "text", "score"])
+
+
+def trigrams(text):
+    """Distinct trigrams of already lower-cased text; texts shorter than three characters are their own key."""
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._items = []     # entry id -> indexed object, None once removed
+        self._texts = []     # entry id -> original text
+        self._folded = []    # entry id -> lower-cased text
+        self._kinds = []     # entry id -> "file", "folder", "category", "task", ...
+        self._gram_counts = array("H")  # entry id -> number of distinct trigrams
+        self._postings = {}  # trigram -> array of entry ids, ascending
+        self._ids = {}       # id(item) -> entry id
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, item):
+        return id(item) in self._ids
+
+    # ----- updates -----
+
+    def add(self, kind, item, text):
+        """Index item under text; an item that is already indexed is re-indexed."""
+        if id(item) in self._ids:
+            self.remove(item)
+        text = str(text)
+        folded = text.lower()
+        if folded == text:
+            folded = text  # lower() made a copy; keep one string object per already lower-case name
+        entry = len(self._items)
+        self._items.append(item)
+        self._texts.append(text)
+        self._folded.append(folded)
+        self._kinds.append(kind)
+        grams = trigrams(folded)
+        self._gram_counts.append(min(len(grams), 0xFFFF))
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array("l", (entry,))
+            else:
+                posting.append(entry)
+        self._ids[id(item)] = entry
+        return entry
+
+    def remove(self, item) -> bool:
+        """Drop item from the index. Its posting entries are skipped until the next compaction."""
+        entry = self._ids.pop(id(item), None)
+        if entry is None:
+            return False
+        self._items[entry] = None
+        self._texts[entry] = None
+        self._folded[entry] = None
+        self._removed += 1
+        if self._removed > 1000 and self._removed > len(self._ids):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Drop removed entries from every per-entry list and renumber the rest."""
+        live = [entry for entry, item in enumerate(self._items) if item is not None]
+        new_ids = array("l", [-1]) * len(self._items)  # old entry id -> new entry id, -1 once removed
+        for new_entry, entry in enumerate(live):
+            new_ids[entry] = new_entry
+        self._items = [self._items[entry] for entry in live]
+        self._texts = [self._texts[entry] for entry in live]
+        self._folded = [self._folded[entry] for entry in live]
+        self._kinds = [self._kinds[entry] for entry in live]
+        self._gram_counts = array("H", (self._gram_counts[entry] for entry in live))
+        for gram in list(self._postings):
+            # Renumbering keeps the order, so postings stay ascending
+            posting = array("l", (new_ids[entry] for entry in self._postings[gram] if new_ids[entry] >= 0))
+            if posting:
+                self._postings[gram] = posting
+            else:
+                del self._postings[gram]
+        self._ids = {id(item): entry for entry, item in enumerate(self._items)}
+        self._removed = 0
+
+    # ----- queries -----
+
+    def _result(self, entry, score):
+        return SearchResult(self._kinds[entry], self._items[entry], self._texts[entry], score)
+
+    def _candidates(self, query):
+        """Entry ids that may contain query: a set, or a posting array when intersecting would not narrow it."""
+        if len(query) < 3:
+            # Names shorter than three characters are keyed by themselves, so this finds exactly those;
+            # a substring search for one or two characters would have to scan every trigram
+            return self._postings.get(query, ())
+        postings = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        if len(postings) == 1 or len(postings[0]) > 20000:
+            # Hashing a long posting costs more than checking each of its entries
+            return postings[0]
+        entries = set(postings[0])
+        # Intersect while it narrows cheaply; the substring check in search() is exact anyway
+        for posting in postings[1:3]:
+            if len(posting) > 8 * len(entries):
+                break
+            entries.intersection_update(posting)
+        return entries
+
+    def search(self, query, limit=20, kinds=None):
+        """Entries containing query (case-insensitive), best first.
+
+        Exact names rank first, then prefixes, then matches at a word start,
+        then any other substring; shorter names win ties. When enough names
+        start with the query the other matches are not ranked at all. Queries
+        shorter than three characters only find names equal to them.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        folded = self._folded
+        entries = self._candidates(query)
+        if kinds:
+            kind_of = self._kinds
+            entries = [entry for entry in entries if kind_of[entry] in kinds]
+        # Among names starting with the query the exact one is the shortest, so length alone ranks them
+        prefixed = [entry for entry in entries if (text := folded[entry]) is not None and text.startswith(query)]
+        if len(prefixed) >= limit:
+            best = heapq.nsmallest(limit, prefixed, key=lambda entry: len(folded[entry]))
+            return [self._result(entry, self._score(query, folded[entry], 0)) for entry in best]
+        ranked = [(0, len(folded[entry]), entry) for entry in prefixed]
+        for entry in entries:
+            text = folded[entry]
+            if text is None:
+                continue
+            position = text.find(query)
+            if position > 0:
+                ranked.append((1 if not text[position - 1].isalnum() else 2, len(text), entry))
+        return [self._result(entry, self._score(query, folded[entry], rank))
+                for rank, _length, entry in heapq.nsmallest(limit, ranked)]
+
+    @staticmethod
+    def _score(query, text, rank):
+        # 1.0 for the exact name; each later rank loses a quarter, longer names a little more
+        if text == query:
+            return 1.0
+        return round((2 - rank) / 4 + len(query) / len(text) / 4, 3)
+
+    def fuzzy(self, query, limit=20, kinds=None, min_similarity=0.5, max_counted=50000):
+        """Entries sharing trigrams with query, for misspelled queries.
+
+        The score is the share of the query's trigrams found in the entry, so
+        a misspelled word still matches inside a longer name; entries with
+        fewer trigrams overall win ties. Candidates come from the rarest of
+        the query's trigrams, counting at most about max_counted posting
+        entries, and are then scored against all of them.
+        """
+        query = query.strip().lower()
+        grams = trigrams(query)
+        if not grams:
+            return []
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+        shared = Counter()
+        counted = 0
+        for posting in postings:
+            if counted and counted + len(posting) > max_counted:
+                break
+            shared.update(posting)
+            counted += len(posting)
+        needed = min_similarity * len(grams)
+        folded, counts = self._folded, self._gram_counts
+        scored = []
+        for entry, _common in shared.most_common(limit * 20):
+            text = folded[entry]
+            if text is None or (kinds and self._kinds[entry] not in kinds):
+                continue
+            common = sum(gram in text for gram in grams)
+            if common >= needed:
+                jaccard = common / (len(grams) + counts[entry] - common)
+                scored.append((-(common / len(grams)), -jaccard, entry))
+        return [self._result(entry, round(-similarity, 3))
+                for similarity, _jaccard, entry in heapq.nsmallest(limit, scored)]
+
+    def query(self, text, limit=20, kinds=None):
+        """Substring matches first, topped up with fuzzy matches for misspelled queries."""
+        results = self.search(text, limit, kinds)
+        if len(results) < limit:
+            seen = {id(result.item) for result in results}
+            for result in self.fuzzy(text, limit, kinds):
+                if id(result.item) not in seen:
+                    # Fuzzy scores stay below substring scores so those rank first
+                    results.append(result._replace(score=round(result.score * 0.25, 3)))
+                    if len(results) == limit:
+                        break
+        return results
+
+
+def item_path(item, name_of):
+    """Slash-separated path of an item through its parent links, for showing results."""
+    parts = []
+    while item is not None:
+        parts.append(str(name_of(item)))
+        item = getattr(item, "parent", None)
+    return "/".join(reversed(parts))
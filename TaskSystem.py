@@ -3,10 +3,13 @@ from Node import Node
 class TaskDatabase:
     def __init__(self):
         self.tasks = []
+        self.search_index = None  # optional SearchIndex.TrigramIndex notified of new tasks
 
     def add_node(self, data):
         s = TaskNode(data)
         self.tasks.append(s)
+        if self.search_index is not None:
+            self.search_index.add("task", s, data)
         return s
 
     def __str__(self):
@@ -49,6 +52,8 @@ class TaskDatabase:
 
 
 class TaskNode(Node):
+    __slots__ = ("connections",)
+
     def __init__(self, data):
         super().__init__(data)
         self.connections = []
@@ -0,0 +1,118 @@
+import queue
+import sys
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+
+def _run_callback(root, fn, *args):
+    """Call fn on the Tk thread; an exception is reported the way Tk reports callback errors."""
+    try:
+        fn(*args)
+    except Exception:
+        root.report_callback_exception(*sys.exc_info())
+
+
+class BackgroundWorker:
+    """Runs model operations off the Tk main thread.
+
+    Jobs run one at a time on a single worker thread, so model mutations stay
+    serialized exactly as they were when they ran inline. Results travel back
+    through a queue that the Tk thread drains with after(); callbacks therefore
+    always run on the Tk thread, where touching widgets is safe.
+    """
+
+    def __init__(self, root, poll_interval=15, max_callbacks_per_poll=100):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.max_callbacks_per_poll = max_callbacks_per_poll
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._results: "queue.Queue" = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="model-worker", daemon=True)
+        self._thread.start()
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, fn: Callable, *args, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None):
+        """Queue fn(*args); on_done(result) or on_error(exception) runs on the Tk thread."""
+        self._jobs.put((fn, args, on_done, on_error))
+
+    def submit_chunks(self, fn: Callable, items: Iterable, chunk_size=1000,
+                      on_progress: Optional[Callable] = None, on_done: Optional[Callable] = None,
+                      on_error: Optional[Callable] = None):
+        """Run fn(item) for every item, reporting progress back after each chunk."""
+        def run():
+            done = 0
+            for item in items:
+                fn(item)
+                done += 1
+                if on_progress is not None and done % chunk_size == 0:
+                    self._results.put((on_progress, done))
+            return done
+        self.submit(run, on_done=on_done, on_error=on_error)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            fn, args, on_done, on_error = job
+            try:
+                result = fn(*args)
+            except Exception as e:
+                if on_error is not None:
+                    self._results.put((on_error, e))
+                else:
+                    print(f"Background job {getattr(fn, '__name__', fn)} failed: {e}")
+            else:
+                if on_done is not None:
+                    self._results.put((on_done, result))
+
+    def _poll(self):
+        # Deliver a bounded number of callbacks per tick so the UI keeps handling events
+        try:
+            for _ in range(self.max_callbacks_per_poll):
+                try:
+                    callback, value = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                _run_callback(self.root, callback, value)
+        finally:
+            # Re-arm even if reporting failed, or every later result would be dropped
+            if not self._stopped:
+                self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def shutdown(self):
+        self._stopped = True
+        self._jobs.put(None)
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+
+
+class RefreshScheduler:
+    """Coalesces view refreshes so a burst of mutations renders once per frame.
+
+    Refreshes are registered under a key; scheduling the same key again before
+    the frame is drawn replaces the earlier request instead of adding another.
+    """
+
+    def __init__(self, root, frame_ms=16):
+        self.root = root
+        self.frame_ms = frame_ms
+        self._pending: Dict[object, Callable] = {}
+        self._after_id = None
+
+    def schedule(self, key, fn: Callable):
+        self._pending[key] = fn
+        if self._after_id is None:
+            self._after_id = self.root.after(self.frame_ms, self.flush)
+
+    def flush(self):
+        """Run all pending refreshes now."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        pending, self._pending = self._pending, {}
+        for fn in pending.values():
+            _run_callback(self.root, fn)
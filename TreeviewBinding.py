@@ -0,0 +1,357 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+PLACEHOLDER_TEXT = "Loading..."
+
+
+class ConcatSequence:
+    """Read-only view of several sequences one after another.
+
+    Lets children_of present e.g. a folder's subfolders followed by its files
+    without copying both lists, so a page is sliced straight from the model.
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts)
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            result = []
+            for part in self.parts:
+                size = len(part)
+                if start < size and stop > 0:
+                    result.extend(part[max(start, 0):min(stop, size)])
+                start -= size
+                stop -= size
+            return result
+        if index < 0:
+            index += len(self)
+        for part in self.parts:
+            if 0 <= index < len(part):
+                return part[index]
+            index -= len(part)
+        raise IndexError("ConcatSequence index out of range")
+
+
+class TreeviewBinding:
+    """Keeps a ttk.Treeview in step with a model tree by touching only changed rows.
+
+    The binding remembers which Treeview item shows which model node, so after
+    a mutation the app inserts, updates or deletes just the affected rows
+    instead of clearing the widget and re-inserting the whole model.
+
+    With lazy=True only rows the user can see are created: a node with
+    children gets a single placeholder child, its real children are inserted
+    when it is opened (<<TreeviewOpen>>), and at most page_size children are
+    inserted at a time, followed by a "... N more" row that loads the next
+    page when selected.
+    """
+
+    def __init__(self, tree_view, children_of: Callable[[object], Iterable], text_of: Callable[[object], str],
+                 open_items=True, lazy=False, page_size=200, parent_of: Optional[Callable] = None):
+        self.tree_view = tree_view
+        self.children_of = children_of  # node -> iterable of child nodes
+        self.text_of = text_of  # node -> row text
+        self.open_items = open_items
+        self.lazy = lazy
+        self.page_size = page_size
+        self.parent_of = parent_of  # node -> model parent, lets unloaded nodes update their ancestors
+        self._item_ids: Dict[int, str] = {}  # id(node) -> Treeview item id
+        self._nodes: Dict[str, object] = {}  # item id -> node (keeps ids stable)
+        self._texts: Dict[str, str] = {}  # item id -> text currently shown
+        self._roots: List[object] = []
+        self._placeholders: Dict[str, str] = {}  # item id -> placeholder child of an unloaded item
+        self._loaded: Dict[str, int] = {}  # item id -> number of children inserted so far
+        self._more_rows: Dict[str, str] = {}  # "... more" row -> item id it pages
+        self._more_of: Dict[str, str] = {}  # item id -> its "... more" row
+        if lazy:
+            tree_view.bind("<<TreeviewOpen>>", self._on_open)
+            tree_view.bind("<<TreeviewSelect>>", self._on_select)
+
+    def __contains__(self, node):
+        return id(node) in self._item_ids
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def item_id(self, node) -> Optional[str]:
+        return self._item_ids.get(id(node))
+
+    def node_of(self, item_id):
+        return self._nodes.get(item_id)
+
+    def _insert_row(self, node, parent_item, index):
+        item_id = self._item_ids.get(id(node))
+        if item_id is not None:
+            return item_id  # already shown, e.g. inserted before its page was loaded
+        text = self.text_of(node)
+        item_id = self.tree_view.insert(parent_item, index, text=text, open=self.open_items and not self.lazy)
+        self._item_ids[id(node)] = item_id
+        self._nodes[item_id] = node
+        self._texts[item_id] = text
+        if self.lazy and self.children_of(node):
+            self._placeholders[item_id] = self.tree_view.insert(item_id, "end", text=PLACEHOLDER_TEXT)
+        return item_id
+
+    def _children(self, item_id) -> Sequence:
+        if item_id == "":
+            return self._roots
+        children = self.children_of(self._nodes[item_id])
+        # Sequences are paged in place; copying a huge child list on every page would cost O(n)
+        if hasattr(children, "__getitem__") and hasattr(children, "__len__"):
+            return children
+        return list(children)
+
+    # ----- lazy loading -----
+
+    def _on_open(self, event=None):
+        item_id = self.tree_view.focus()
+        if item_id in self._placeholders:
+            self.load_children(item_id)
+
+    def _on_select(self, event=None):
+        for item_id in self.tree_view.selection():
+            if item_id in self._more_rows:
+                self.load_more(self._more_rows[item_id])
+
+    def is_loaded(self, item_id) -> bool:
+        return item_id not in self._placeholders
+
+    def load_children(self, item_id):
+        """Replace an item's placeholder with the first page of its children."""
+        placeholder = self._placeholders.pop(item_id, None)
+        if placeholder is not None:
+            self.tree_view.delete(placeholder)
+        self._loaded[item_id] = 0
+        self.load_more(item_id)
+
+    def load_more(self, item_id):
+        """Insert the next page of an item's children."""
+        more_row = self._more_of.pop(item_id, None)
+        if more_row is not None:
+            del self._more_rows[more_row]
+            self.tree_view.delete(more_row)
+        children = self._children(item_id)
+        start = self._loaded.get(item_id, 0)
+        end = min(start + self.page_size, len(children))
+        for child in children[start:end]:
+            self._insert_row(child, item_id, "end")
+        self._loaded[item_id] = end
+        if end < len(children):
+            more_row = self.tree_view.insert(item_id, "end", text=f"... {len(children) - end} more")
+            self._more_rows[more_row] = item_id
+            self._more_of[item_id] = more_row
+
+    def refresh_more(self, node) -> bool:
+        """Recount a paged node's "... N more" row after its model children changed off screen."""
+        item_id = "" if node is None else self._item_ids.get(id(node))
+        if item_id is None or item_id not in self._more_of:
+            return False
+        self._relabel_more(item_id)
+        return True
+
+    def _relabel_more(self, item_id):
+        more_row = self._more_of.get(item_id)
+        if more_row is None:
+            return
+        remaining = len(self._children(item_id)) - self._loaded[item_id]
+        if remaining > 0:
+            self.tree_view.item(more_row, text=f"... {remaining} more")
+        else:
+            del self._more_of[item_id]
+            del self._more_rows[more_row]
+            self.tree_view.delete(more_row)
+
+    # ----- incremental updates -----
+
+    def insert(self, node, parent_node=None, index="end") -> Optional[str]:
+        """Show a new node below parent_node (None for a top-level row).
+
+        Returns None when the parent's children are not on screen yet; the
+        node then appears when the parent is opened or paged. A node that
+        already has a row is left alone: with deferred inserts, opening the
+        parent may have loaded it from the model first.
+        """
+        item_id = self._item_ids.get(id(node))
+        if item_id is not None:
+            return item_id
+        if parent_node is None:
+            parent_item = ""
+            self._roots.append(node)
+        else:
+            parent_item = self._item_ids.get(id(parent_node))
+            if parent_item is None:
+                return None
+
+        if not self.lazy:
+            item_id = self._insert_row(node, parent_item, index)
+            stack = [(node, item_id)]
+            while stack:
+                current, current_item = stack.pop()
+                for child in self.children_of(current):
+                    stack.append((child, self._insert_row(child, current_item, "end")))
+            return item_id
+
+        if parent_item in self._placeholders:
+            return None
+        if parent_item in self._more_of and (index == "end" or index >= self._loaded[parent_item]):
+            # Paged list: the node is past the loaded rows, only the count changes
+            self._relabel_more(parent_item)
+            return None
+        # Inside the loaded rows: show it there, so the next page still starts at the right child
+        self._loaded[parent_item] = self._loaded.get(parent_item, 0) + 1
+        return self._insert_row(node, parent_item, index)
+
+    def update(self, node) -> bool:
+        """Refresh the text of one row; returns False when nothing had to change."""
+        item_id = self._item_ids.get(id(node))
+        if item_id is None:
+            return False
+        text = self.text_of(node)
+        if self._texts[item_id] == text:
+            return False
+        self.tree_view.item(item_id, text=text)
+        self._texts[item_id] = text
+        return True
+
+    def ancestors(self, node) -> Iterator[object]:
+        """Yield the model nodes above node, nearest first."""
+        if self.parent_of is not None:
+            parent = self.parent_of(node)
+            while parent is not None:
+                yield parent
+                parent = self.parent_of(parent)
+            return
+        item_id = self._item_ids.get(id(node))
+        if item_id is None:
+            return
+        item_id = self.tree_view.parent(item_id)
+        while item_id:
+            yield self._nodes[item_id]
+            item_id = self.tree_view.parent(item_id)
+
+    def update_path(self, node):
+        """Refresh node and every visible row along its ancestor path."""
+        self.update(node)
+        for ancestor in list(self.ancestors(node)):
+            self.update(ancestor)
+
+    def _forget(self, item_id):
+        stack = [item_id]
+        while stack:
+            current = stack.pop()
+            node = self._nodes.pop(current, None)
+            if node is not None:
+                del self._item_ids[id(node)]
+            self._texts.pop(current, None)
+            self._placeholders.pop(current, None)
+            self._loaded.pop(current, None)
+            more_row = self._more_of.pop(current, None)
+            if more_row is not None:
+                del self._more_rows[more_row]
+            stack.extend(self.tree_view.get_children(current))
+
+    def delete(self, node) -> bool:
+        """Remove node's row and its subtree."""
+        item_id = self._item_ids.get(id(node))
+        if item_id is None:
+            return False
+        parent_item = self.tree_view.parent(item_id)
+        if parent_item in self._loaded:
+            self._loaded[parent_item] -= 1
+        if parent_item == "" and node in self._roots:
+            self._roots.remove(node)
+        self._forget(item_id)
+        self.tree_view.delete(item_id)
+        self._relabel_more(parent_item)
+        return True
+
+    def move(self, node, new_parent_node=None, index="end") -> bool:
+        """Show node under its new parent; returns False when that parent is not on screen."""
+        item_id = self._item_ids.get(id(node))
+        if item_id is None:
+            return False
+        parent_item = ""
+        if new_parent_node is not None:
+            parent_item = self._item_ids.get(id(new_parent_node))
+            if parent_item is None:
+                return False
+        if self.lazy:
+            # Paging counts and placeholders are kept by delete and insert
+            self.delete(node)
+            return self.insert(node, new_parent_node, index) is not None
+        old_parent_item = self.tree_view.parent(item_id)
+        if old_parent_item == "" and node in self._roots:
+            self._roots.remove(node)
+        if parent_item == "":
+            self._roots.append(node)
+        self.tree_view.move(item_id, parent_item, index)
+        return True
+
+    def sync_children(self, node):
+        """Diff node's model children against its rows when the exact change is unknown."""
+        item_id = self._item_ids[id(node)]
+        if self.lazy:
+            # Drop the loaded rows; they are recreated on demand
+            for child_item in self.tree_view.get_children(item_id):
+                self._forget(child_item)
+            self.tree_view.delete(*self.tree_view.get_children(item_id))
+            self._loaded.pop(item_id, None)
+            more_row = self._more_of.pop(item_id, None)
+            if more_row is not None:
+                del self._more_rows[more_row]
+            self._placeholders.pop(item_id, None)
+            if self.children_of(node):
+                self._placeholders[item_id] = self.tree_view.insert(item_id, "end", text=PLACEHOLDER_TEXT)
+                if self.tree_view.item(item_id, "open"):
+                    self.load_children(item_id)
+            return
+
+        children = list(self.children_of(node))
+        wanted = {id(child) for child in children}
+        for child_item in self.tree_view.get_children(item_id):
+            child = self._nodes.get(child_item)
+            if child is None or id(child) not in wanted:
+                self._forget(child_item)
+                self.tree_view.delete(child_item)
+        for index, child in enumerate(children):
+            if id(child) in self._item_ids:
+                self.update(child)
+            else:
+                self.insert(child, node, index)
+
+    def rebuild(self, roots: Iterable):
+        """Full redraw; only needed for the initial population."""
+        self.tree_view.delete(*self.tree_view.get_children())
+        self._item_ids.clear()
+        self._nodes.clear()
+        self._texts.clear()
+        self._placeholders.clear()
+        self._loaded.clear()
+        self._more_rows.clear()
+        self._more_of.clear()
+        if not self.lazy:
+            self._roots = []
+            for root in roots:
+                self.insert(root)
+            return
+
+        self._roots = list(roots)
+        self.load_children("")
+        if self.open_items:
+            # Expand the top level so the first layer is visible straight away
+            for item_id in self.tree_view.get_children(""):
+                if item_id in self._placeholders:
+                    self.load_children(item_id)
+                    self.tree_view.item(item_id, open=True)
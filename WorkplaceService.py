@@ -0,0 +1,477 @@
+"""Asyncio JSON-lines service around the budget, file and task models.
+
+Protocol: one JSON object per line in each direction.
+
+    request:  {"id": 7, "op": "budget.add_expense", "args": {"category": "Food", "amount": 12.5}}
+    batch:    {"id": 8, "batch": [{"op": ...}, {"op": ...}]}
+    response: {"id": 7, "ok": true, "result": ...}  or  {"id": 7, "ok": false, "error": "..."}
+
+Clients may pipeline: many requests can be in flight on one connection and
+responses come back as they complete, matched by id. Reads on a subsystem run
+concurrently; writes to a subsystem are exclusive. Each connection has a
+bounded number of requests in flight, so a client that sends faster than the
+server answers stops being read until responses drain (backpressure).
+
+    python -m WorkplaceService serve --port 8765
+    python -m WorkplaceService loadgen --port 8765 --connections 8 --requests 20000
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+from FileSystem import FileManager
+from TaskSystem import TaskDatabase
+from man_system_test import BudgetTree
+
+SUBSYSTEMS = ("budget", "files", "tasks")  # also the lock acquisition order
+# Longest request or response line; asyncio's 64 KiB default is too small for large batches
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class ReadWriteLock:
+    """Asyncio lock allowing many readers or one writer, granted in FIFO order.
+
+    reserve() takes a place in the queue immediately, without awaiting, so the
+    order in which requests are read is the order in which they get the lock.
+    Uncontended reservations are granted on the spot and cost no scheduler
+    round trip.
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiters = collections.deque()  # (is_write, future)
+
+    def _can_grant(self, write):
+        return not self._writer and (self._readers == 0 or not write)
+
+    def _grant(self, write):
+        if write:
+            self._writer = True
+        else:
+            self._readers += 1
+
+    def reserve(self, write):
+        """Return None if granted now, otherwise a future that completes once granted."""
+        if not self._waiters and self._can_grant(write):
+            self._grant(write)
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((write, future))
+        return future
+
+    def release(self, write):
+        if write:
+            self._writer = False
+        else:
+            self._readers -= 1
+        while self._waiters:
+            waiting_write, future = self._waiters[0]
+            if future.cancelled():
+                self._waiters.popleft()
+                continue
+            if not self._can_grant(waiting_write):
+                break
+            self._waiters.popleft()
+            self._grant(waiting_write)
+            future.set_result(None)
+
+
+class ServiceError(Exception):
+    pass
+
+
+async def _read_line(reader):
+    """Next line including its newline, b"" at EOF, or None for a line over the reader's limit.
+
+    An overlong line is consumed up to its newline, so the next request
+    starts on a line boundary.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial  # last line without a newline, or b"" at EOF
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)  # still buffered; drop it
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+class WorkplaceService:
+    def __init__(self, budget_tree=None, file_manager=None, task_db=None, max_inflight=64,
+                 max_line_bytes=MAX_LINE_BYTES):
+        self.budget_tree = budget_tree or BudgetTree()
+        self.file_manager = file_manager or FileManager()
+        self.task_db = task_db or TaskDatabase()
+        self.max_inflight = max_inflight
+        self.max_line_bytes = max_line_bytes
+        self.locks = {name: ReadWriteLock() for name in SUBSYSTEMS}
+        # op name -> (subsystem, is_write, is_heavy, handler(args)). Heavy ops walk a
+        # whole tree or graph and run on a worker thread so they never stall the
+        # event loop; the rest are cheap enough to run inline.
+        self.ops = {
+            "budget.add_category": ("budget", True, True, self._budget_add_category),
+            "budget.add_expense": ("budget", True, True, self._budget_add_expense),
+            "budget.get": ("budget", False, True, self._budget_get),
+            "budget.total": ("budget", False, True, self._budget_total),
+            "files.create_folder": ("files", True, False, self._files_create_folder),
+            "files.add_file": ("files", True, False, self._files_add_file),
+            "files.move_file": ("files", True, False, self._files_move_file),
+            "files.search": ("files", False, True, self._files_search),
+            "files.list": ("files", False, False, self._files_list),
+            "tasks.add": ("tasks", True, False, self._tasks_add),
+            "tasks.connect": ("tasks", True, False, self._tasks_connect),
+            "tasks.detect_cycle": ("tasks", False, True, self._tasks_detect_cycle),
+            "tasks.count": ("tasks", False, False, lambda args: len(self.task_db.tasks)),
+        }
+        self.server = None
+
+    # ----- handlers (run while holding the subsystem lock) -----
+
+    def _budget_node(self, category):
+        node = self.budget_tree.search(self.budget_tree.root, category)
+        if node is None:
+            raise ServiceError(f"Category '{category}' not found.")
+        return node
+
+    def _budget_add_category(self, args):
+        node = self.budget_tree.add_category(args.get("parent"), args["category"], args.get("limit"))
+        if node is None:
+            raise ServiceError(f"Parent category '{args.get('parent')}' not found.")
+        return node.category
+
+    def _budget_add_expense(self, args):
+        node = self.budget_tree.add_expense(args["category"], float(args["amount"]))
+        if node is None:
+            raise ServiceError(f"Cannot add expense to category '{args['category']}'.")
+        return node.expenses
+
+    def _budget_get(self, args):
+        node = self._budget_node(args["category"])
+        return {"category": node.category, "limit": node.limit, "expenses": node.expenses,
+                "children": [child.category for child in node.children]}
+
+    def _budget_total(self, args):
+        # Parents in this tree carry the sum of their children's expenses, so the
+        # subtree total is the sum over its leaf categories
+        node = self._budget_node(args.get("category") or self.budget_tree.root.category)
+        total = 0
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.children:
+                stack.extend(current.children)
+            else:
+                total += current.expenses
+        return total
+
+    def _files_create_folder(self, args):
+        if not self.file_manager.create_folder(args["name"], args.get("parent")):
+            raise ServiceError(f"Could not create folder '{args['name']}'.")
+        return True
+
+    def _files_add_file(self, args):
+        if not self.file_manager.add_file(args["name"], args.get("parent"), args.get("size", 0)):
+            raise ServiceError(f"Could not add file '{args['name']}'.")
+        return True
+
+    def _files_move_file(self, args):
+        if not self.file_manager.move_file(args["name"], args["source"], args["target"]):
+            raise ServiceError(f"Could not move file '{args['name']}'.")
+        return True
+
+    def _files_search(self, args):
+        found = self.file_manager.search_file(args["name"])
+        if found is None:
+            return None
+        return {"name": found.name, "size": found.size, "created": found.creation_date.isoformat()}
+
+    def _files_list(self, args):
+        folder = self.file_manager._navigate_to_folder(args.get("path"))
+        if folder is None:
+            raise ServiceError(f"Folder '{args.get('path')}' not found.")
+        folders, files = folder.list_contents()
+        return {"folders": folders, "files": files}
+
+    def _tasks_add(self, args):
+        self.task_db.add_node(args["data"])
+        return len(self.task_db.tasks) - 1
+
+    def _tasks_connect(self, args):
+        tasks = self.task_db.tasks
+        indexes = (args["task"], args["depends_on"])
+        # Negative indexes would count from the end of the list instead of failing
+        if not all(type(index) is int and 0 <= index < len(tasks) for index in indexes):
+            raise ServiceError("Unknown task index.")
+        task, dependency = tasks[indexes[0]], tasks[indexes[1]]
+        task.add_connections(dependency)
+        return True
+
+    def _tasks_detect_cycle(self, args):
+        return self.task_db.detect_cycle()
+
+    # ----- dispatch -----
+
+    def _lookup(self, request):
+        op = request.get("op") if isinstance(request, dict) else None
+        if op not in self.ops:
+            raise ServiceError(f"Unknown op '{op}'.")
+        return self.ops[op]
+
+    def _run_one(self, handler, args):
+        if not isinstance(args, dict):
+            return {"ok": False, "error": "Bad arguments: args must be a JSON object."}
+        try:
+            return {"ok": True, "result": handler(args)}
+        except ServiceError as e:
+            return {"ok": False, "error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return {"ok": False, "error": f"Bad arguments: {e!r}"}
+
+    def prepare(self, request):
+        """Validate a request and queue for its locks; returns (reservations, job, offload).
+
+        Must be called without awaiting in between requests: reservations for
+        several locks are then taken atomically, so every lock sees requests in
+        the same order, which keeps pipelined requests ordered and rules out
+        deadlocks between batches.
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("batch", []), list):
+            raise ServiceError("Request must be a JSON object.")
+        requests = request["batch"] if "batch" in request else [request]
+        plan = [(self._lookup(r), {} if r.get("args") is None else r["args"]) for r in requests]
+        modes = {}
+        for (subsystem, is_write, _, _), _args in plan:
+            modes[subsystem] = modes.get(subsystem, False) or is_write
+        reservations = [(subsystem, modes[subsystem], self.locks[subsystem].reserve(modes[subsystem]))
+                        for subsystem in SUBSYSTEMS if subsystem in modes]
+        if "batch" in request:
+            # A batch runs in order with one thread hop, holding each involved lock once
+            def job():
+                return {"ok": True, "result": [self._run_one(handler, args) for (_, _, _, handler), args in plan]}
+            return reservations, job, True
+        (_, _, is_heavy, handler), args = plan[0]
+        return reservations, lambda: self._run_one(handler, args), is_heavy
+
+    async def run_prepared(self, reservations, job, offload):
+        try:
+            for _subsystem, _write, future in reservations:
+                if future is not None:
+                    await future
+            if offload:
+                return await asyncio.to_thread(job)
+            return job()
+        finally:
+            for subsystem, write, future in reservations:
+                if future is None or (future.done() and not future.cancelled()):
+                    self.locks[subsystem].release(write)
+                else:
+                    future.cancel()  # never granted; the lock skips it
+
+    async def execute(self, request):
+        """Run one request or a batch and return the response body (without id)."""
+        try:
+            prepared = self.prepare(request)
+        except ServiceError as e:
+            return {"ok": False, "error": str(e)}
+        return await self.run_prepared(*prepared)
+
+    async def handle_connection(self, reader, writer):
+        responses = asyncio.Queue(maxsize=self.max_inflight)
+        inflight = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+
+        async def respond(request_id, prepared):
+            try:
+                body = await self.run_prepared(*prepared)
+            except Exception as e:  # keep the connection alive on handler bugs
+                body = {"ok": False, "error": f"Internal error: {e!r}"}
+            body["id"] = request_id
+            await responses.put(body)
+
+        async def write_responses():
+            while True:
+                body = await responses.get()
+                if body is None:
+                    return
+                writer.write((json.dumps(body) + "\n").encode())
+                inflight.release()
+                if responses.empty():
+                    await writer.drain()  # flush once per burst of responses
+
+        writer_task = asyncio.create_task(write_responses())
+        # If the writer dies (client gone), nothing drains responses or frees in-flight slots,
+        # so the reading loop and the responders would wait forever: stop them with it
+        handler_task = asyncio.current_task()
+        writer_task.add_done_callback(
+            lambda done: done.cancelled() or done.exception() is None or handler_task.cancel())
+        try:
+            while True:
+                await inflight.acquire()  # stop reading while too many requests are pending
+                line = await _read_line(reader)
+                if line is None:
+                    await responses.put({"id": None, "ok": False,
+                                         "error": f"Request line longer than {self.max_line_bytes} bytes."})
+                    continue
+                if not line:
+                    inflight.release()
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:  # JSONDecodeError, or UnicodeDecodeError for bytes that are not UTF-8
+                    await responses.put({"id": None, "ok": False, "error": "Invalid JSON."})
+                    continue
+                try:
+                    prepared = self.prepare(request)
+                except ServiceError as e:
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    await responses.put({"id": request_id, "ok": False, "error": str(e)})
+                    continue
+                task = asyncio.create_task(respond(request.get("id"), prepared))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            await responses.put(None)
+            await writer_task
+        except (asyncio.CancelledError, ConnectionError):
+            pass  # server shutting down or client gone; nothing left to answer
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer_task.cancel()
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=self.max_line_bytes)
+        return self.server
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# ================= Load generator =================
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _request_mix(i):
+    """Mostly reads with some writes, spread over the three subsystems."""
+    kind = i % 10
+    if kind == 0:
+        return {"op": "budget.add_expense", "args": {"category": f"Dept{i % 50}", "amount": 1}}
+    if kind == 1:
+        return {"op": "files.add_file", "args": {"name": f"file{i}.txt", "parent": f"Folder{i % 50}"}}
+    if kind == 2:
+        return {"op": "tasks.add", "args": {"data": f"task {i}"}}
+    if kind < 6:
+        return {"op": "budget.get", "args": {"category": f"Dept{i % 50}"}}
+    if kind < 9:
+        return {"op": "files.list", "args": {"path": f"Folder{i % 50}"}}
+    return {"op": "tasks.count"}
+
+
+async def _setup_load_data(host, port):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    batch = [{"op": "budget.add_category", "args": {"parent": None, "category": f"Dept{i}", "limit": 1000}}
+             for i in range(50)]
+    batch += [{"op": "files.create_folder", "args": {"name": f"Folder{i}"}} for i in range(50)]
+    writer.write((json.dumps({"id": 0, "batch": batch}) + "\n").encode())
+    await writer.drain()
+    await reader.readline()
+    writer.close()
+
+
+async def _client(host, port, count, pipeline, offset, latencies):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    sent_at = {}
+    window = asyncio.Semaphore(pipeline)
+
+    async def read_responses():
+        for _ in range(count):
+            body = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent_at.pop(body["id"]))
+            window.release()
+
+    receiver = asyncio.create_task(read_responses())
+    for i in range(count):
+        await window.acquire()
+        request = _request_mix(offset + i)
+        request["id"] = offset + i
+        sent_at[request["id"]] = time.perf_counter()
+        writer.write((json.dumps(request) + "\n").encode())
+        if i % pipeline == pipeline - 1:
+            await writer.drain()
+    await writer.drain()
+    await receiver
+    writer.close()
+
+
+async def run_load(host="127.0.0.1", port=8765, connections=8, requests=20000, pipeline=32):
+    """Drive the service and return throughput and latency percentiles (ms)."""
+    await _setup_load_data(host, port)
+    latencies = []
+    per_client = requests // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, per_client, pipeline, c * per_client, latencies)
+                           for c in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+
+async def _serve_and_load(args):
+    service = WorkplaceService(max_inflight=args.max_inflight)
+    server = await service.start(args.host, args.port)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await run_load(args.host, port, args.connections, args.requests, args.pipeline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "loadgen", "bench"):
+        command = sub.add_parser(name)
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=0 if name == "bench" else 8765)
+        command.add_argument("--max-inflight", type=int, default=64)
+        command.add_argument("--connections", type=int, default=8)
+        command.add_argument("--requests", type=int, default=20000)
+        command.add_argument("--pipeline", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        asyncio.run(WorkplaceService(max_inflight=args.max_inflight).serve_forever(args.host, args.port))
+        return
+    if args.command == "loadgen":
+        stats = asyncio.run(run_load(args.host, args.port, args.connections, args.requests, args.pipeline))
+    else:  # bench: in-process server plus load generator
+        stats = asyncio.run(_serve_and_load(args))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,33 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import datetime
+import sys
+
+import Instrumentation
+from BudgetReport import iter_overview_lines
+from FileSystem import from_micros, to_micros
+from LazyImport import lazy_import
+
+# GUI modules are loaded on first use, so the models can be imported without a display
+tk = lazy_import("tkinter")
+ttk = lazy_import("tkinter.ttk")
+messagebox = lazy_import("tkinter.messagebox")
 
 # ================= Budget Management Code =================
 class BudgetNode:
+    __slots__ = ("category", "limit", "expenses", "children", "parent")
+    AGGREGATES_CHILDREN = True  # expenses of a parent is the sum of its children's (update_expenses)
+
     def __init__(self, category, limit=None):
-        self.category = category
+        self.category = sys.intern(category) if type(category) is str else category
         self.limit = limit
         self.expenses = 0
         self.children = []
+        self.parent = None
 
-    def add_expense(self, amount):
+    def add_expense(self, amount, quiet=False):
         if self.limit and self.expenses + amount > self.limit:
-            print(f"Warning: Budget exceeded for {self.category}")
+            if not quiet:
+                print(f"Warning: Budget exceeded for {self.category}")
+            Instrumentation.event("budget.exceeded")
         self.expenses += amount
         self.update_parent_expenses()
 
@@ -20,10 +35,7 @@ class BudgetNode:
         self.children.append(child_node)
 
     def get_categories(self, level=0):
-        result = [("  " * level + f"{self.category}: Spent {self.expenses}, Limit {self.limit}")]
-        for child in self.children:
-            result.extend(child.get_categories(level + 1))
-        return result
+        return list(iter_overview_lines(self, level=level))
 
     def update_parent_expenses(self):
         if self.parent:  # Update parent's expense when a child is updated
@@ -32,6 +44,9 @@ class BudgetNode:
     def update_expenses(self):
         total_expenses = sum(child.expenses for child in self.children)
         self.expenses = total_expenses
+        # Propagate to the root: with only the direct parent refreshed, grandparents kept stale sums
+        # and BudgetReport.own_expenses (total minus children) went negative for them
+        self.update_parent_expenses()
 
 class BudgetTree:
     def __init__(self):
@@ -44,26 +59,38 @@ class BudgetTree:
             "Travel": 1000,
             "Entertainment": 400
         }
+        self.search_index = None  # optional SearchIndex.TrigramIndex notified of new categories
+        self.quiet = False  # skip the messages, e.g. while EventLog replays changes already shown
+        self._by_name = {}  # category name -> nodes with that name, so lookups skip the tree walk
+        self.reindex()
 
     def add_category(self, parent_category, category, limit=None):
         # Default to root if parent_category is not specified
-        parent_node = self.root if not parent_category else self.search(self.root, parent_category)
+        parent_node = self.root if not parent_category else self.find(parent_category)
         if parent_node:
             if category in self.limits:
                 limit = self.limits[category]
             new_category = BudgetNode(category, limit)
             new_category.parent = parent_node  # Set parent
             parent_node.add_child(new_category)
-            print(f"Category '{category}' added under '{parent_category or 'Company Budget'}' with limit {limit}.")
+            self._by_name.setdefault(category, []).append(new_category)
+            if self.search_index is not None:
+                self.search_index.add("category", new_category, category)
+            if not self.quiet:
+                print(f"Category '{category}' added under '{parent_category or 'Company Budget'}' with limit {limit}.")
+            return new_category
         else:
             print(f"Parent category '{parent_category}' not found.")
+            return None
 
     def add_expense(self, category, amount):
-        category_node = self.search(self.root, category)
+        category_node = self.find(category)
         if category_node and category_node != self.root:  # Prevent expense on root
-            category_node.add_expense(amount)
+            category_node.add_expense(amount, self.quiet)
+            return category_node
         else:
             print(f"Cannot add expense to the root node or non-existent category: {category}")
+            return None
 
     def search(self, node, category):
         if node.category == category:
@@ -74,17 +101,58 @@ class BudgetTree:
                 return found
         return None
 
+    def find(self, category):
+        """The node search(root, category) returns, looked up by name instead of walking the tree.
+
+        Read-only, so it is safe under a shared reader lock; the index is only
+        written by add_category and reindex.
+        """
+        nodes = self._by_name.get(category)
+        if nodes and len(nodes) == 1 and self._attached(nodes[0], category):
+            return nodes[0]
+        # Duplicate names, or nodes changed without add_category: walk the tree as before
+        return self.search(self.root, category)
+
+    def reindex(self):
+        """Rebuild the name index, for callers that build nodes without add_category."""
+        self._by_name = {}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            self._by_name.setdefault(node.category, []).append(node)
+            stack.extend(node.children)
+
+    def _attached(self, node, category):
+        # Still named `category` and still reachable from the root through its parents
+        if node.category != category:
+            return False
+        while node.parent is not None:
+            node = node.parent
+        return node is self.root
+
 # ================= File Management Code =================
 class FileNode:
+    __slots__ = ("name", "size", "created_us", "parent")
+
     def __init__(self, name, size=0):
-        self.name = name
+        self.name = sys.intern(name) if type(name) is str else name
         self.size = size
-        self.creation_date = datetime.datetime.now()
+        self.created_us = to_micros(datetime.datetime.now())
         self.parent = None
 
+    @property
+    def creation_date(self):
+        return from_micros(self.created_us)
+
+    @creation_date.setter
+    def creation_date(self, value):
+        self.created_us = to_micros(value)
+
 class FolderNode:
+    __slots__ = ("name", "subfolders", "files", "parent")
+
     def __init__(self, name):
-        self.name = name
+        self.name = sys.intern(name) if type(name) is str else name
         self.subfolders = []
         self.files = []
         self.parent = None
@@ -105,15 +173,20 @@ class FolderNode:
 class FileManager:
     def __init__(self):
         self.root = FolderNode("root")
+        self.search_index = None  # optional SearchIndex.TrigramIndex notified of new folders
 
     def create_folder(self, folder_name, parent_folder=None):
         parent = self.root if parent_folder is None else parent_folder
         new_folder = FolderNode(folder_name)
         parent.add_folder(new_folder)
+        if self.search_index is not None:
+            self.search_index.add("folder", new_folder, folder_name)
         return new_folder
 
 # ================= Task Management Code =================
 class Task:
+    __slots__ = ("task_id", "description", "deadline", "priority", "status")
+
     def __init__(self, task_id, description, deadline, priority):
         self.task_id = task_id
         self.description = description
@@ -124,18 +197,27 @@ class Task:
 class TaskGraph:
     def __init__(self):
         self.tasks = {}
+        self.search_index = None  # optional SearchIndex.TrigramIndex notified of new tasks
 
     def add_task(self, task):
         self.tasks[task.task_id] = task
+        if self.search_index is not None:
+            self.search_index.add("task", task, task.description)
 
 # ================= Unified Application UI =================
 class ManagementApp:
     def __init__(self, root):
+        from TkWorker import BackgroundWorker, RefreshScheduler
+
         self.root = root
         self.root.title("Integrated Management System")
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(expand=True, fill="both")
 
+        # Model operations run on a worker thread; views redraw at most once per frame
+        self.worker = BackgroundWorker(root)
+        self.refresh_scheduler = RefreshScheduler(root)
+
         # Budget Management
         self.budget_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.budget_tab, text="Budget Management")
@@ -154,7 +236,14 @@ class ManagementApp:
         self.task_graph = TaskGraph()
         self.setup_task_tab()
 
+        # Search across categories, folders and tasks
+        self.search_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.search_tab, text="Search")
+        self.setup_search_tab()
+
     def setup_budget_tab(self):
+        from TreeviewBinding import TreeviewBinding
+
         ttk.Label(self.budget_tab, text="Budget Management", font=("Arial", 16)).pack(pady=10)
 
         frame = ttk.Frame(self.budget_tab)
@@ -193,6 +282,8 @@ class ManagementApp:
         # Treeview for hierarchical structure
         self.budget_tree_view = ttk.Treeview(self.budget_tab)
         self.budget_tree_view.pack(pady=10, expand=True, fill="both")
+        self.budget_binding = TreeviewBinding(self.budget_tree_view, lambda node: node.children, self.budget_row_text,
+                                              lazy=True, parent_of=lambda node: node.parent)
         self.refresh_budget_display()
 
     def add_budget_category(self):
@@ -212,12 +303,23 @@ class ManagementApp:
         if category_name:
             # If parent category is not specified, default to "Company Budget"
             parent_category = parent_category or "Company Budget"
-            self.budget_tree.add_category(parent_category, category_name, limit)
-            self.refresh_budget_display()
+            self.worker.submit(self.budget_tree.add_category, parent_category, category_name, limit,
+                               on_done=self.on_budget_category_added)
             messagebox.showinfo("Success", f"Category '{category_name}' added under '{parent_category}' with limit {limit}.")
         else:
             messagebox.showerror("Error", "Category name is required.")
 
+    def on_budget_category_added(self, new_node):
+        if new_node:
+            # Only the new row is inserted; the rest of the Treeview is untouched
+            self.refresh_scheduler.schedule(("budget-insert", id(new_node)),
+                                            lambda: self.budget_binding.insert(new_node, new_node.parent))
+            self.budget_category_names.append(new_node.category)
+            self.refresh_scheduler.schedule("budget-categories", self.refresh_budget_categories)
+
+    def refresh_budget_categories(self):
+        self.budget_expense_category_combobox['values'] = self.budget_category_names
+
     def add_expense(self):
         category = self.budget_expense_category_combobox.get().strip()
         amount = self.budget_expense_amount_entry.get().strip()
@@ -231,42 +333,46 @@ class ManagementApp:
             return
 
         if category and category != "Company Budget":
-            self.budget_tree.add_expense(category, amount)
-            self.refresh_budget_display()
+            self.worker.submit(self.budget_tree.add_expense, category, amount, on_done=self.on_expense_added)
             messagebox.showinfo("Success", f"Expense of {amount} added to '{category}'.")
         else:
             messagebox.showerror("Error", "Cannot add expense to the root node.")
 
-    def refresh_budget_display(self):
-        # Clear previous content in the Treeview
-        for item in self.budget_tree_view.get_children():
-            self.budget_tree_view.delete(item)
+    def on_expense_added(self, node):
+        if node:
+            # Several expenses on the same category within one frame redraw its path once
+            self.refresh_scheduler.schedule(("budget-path", id(node)), lambda: self.budget_binding.update_path(node))
 
-        # Add updated budget categories into the Treeview
+    def refresh_budget_display(self):
+        # Full redraw of the budget Treeview; mutations update it through budget_binding
         self.add_budget_to_tree(self.budget_tree.root)
 
         # Update the category combobox for expense entry
         categories = [node.category for node in self.get_all_categories(self.budget_tree.root)]
         # Exclude the root category from the dropdown
-        categories = [cat for cat in categories if cat != "Company Budget"]
-        self.budget_expense_category_combobox['values'] = categories
+        self.budget_category_names = [cat for cat in categories if cat != "Company Budget"]
+        self.budget_expense_category_combobox['values'] = self.budget_category_names
 
-    def add_budget_to_tree(self, node, parent=""):
-        # Insert the current category node into the Treeview
+    def budget_row_text(self, node):
         limit_text = f"Limit {node.limit}" if node.limit is not None else "No limit"
-        node_id = self.budget_tree_view.insert(parent, "end", text=f"{node.category}: Spent {node.expenses}, {limit_text}", open=True)
+        return f"{node.category}: Spent {node.expenses}, {limit_text}"
 
-        # Recursively insert child categories
-        for child in node.children:
-            self.add_budget_to_tree(child, node_id)
+    def add_budget_to_tree(self, node):
+        # Insert the category node; deeper levels are filled in when they are expanded
+        self.budget_binding.rebuild([node])
 
     def get_all_categories(self, node):
-        categories = [node]
-        for child in node.children:
-            categories.extend(self.get_all_categories(child))
+        categories = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            categories.append(current)
+            stack.extend(reversed(current.children))
         return categories
 
     def setup_file_tab(self):
+        from TreeviewBinding import TreeviewBinding
+
         ttk.Label(self.file_tab, text="File Management", font=("Arial", 16)).pack(pady=10)
 
         frame = ttk.Frame(self.file_tab)
@@ -281,38 +387,46 @@ class ManagementApp:
         # Treeview for folder structure
         self.file_tree_view = ttk.Treeview(self.file_tab)
         self.file_tree_view.pack(pady=10, expand=True, fill="both")
+        self.file_binding = TreeviewBinding(self.file_tree_view, self.file_children, self.file_row_text,
+                                            lazy=True, parent_of=lambda node: node.parent)
         self.refresh_file_display()
 
     def create_folder(self):
         folder_name = self.file_folder_entry.get().strip()
         if folder_name:
-            self.file_manager.create_folder(folder_name)
-            self.refresh_file_display()
+            self.worker.submit(self.file_manager.create_folder, folder_name, on_done=self.on_folder_created)
             messagebox.showinfo("Success", f"Folder '{folder_name}' created.")
         else:
             messagebox.showerror("Error", "Folder name cannot be empty.")
 
-    def refresh_file_display(self):
-        # Clear previous content in the Treeview
-        for item in self.file_tree_view.get_children():
-            self.file_tree_view.delete(item)
+    def on_folder_created(self, new_folder):
+        # Subfolders are listed before files, so place it after its last sibling folder
+        self.refresh_scheduler.schedule(("file-insert", id(new_folder)), lambda: self.file_binding.insert(
+            new_folder, new_folder.parent, new_folder.parent.subfolders.index(new_folder)))
 
-        # Add folders into the Treeview
+    def refresh_file_display(self):
+        # Full redraw of the file Treeview; mutations update it through file_binding
         self.add_folders_to_tree(self.file_manager.root)
 
-    def add_folders_to_tree(self, folder, parent=""):
-        # Insert the current folder node into the Treeview
-        folder_id = self.file_tree_view.insert(parent, "end", text=folder.name, open=True)
+    def add_folders_to_tree(self, folder):
+        # Insert the folder; subfolders first, then files, are filled in page by page when expanded
+        self.file_binding.rebuild([folder])
 
-        # Recursively insert subfolders
-        for subfolder in folder.subfolders:
-            self.add_folders_to_tree(subfolder, folder_id)
+    def file_children(self, node):
+        from TreeviewBinding import ConcatSequence
 
-        # Insert files into the folder
-        for file in folder.files:
-            self.file_tree_view.insert(folder_id, "end", text=f"{file.name} - {file.size} bytes")
+        if isinstance(node, FolderNode):
+            return ConcatSequence(node.subfolders, node.files)  # a view, not a copy of both lists
+        return ()
+
+    def file_row_text(self, node):
+        if isinstance(node, FolderNode):
+            return node.name
+        return f"{node.name} - {node.size} bytes"
 
     def setup_task_tab(self):
+        from TreeviewBinding import TreeviewBinding
+
         ttk.Label(self.task_tab, text="Task Management", font=("Arial", 16)).pack(pady=10)
 
         frame = ttk.Frame(self.task_tab)
@@ -335,6 +449,7 @@ class ManagementApp:
         # Treeview for tasks
         self.task_tree_view = ttk.Treeview(self.task_tab)
         self.task_tree_view.pack(pady=10, expand=True, fill="both")
+        self.task_binding = TreeviewBinding(self.task_tree_view, lambda task: [], self.task_row_text, lazy=True)
         self.refresh_task_display()
 
     def add_task(self):
@@ -352,20 +467,97 @@ class ManagementApp:
             messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD.")
             return
 
-        task_id = len(self.task_graph.tasks) + 1
-        task = Task(task_id, task_description, task_deadline, task_priority)
-        self.task_graph.add_task(task)
-        self.refresh_task_display()
+        def create_task():
+            # The id is taken on the worker thread so queued tasks never share one
+            task = Task(len(self.task_graph.tasks) + 1, task_description, task_deadline, task_priority)
+            self.task_graph.add_task(task)
+            return task
+
+        self.worker.submit(create_task, on_done=self.on_task_added)
         messagebox.showinfo("Success", f"Task '{task_description}' added.")
 
-    def refresh_task_display(self):
-        # Clear previous content in the Treeview
-        for item in self.task_tree_view.get_children():
-            self.task_tree_view.delete(item)
+    def on_task_added(self, task):
+        self.refresh_scheduler.schedule(("task-insert", task.task_id), lambda: self.task_binding.insert(task))
 
-        # Add tasks into the Treeview
+    def refresh_task_display(self):
+        # Full redraw of the task Treeview; new tasks are inserted through task_binding
+        self.task_binding.rebuild(self.task_graph.tasks.values())
+
+    def task_row_text(self, task):
+        return f"Task {task.task_id}: {task.description} - Status: {task.status}"
+
+    def setup_search_tab(self):
+        from SearchIndex import TrigramIndex
+
+        ttk.Label(self.search_tab, text="Search", font=("Arial", 16)).pack(pady=10)
+
+        self.search_entry = ttk.Entry(self.search_tab, width=40)
+        self.search_entry.pack(pady=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+
+        self.search_results_view = ttk.Treeview(self.search_tab, columns=("kind", "path"), show="headings")
+        self.search_results_view.heading("kind", text="Type")
+        self.search_results_view.heading("path", text="Path")
+        self.search_results_view.column("kind", width=90, stretch=False)
+        self.search_results_view.pack(pady=10, expand=True, fill="both")
+        self.search_after_id = None
+        self.search_generation = 0
+
+        # The index is filled and queried on the worker thread, in order with the model mutations
+        self.search_index = TrigramIndex()
+        self.worker.submit(self.build_search_index)
+
+    def build_search_index(self):
+        index = self.search_index
+        for node in self.get_all_categories(self.budget_tree.root):
+            index.add("category", node, node.category)
+        stack = [self.file_manager.root]
+        while stack:
+            folder = stack.pop()
+            index.add("folder", folder, folder.name)
+            for file in folder.files:
+                index.add("file", file, file.name)
+            stack.extend(folder.subfolders)
         for task in self.task_graph.tasks.values():
-            self.task_tree_view.insert("", "end", text=f"Task {task.task_id}: {task.description} - Status: {task.status}")
+            index.add("task", task, task.description)
+        # From here on the models keep the index up to date themselves
+        self.budget_tree.search_index = index
+        self.file_manager.search_index = index
+        self.task_graph.search_index = index
+
+    def on_search_typed(self, event=None):
+        # Wait for a pause in typing instead of searching on every key
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        self.search_generation += 1
+        generation = self.search_generation
+        self.worker.submit(self.find_matches, self.search_entry.get(),
+                           on_done=lambda rows: self.show_search_results(generation, rows))
+
+    def find_matches(self, text, limit=100):
+        from SearchIndex import item_path
+
+        rows = []
+        for result in self.search_index.query(text, limit):
+            if result.kind == "task":
+                path = f"Task {result.item.task_id}: {result.text}"
+            elif result.kind == "category":
+                path = item_path(result.item, lambda node: node.category)
+            else:
+                path = item_path(result.item, lambda node: node.name)
+            rows.append((result.kind, path))
+        return rows
+
+    def show_search_results(self, generation, rows):
+        if generation != self.search_generation:
+            return  # a newer search is already on its way
+        self.search_results_view.delete(*self.search_results_view.get_children())
+        for kind, path in rows:
+            self.search_results_view.insert("", "end", values=(kind, path))
 
 # ================= Main Program =================
 def run_application():
@@ -374,4 +566,6 @@ def run_application():
     root.mainloop()
 
 # Run the app
-run_application()
+if __name__ == "__main__":
+    run_application()
+
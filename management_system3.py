@@ -1,19 +1,32 @@
-import tkinter as tk  # Import tkinter for creating the GUI
-from tkinter import ttk, messagebox  # Import additional Tkinter modules for styling and displaying message boxes
 import datetime  # Import datetime module for handling date inputs
+import sys
+
+from BudgetReport import compute_rollups  # Subtree totals without recursion
+from LazyImport import lazy_import  # Defers GUI imports until a window is created
+
+tk = lazy_import("tkinter")  # Import tkinter for creating the GUI
+ttk = lazy_import("tkinter.ttk")  # Import additional Tkinter modules for styling
+messagebox = lazy_import("tkinter.messagebox")  # For displaying message boxes
 
 # BudgetTree Class to represent the budget as a hierarchical tree structure
 class BudgetTree:
     def __init__(self):
         self.root = self.Node("Company Budget", limit=0, expense=0)  # Create the root node (Company Budget)
+        self.search_index = None  # Optional SearchIndex.TrigramIndex notified of new categories
 
     # Node class to represent each category in the budget tree
     class Node:
+        __slots__ = ("category", "limit", "expense", "children", "parent")
+
         def __init__(self, category, limit=0, expense=0):
-            self.category = category  # Name of the budget category
+            self.category = sys.intern(category) if type(category) is str else category  # Name of the budget category
             self.limit = limit  # Limit for this category
             self.expense = expense  # Expense for this category
             self.children = []  # Children categories (subcategories)
+            self.parent = None  # Parent category, None for the root
+
+        def add_child(self, child):
+            self.children.append(child)
 
     # Method to add a new category (node) to the tree
     def add_node(self, parent_category, category, limit=0, expense=0):
@@ -31,7 +44,11 @@ class BudgetTree:
             raise ValueError("Parent category does not exist.")  # Raise error if parent category is not found
 
         new_node = self.Node(category, limit, expense)  # Create new node (subcategory)
-        parent_node.children.append(new_node)  # Add the new node as a child of the parent node
+        new_node.parent = parent_node  # Remember the parent so rollups can walk upwards
+        parent_node.add_child(new_node)  # Add the new node as a child of the parent node
+        if self.search_index is not None:  # Keep the search index in step with the tree
+            self.search_index.add("category", new_node, category)
+        return new_node
 
     # Method to calculate the total expense recursively for a node and its children
     def calculate_total(self, node):
@@ -42,33 +59,157 @@ class BudgetTree:
 
 # FileManager Class to manage file structure as a tree
 class FileManager:
+    SEPARATOR = "/"  # Joins names into path keys such as "root/docs/report.txt"
+
     def __init__(self):
-        self.files = {}  # Dictionary to store files and directories by name
+        self.files = {}  # Dictionary to store files and directories by path key
+        self.roots = {}  # Top-level nodes by name, in insertion order; each node's parent link is the parent map
+        self.names = {}  # Bare name -> {path key: node}, so a unique name can stand in for its path
+        self.search_index = None  # Optional SearchIndex.TrigramIndex notified of new and deleted nodes
 
     # Node class to represent each file or directory in the file structure
     class Node:
+        __slots__ = ("name", "children", "parent")
+
         def __init__(self, name):
-            self.name = name  # Name of the file or directory
-            self.children = []  # List of child files or directories
+            self.name = sys.intern(name) if type(name) is str else name  # Name of the file or directory
+            self.children = []  # Child files or directories
+            self.parent = None  # Directory containing this node, None at the top level
+
+        def add_child(self, child):
+            child.parent = self
+            self.children.append(child)
+
+        def remove_child(self, child):
+            self.children.remove(child)
+            child.parent = None
+
+    # Path key of a node: the names from its top-level node down to it
+    def key_of(self, node):
+        names = []
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return self.SEPARATOR.join(reversed(names))
+
+    # Find (path key, node) by path key, or by bare name when only one node has that name
+    def _lookup(self, name_or_key):
+        node = self.files.get(name_or_key)
+        if node is not None:
+            return name_or_key, node
+        matches = self.names.get(name_or_key)
+        if not matches:
+            return None, None
+        if len(matches) > 1:
+            raise ValueError(f"'{name_or_key}' is ambiguous, use one of: {', '.join(sorted(matches))}")
+        return next(iter(matches.items()))
+
+    def find(self, name_or_key):
+        return self._lookup(name_or_key)[1]
+
+    def _register(self, node, key):
+        self.files[key] = node
+        self.names.setdefault(node.name, {})[key] = node
+        if self.search_index is not None:
+            self.search_index.add("file", node, node.name)
 
     # Method to add a new file or directory (node) under a parent
     def add_node(self, parent_name, child_name):
-        if parent_name not in self.files:  # Create parent node if it doesn't exist
-            self.files[parent_name] = self.Node(parent_name)
-        parent_node = self.files[parent_name]  # Get the parent node
-
-        if child_name not in self.files:  # Create child node if it doesn't exist
-            child_node = self.Node(child_name)
-            self.files[child_name] = child_node
-            parent_node.children.append(child_node)  # Add the child node to the parent's children
+        if self.SEPARATOR in child_name:
+            raise ValueError(f"Name '{child_name}' must not contain '{self.SEPARATOR}'.")
+        parent_key, parent_node = self._lookup(parent_name)
+        if parent_node is None:  # Create the parent as a top-level node if it doesn't exist
+            if self.SEPARATOR in parent_name:
+                raise ValueError(f"Parent '{parent_name}' does not exist.")
+            parent_key, parent_node = parent_name, self.Node(parent_name)
+            self.roots[parent_name] = parent_node
+            self._register(parent_node, parent_key)
+
+        child_key = parent_key + self.SEPARATOR + child_name
+        if child_key in self.files:  # Names are unique within one directory
+            return None
+        child_node = self.Node(child_name)
+        parent_node.add_child(child_node)  # Add the child node to the parent's children
+        self._register(child_node, child_key)
+        return child_node
+
+    # Visit a subtree in pre-order with each node's path key, without recursion
+    def walk(self, node, key=None):
+        stack = [(node, key if key is not None else self.key_of(node))]
+        while stack:
+            current, current_key = stack.pop()
+            yield current, current_key
+            for child in reversed(current.children):
+                stack.append((child, current_key + self.SEPARATOR + child.name))
+
+    # Move a node and its subtree under a new parent (None makes it a top-level node)
+    def reparent(self, name_or_key, new_parent_name=None):
+        old_key, node = self._lookup(name_or_key)
+        if node is None:
+            raise ValueError(f"Node '{name_or_key}' does not exist.")
+        new_parent = None
+        new_key = node.name
+        if new_parent_name is not None:
+            parent_key, new_parent = self._lookup(new_parent_name)
+            if new_parent is None:
+                raise ValueError(f"Parent '{new_parent_name}' does not exist.")
+            if parent_key == old_key or parent_key.startswith(old_key + self.SEPARATOR):
+                raise ValueError("A node cannot be moved into its own subtree.")
+            new_key = parent_key + self.SEPARATOR + node.name
+        if new_key in self.files:
+            raise ValueError(f"'{new_key}' already exists.")
+
+        # Only the keys inside the moved subtree change
+        moved = list(self.walk(node, old_key))
+        for current, key in moved:
+            del self.files[key]
+            del self.names[current.name][key]
+
+        if node.parent is None:
+            del self.roots[node.name]
+        else:
+            node.parent.remove_child(node)
+        if new_parent is None:
+            self.roots[node.name] = node
+        else:
+            new_parent.add_child(node)
+
+        for current, key in moved:
+            key = new_key + key[len(old_key):]
+            self.files[key] = current
+            self.names[current.name][key] = current
+        return node
+
+    # Remove a node and everything below it; returns the removed node
+    def delete_subtree(self, name_or_key):
+        key, node = self._lookup(name_or_key)
+        if node is None:
+            raise ValueError(f"Node '{name_or_key}' does not exist.")
+        for current, key in list(self.walk(node, key)):
+            del self.files[key]
+            same_name = self.names[current.name]
+            del same_name[key]
+            if not same_name:
+                del self.names[current.name]
+            if self.search_index is not None:
+                self.search_index.remove(current)
+        if node.parent is None:
+            del self.roots[node.name]
+        else:
+            node.parent.remove_child(node)
+        return node
 
 # ManagementApp Class for the main application interface
 class ManagementApp:
     def __init__(self, root):
+        from TkWorker import BackgroundWorker, RefreshScheduler  # Off-thread model work and coalesced redraws
+
         self.root = root  # Root window for the Tkinter app
         self.root.title("Integrated Management System")  # Set the title of the window
         self.notebook = ttk.Notebook(root)  # Create a notebook widget to hold the tabs
         self.notebook.pack(expand=True, fill="both")  # Add the notebook to the window
+        self.worker = BackgroundWorker(root)  # Runs model operations off the Tk thread
+        self.refresh_scheduler = RefreshScheduler(root)  # Renders pending view updates once per frame
 
         # Budget Management Tab
         self.budget_tab = ttk.Frame(self.notebook)  # Create a frame for the budget tab
@@ -82,8 +223,15 @@ class ManagementApp:
         self.file_manager = FileManager()  # Create a FileManager object
         self.setup_file_tab()  # Setup the UI for the file tab
 
+        # Search Tab
+        self.search_tab = ttk.Frame(self.notebook)  # Create a frame for the search tab
+        self.notebook.add(self.search_tab, text="Search")  # Add the frame as a tab in the notebook
+        self.setup_search_tab()  # Setup the UI for the search tab
+
     # Method to setup the Budget Management Tab UI
     def setup_budget_tab(self):
+        from TreeviewBinding import TreeviewBinding  # Incremental Treeview updates
+
         ttk.Label(self.budget_tab, text="Budget Management", font=("Arial", 16)).pack(pady=10)  # Tab title
 
         frame = ttk.Frame(self.budget_tab)  # Create a frame for the budget input fields
@@ -113,9 +261,13 @@ class ManagementApp:
 
         self.budget_tree_view = ttk.Treeview(self.budget_tab)  # Treeview widget to display the budget hierarchy
         self.budget_tree_view.pack(pady=10, fill="both", expand=True)
+        self.budget_totals = {}  # Cached subtree totals keyed by id(node)
+        self.budget_binding = TreeviewBinding(self.budget_tree_view, lambda node: node.children, self.budget_row_text, open_items=False,
+                                              lazy=True, parent_of=lambda node: node.parent)  # Maps nodes to Treeview rows, children loaded on expand
 
         self.budget_total_label = ttk.Label(self.budget_tab, text="Total Expense: $0", font=("Arial", 12))  # Label for total expense
         self.budget_total_label.pack(pady=5)
+        self.refresh_budget_tree()  # Show the root category
 
     # Method to add a budget entry
     def add_budget_entry(self):
@@ -135,35 +287,43 @@ class ManagementApp:
             messagebox.showerror("Error", "Limit and Expense must be numbers.")  # Show error if values are not valid numbers
             return
 
-        try:
-            self.budget_tree.add_node(parent_category, category, limit, expense)  # Add the budget entry to the tree
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))  # Show error if parent category is not found
-            return
-
-        self.refresh_budget_tree()  # Refresh the treeview to display the updated budget tree
-
-    # Method to refresh the budget tree view
+        # Add the budget entry to the tree on the worker thread; a missing parent comes back as ValueError
+        self.worker.submit(self.budget_tree.add_node, parent_category, category, limit, expense,
+                           on_done=self.on_budget_entry_added,
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    # Called on the Tk thread once the worker has added a budget entry
+    def on_budget_entry_added(self, new_node):
+        # Update only the new row and the totals along its ancestor path
+        expense = new_node.expense
+        self.budget_totals[id(new_node)] = expense
+        ancestor = new_node.parent
+        while ancestor is not None:
+            self.budget_totals[id(ancestor)] += expense
+            ancestor = ancestor.parent
+        self.refresh_scheduler.schedule(("budget-insert", id(new_node)), lambda: self.budget_binding.insert(new_node, new_node.parent))
+        self.refresh_scheduler.schedule(("budget-path", id(new_node.parent)), lambda: self.budget_binding.update_path(new_node.parent))
+        self.refresh_scheduler.schedule("budget-total", self.update_budget_total_label)
+
+    # Text shown for a budget node in the tree view
+    def budget_row_text(self, node):
+        return f"{node.category} (Limit: $ {node.limit}, Expense: $ {self.budget_totals[id(node)]})"
+
+    # Method to redraw the whole budget tree view
     def refresh_budget_tree(self):
-        self.budget_tree_view.delete(*self.budget_tree_view.get_children())  # Clear the current tree view
-
-        def populate_budget_tree(node, parent_id):
-            total_expense = self.budget_tree.calculate_total(node)  # Calculate total expense for the node and children
-            node_id = self.budget_tree_view.insert(parent_id, "end", text=f"{node.category} (Limit: $ {node.limit}, Expense: $ {total_expense})")  # Add node to treeview
-            for child in node.children:  # Recursively populate child nodes
-                populate_budget_tree(child, node_id)
+        self.budget_totals = compute_rollups(self.budget_tree.root)  # Totals for every node in one pass
+        self.budget_binding.rebuild([self.budget_tree.root])
+        self.update_budget_total_label()
 
-        if self.budget_tree.root:
-            root_id = self.budget_tree_view.insert("", "end", text=f"{self.budget_tree.root.category} (Limit: $ {self.budget_tree.root.limit}, Expense: $ {self.budget_tree.calculate_total(self.budget_tree.root)})")
-            for child in self.budget_tree.root.children:
-                populate_budget_tree(child, root_id)
-
-        # Update total expense label
-        total = self.budget_tree.calculate_total(self.budget_tree.root) if self.budget_tree.root else 0
+    # Update total expense label
+    def update_budget_total_label(self):
+        total = self.budget_totals.get(id(self.budget_tree.root), 0)
         self.budget_total_label.config(text=f"Total Expense: $ {total}")
 
     # Method to setup the File Management Tab UI
     def setup_file_tab(self):
+        from TreeviewBinding import TreeviewBinding
+
         ttk.Label(self.file_tab, text="File Management", font=("Arial", 16)).pack(pady=10)
 
         frame = ttk.Frame(self.file_tab)
@@ -177,10 +337,13 @@ class ManagementApp:
         self.child_entry = ttk.Entry(frame)
         self.child_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        ttk.Button(frame, text="Add Node", command=self.add_file_node).grid(row=2, columnspan=2, pady=5)
+        ttk.Button(frame, text="Add Node", command=self.add_file_node).grid(row=2, column=0, pady=5)
+        ttk.Button(frame, text="Move Child Under Parent", command=self.move_file_node).grid(row=2, column=1, pady=5)  # Empty parent moves it to the top level
+        ttk.Button(frame, text="Delete Child", command=self.delete_file_node).grid(row=2, column=2, pady=5)
 
         self.tree_view = ttk.Treeview(self.file_tab)
         self.tree_view.pack(pady=10, fill="both", expand=True)
+        self.file_binding = TreeviewBinding(self.tree_view, lambda node: node.children, lambda node: node.name, open_items=False, lazy=True)
 
     def add_file_node(self):
         parent_name = self.parent_entry.get().strip()
@@ -190,23 +353,134 @@ class ManagementApp:
             messagebox.showerror("Error", "Both parent and child nodes must be specified.")
             return
 
-        self.file_manager.add_node(parent_name, child_name)
-        self.refresh_file_tree()
+        def add_node():
+            # Names or path keys; a parent that doesn't exist yet becomes a new top-level node
+            parent_is_new = self.file_manager.find(parent_name) is None
+            child_node = self.file_manager.add_node(parent_name, child_name)
+            return parent_is_new, self.file_manager.find(parent_name), child_node
+
+        self.worker.submit(add_node, on_done=self.on_file_node_added,
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    # Called on the Tk thread once the worker has added a file node
+    def on_file_node_added(self, result):
+        parent_is_new, parent_node, child_node = result
+        if parent_is_new:  # New top-level node, inserted with its child
+            self.refresh_scheduler.schedule(("file-insert", id(parent_node)), lambda: self.file_binding.insert(parent_node))
+        elif child_node:
+            self.refresh_scheduler.schedule(("file-insert", id(child_node)), lambda: self.file_binding.insert(child_node, parent_node))
+
+    def move_file_node(self):
+        parent_name = self.parent_entry.get().strip() or None
+        child_name = self.child_entry.get().strip()
+        if not child_name:
+            messagebox.showerror("Error", "The child node to move must be specified.")
+            return
+
+        def reparent():
+            # Remember the old parent: if the node was past its loaded page it has no row to delete
+            node = self.file_manager.find(child_name)
+            old_parent = node.parent if node is not None else None
+            return old_parent, self.file_manager.reparent(child_name, parent_name)
 
-    def refresh_file_tree(self):
-        # Clear the current tree
-        self.tree_view.delete(*self.tree_view.get_children())
+        self.worker.submit(reparent, on_done=self.on_file_node_moved,
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    # Called on the Tk thread once the worker has moved a file node
+    def on_file_node_moved(self, result):
+        old_parent, node = result
+
+        def redraw():
+            # The row goes away with its loaded subtree and comes back under the new parent
+            self.file_binding.delete(node)
+            self.file_binding.refresh_more(old_parent)
+            self.file_binding.insert(node, node.parent)
+        self.refresh_scheduler.schedule(("file-move", id(node)), redraw)
 
-        def populate_tree(parent_node, parent_id):
-            node_id = self.tree_view.insert(parent_id, "end", text=parent_node.name)
-            for child in parent_node.children:
-                populate_tree(child, node_id)
+    def delete_file_node(self):
+        child_name = self.child_entry.get().strip()
+        if not child_name:
+            messagebox.showerror("Error", "The child node to delete must be specified.")
+            return
+        self.worker.submit(self.file_manager.delete_subtree, child_name,
+                           on_done=lambda node: self.refresh_scheduler.schedule(("file-delete", id(node)), lambda: self.file_binding.delete(node)),
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
 
+    def refresh_file_tree(self):
+        # Redraw the whole tree from the top-level nodes; each node is rendered once
+        self.file_binding.rebuild(self.file_manager.roots.values())
+
+    # Method to setup the Search Tab UI
+    def setup_search_tab(self):
+        from SearchIndex import TrigramIndex  # Trigram index over category and file names
+
+        ttk.Label(self.search_tab, text="Search", font=("Arial", 16)).pack(pady=10)  # Tab title
+
+        self.search_entry = ttk.Entry(self.search_tab, width=40)  # Entry widget for the search text
+        self.search_entry.pack(pady=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)  # Search as the user types
+
+        self.search_results_view = ttk.Treeview(self.search_tab, columns=("kind", "path"), show="headings")  # One row per match
+        self.search_results_view.heading("kind", text="Type")
+        self.search_results_view.heading("path", text="Path")
+        self.search_results_view.column("kind", width=90, stretch=False)
+        self.search_results_view.pack(pady=10, fill="both", expand=True)
+        self.search_after_id = None  # Pending debounced search
+        self.search_generation = 0  # Lets stale results be dropped
+
+        self.search_index = TrigramIndex()
+        self.worker.submit(self.build_search_index)  # Filled on the worker thread, in order with the model mutations
+
+    # Index the existing nodes, then let the models keep the index up to date
+    def build_search_index(self):
+        index = self.search_index
+        stack = [self.budget_tree.root]
+        while stack:
+            node = stack.pop()
+            index.add("category", node, node.category)
+            stack.extend(node.children)
         for node in self.file_manager.files.values():
-            populate_tree(node, "")
+            index.add("file", node, node.name)
+        self.budget_tree.search_index = index
+        self.file_manager.search_index = index
+
+    # Wait for a pause in typing instead of searching on every key
+    def on_search_typed(self, event=None):
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        self.search_generation += 1
+        generation = self.search_generation
+        self.worker.submit(self.find_matches, self.search_entry.get(),
+                           on_done=lambda rows: self.show_search_results(generation, rows))
+
+    # Runs on the worker thread: query the index and build the path of every match
+    def find_matches(self, text, limit=100):
+        from SearchIndex import item_path
+
+        rows = []
+        for result in self.search_index.query(text, limit):
+            name_of = (lambda node: node.category) if result.kind == "category" else (lambda node: node.name)
+            rows.append((result.kind, item_path(result.item, name_of)))
+        return rows
+
+    # Called on the Tk thread with the rows of the latest search
+    def show_search_results(self, generation, rows):
+        if generation != self.search_generation:  # A newer search is already on its way
+            return
+        self.search_results_view.delete(*self.search_results_view.get_children())
+        for kind, path in rows:
+            self.search_results_view.insert("", "end", values=(kind, path))
 
 # Run the application
-if __name__ == "__main__":
+def main():
     root = tk.Tk()  # Create the root window
     app = ManagementApp(root)  # Instantiate the main app
     root.mainloop()  # Start the Tkinter event loop
+
+if __name__ == "__main__":
+    main()
+
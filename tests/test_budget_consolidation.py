@@ -0,0 +1,61 @@
+import os
+import threading
+
+import pytest
+
+import man_system_test
+from BudgetConsolidation import _start_method, _synthetic_trees, consolidate
+
+
+def test_parallel_matches_serial():
+    trees = _synthetic_trees(6, 120)
+    serial = consolidate(trees, max_workers=0)
+    parallel = consolidate(trees, max_workers=2)
+    assert parallel["totals"] == serial["totals"]
+    assert parallel["over_limit"] == serial["over_limit"]
+    assert parallel["group"].total == sum(serial["totals"].values())
+
+
+def test_aggregating_tree_is_not_double_counted():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_expense("Groceries", 400)
+    result = consolidate({"Sales": tree}, max_workers=0, depth=None)
+    assert result["totals"]["Sales"] == 400
+    assert result["over_limit"]["Sales"] == ["Groceries"]
+
+
+def test_no_fork_while_other_threads_run():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        assert _start_method(None) != "fork"
+        assert _start_method("spawn") == "spawn"
+    finally:
+        stop.set()
+        thread.join()
+
+
+class _BrokenNode:
+    category, limit, expenses = "Broken", None, 0
+
+    @property
+    def children(self):
+        raise RuntimeError("tree is unreadable")
+
+
+def _shm_blocks():
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory in /dev/shm")
+@pytest.mark.parametrize("workers", [0, 2])
+def test_failed_shard_leaves_no_shared_memory(workers):
+    trees = _synthetic_trees(7, 50)
+    trees["Broken"] = _BrokenNode()
+    before = _shm_blocks()
+    with pytest.raises(RuntimeError, match="unreadable"):
+        consolidate(trees, max_workers=workers, shards_per_worker=4)
+    assert _shm_blocks() == before
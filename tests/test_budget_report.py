@@ -0,0 +1,71 @@
+import io
+
+import man_system_test
+from BudgetReport import compute_rollups, iter_budget_rows, iter_text_lines, own_expenses, write_text
+from management_system3 import BudgetTree as TotalTree
+
+
+def _aggregating_tree():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_category("Food", "Restaurants")
+    tree.add_expense("Groceries", 250)
+    tree.add_expense("Restaurants", 150)
+    return tree
+
+
+def test_own_expenses_of_aggregating_parents():
+    tree = _aggregating_tree()
+    food = tree.search(tree.root, "Food")
+    assert food.expenses == 400
+    assert own_expenses(food) == 0
+    assert own_expenses(tree.root) == 0
+    assert own_expenses(tree.search(tree.root, "Groceries")) == 250
+
+
+def test_rollup_does_not_count_aggregated_parents_twice():
+    tree = _aggregating_tree()
+    totals = compute_rollups(tree.root)
+    assert totals[id(tree.search(tree.root, "Food"))] == 400
+    assert totals[id(tree.root)] == 400
+
+
+def test_report_shows_no_invented_breach():
+    tree = _aggregating_tree()
+    out = io.StringIO()
+    write_text(tree.root, out)
+    assert "  Food: Spent 0, Limit 500, Total 400 (80%)" in out.getvalue().splitlines()
+
+
+def test_rows_without_rollup_keep_aggregated_total():
+    rows = {row.category: row for row in iter_budget_rows(_aggregating_tree().root, rollup=False)}
+    assert rows["Food"].spent == 0
+    assert rows["Food"].total == 400
+
+
+def test_rollup_of_own_expense_tree():
+    tree = TotalTree()
+    tree.add_node(None, "Food", limit=500, expense=10)
+    tree.add_node("Food", "Groceries", limit=300, expense=40)
+    assert compute_rollups(tree.root)[id(tree.root)] == 50
+
+
+def test_model_overviews_keep_their_original_layout():
+    tree = _aggregating_tree()
+    assert tree.root.get_categories() == [
+        "Company Budget: Spent 400, Limit None",
+        "  Food: Spent 400, Limit 500",
+        "    Groceries: Spent 250, Limit 300",
+        "    Restaurants: Spent 150, Limit 200",
+    ]
+
+
+def test_text_lines_roll_up_by_default_like_the_writers():
+    tree = TotalTree()
+    tree.add_node(None, "Food", limit=500, expense=10)
+    tree.add_node("Food", "Groceries", limit=300, expense=40)
+    out = io.StringIO()
+    write_text(tree.root, out)
+    assert list(iter_text_lines(tree.root)) == out.getvalue().splitlines()
+    assert "  Food: Spent 10, Limit 500, Total 50 (10%)" in out.getvalue().splitlines()
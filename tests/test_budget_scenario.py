@@ -0,0 +1,134 @@
+import copy
+import random
+
+import pytest
+
+from BudgetScenario import BudgetScenario, evaluate_scenarios
+from BudgetSnapshot import BudgetLedger
+
+
+def _ledger():
+    ledger = BudgetLedger()
+    ledger.add_category(None, "Food", 500)
+    ledger.add_category("Food", "Groceries", 300)
+    ledger.add_category("Groceries", "Organic", 100)
+    ledger.add_category("Food", "Restaurants", 200)
+    ledger.add_category(None, "Entertainment", 400)
+    ledger.add_category("Entertainment", "Games", 150)
+    ledger.add_category(None, "Travel", 1000)
+    for category, amount in (("Groceries", 250), ("Organic", 80), ("Restaurants", 180),
+                             ("Entertainment", 120), ("Games", 90), ("Travel", 600)):
+        ledger.add_expense(category, amount)
+    return ledger
+
+
+def _plain_tree(snapshot):
+    # category -> [parent, limit, own expenses]
+    return {record.category: [record.parent, record.limit, record.expenses] for _level, record in snapshot.walk()}
+
+
+def _totals(tree):
+    totals = dict.fromkeys(tree, 0)
+    for category, (_parent, _limit, expenses) in tree.items():
+        node = category
+        while node is not None:
+            totals[node] += expenses
+            node = tree[node][0]
+    return totals
+
+
+class Reference:
+    """The same edits applied to a deep copy of the base, totals recomputed from scratch."""
+
+    def __init__(self, base):
+        self.base_totals = _totals(_plain_tree(base))
+        self.tree = copy.deepcopy(_plain_tree(base))
+
+    def set_limit(self, category, limit):
+        self.tree[category][1] = limit
+
+    def add_expense(self, category, amount):
+        self.tree[category][2] += amount
+
+    def scale_expenses(self, category, factor):
+        self.tree[category][2] += self.base_totals[category] * (factor - 1)
+
+    def add_category(self, parent, category, limit=None):
+        self.tree[category] = [parent, limit, 0]
+
+    def move_category(self, category, new_parent):
+        self.tree[category][0] = new_parent
+
+    def over_limit(self):
+        totals = _totals(self.tree)
+        return sorted(c for c, (_parent, limit, _expenses) in self.tree.items() if limit and totals[c] > limit)
+
+
+def _assert_matches(scenario, reference):
+    totals = _totals(reference.tree)
+    for category, total in totals.items():
+        assert scenario.get_total(category) == pytest.approx(total), category
+        assert scenario.get_parent(category) == reference.tree[category][0]
+    assert sorted(scenario.over_limit()) == reference.over_limit()
+
+
+def _apply(scenario, reference, method, *args):
+    assert getattr(scenario, method)(*args)
+    getattr(reference, method)(*args)
+
+
+def test_nested_moves_match_a_copied_tree():
+    base = _ledger().snapshot()
+    scenario, reference = BudgetScenario(base), Reference(base)
+    _apply(scenario, reference, "move_category", "Groceries", "Entertainment")
+    _apply(scenario, reference, "move_category", "Organic", "Travel")  # nested inside the moved subtree
+    _apply(scenario, reference, "move_category", "Games", "Food")
+    _apply(scenario, reference, "add_expense", "Organic", 40)
+    _apply(scenario, reference, "set_limit", "Travel", 650)
+    _assert_matches(scenario, reference)
+    assert base.get_total("Food") == 510  # the base is untouched
+
+
+def test_new_categories_and_scaling_match_a_copied_tree():
+    base = _ledger().snapshot()
+    scenario, reference = BudgetScenario(base), Reference(base)
+    _apply(scenario, reference, "add_category", "Travel", "Flights", 300)
+    _apply(scenario, reference, "add_expense", "Flights", 350)
+    _apply(scenario, reference, "move_category", "Restaurants", "Flights")
+    _apply(scenario, reference, "scale_expenses", "Food", 1.5)
+    _assert_matches(scenario, reference)
+    assert not scenario.move_category("Travel", "Flights")  # into its own subtree
+    assert scenario.evaluate()["over_limit"] == reference.over_limit()
+
+
+def _random_scenario(base, rng, name):
+    scenario, reference = BudgetScenario(base, name), Reference(base)
+    categories = [c for c in _plain_tree(base) if c != base.root_category]
+    for step in range(8):
+        action = rng.choice(("limit", "expense", "scale", "add", "move"))
+        category = rng.choice(categories)
+        if action == "limit":
+            _apply(scenario, reference, "set_limit", category, rng.choice((None, 100, 300, 900)))
+        elif action == "expense":
+            _apply(scenario, reference, "add_expense", category, rng.randint(-50, 200))
+        elif action == "scale" and category in base:
+            _apply(scenario, reference, "scale_expenses", category, rng.choice((0.5, 1.1, 2)))
+        elif action == "add":
+            _apply(scenario, reference, "add_category", category, f"{name}-new{step}", rng.choice((None, 50)))
+            categories.append(f"{name}-new{step}")
+        elif category in base and category not in scenario.moves:
+            new_parent = rng.choice(categories + [base.root_category])
+            if scenario.move_category(category, new_parent):
+                reference.move_category(category, new_parent)
+    return scenario, reference
+
+
+def test_random_scenarios_match_and_evaluate_the_same_in_a_pool():
+    base = _ledger().snapshot()
+    rng = random.Random(7)
+    pairs = [_random_scenario(base, rng, f"s{i}") for i in range(20)]
+    for scenario, reference in pairs:
+        _assert_matches(scenario, reference)
+
+    scenarios = [scenario for scenario, _reference in pairs]
+    assert evaluate_scenarios(base, scenarios, max_workers=2) == [scenario.evaluate() for scenario in scenarios]
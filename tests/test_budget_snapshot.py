@@ -0,0 +1,63 @@
+import man_system_test
+from BudgetSnapshot import BudgetLedger, PersistentMap
+
+
+def _ledger():
+    ledger = BudgetLedger()
+    ledger.add_category(None, "Food", 500)
+    ledger.add_category("Food", "Groceries", 300)
+    ledger.add_category(None, "Travel", 1000)
+    return ledger
+
+
+def test_closed_periods_are_isolated_from_later_postings():
+    ledger = _ledger()
+    ledger.add_expense("Groceries", 120)
+    january = ledger.close_period("2024-01")
+
+    ledger.add_expense("Groceries", 250)
+    ledger.add_expense("Travel", 400)
+    ledger.add_category("Food", "Restaurants", 200)
+    ledger.set_limit("Food", 300)
+    february = ledger.close_period("2024-02")
+
+    assert january.get_total("Food") == 120
+    assert january.get_total("Company Budget") == 120
+    assert january.get_limit("Food") == 500
+    assert "Restaurants" not in january
+    assert january.over_limit() == []
+
+    assert february.get_total("Food") == 370
+    assert february.get_total("Company Budget") == 770
+    assert sorted(february.over_limit()) == ["Food", "Groceries"]
+    assert ledger.get_period("2024-01") is january
+
+
+def test_snapshot_is_unchanged_by_live_updates():
+    ledger = _ledger()
+    snapshot = ledger.snapshot()
+    ledger.add_expense("Travel", 50)
+    assert snapshot.get_total("Travel") == 0
+    assert ledger.get_total("Travel") == 50
+
+
+def test_persistent_map_versions_share_nothing_visible():
+    empty = PersistentMap()
+    maps = [empty]
+    for i in range(2000):
+        maps.append(maps[-1].set(i, i * i))
+    assert len(maps[1000]) == 1000
+    assert 1500 not in maps[1000]
+    assert maps[-1][1500] == 1500 * 1500
+    assert maps[-1].set(7, "x")[7] == "x" and maps[-1][7] == 49
+
+
+def test_from_tree_does_not_double_count_aggregated_parents():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_expense("Groceries", 400)
+    ledger = BudgetLedger.from_tree(tree.root)
+    assert ledger.get_total("Food") == 400
+    assert ledger.get_total("Company Budget") == 400
+    assert ledger.snapshot().over_limit() == ["Groceries"]
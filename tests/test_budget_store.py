@@ -0,0 +1,82 @@
+import man_system_test
+from BudgetStore import BudgetStore
+
+
+def _tree():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_category("Food", "Restaurants")
+    tree.add_category(None, "Travel")
+    tree.add_expense("Groceries", 400)
+    tree.add_expense("Restaurants", 50)
+    tree.add_expense("Travel", 200)
+    return tree
+
+
+def test_round_trip_of_aggregating_tree():
+    tree = _tree()
+    with BudgetStore(":memory:") as store:
+        store.save_tree(tree.root)
+        assert store.subtree_total("Food") == 450
+        assert store.subtree_total("Company Budget") == 650
+        # Groceries is over its 300 limit; Food (450 of 500) is not
+        assert store.over_limit() == [("Groceries", 300, 400)]
+
+        reloaded = store.load_into(man_system_test.BudgetTree())
+    for category in ("Company Budget", "Food", "Groceries", "Restaurants", "Travel"):
+        assert reloaded.search(reloaded.root, category).expenses == tree.search(tree.root, category).expenses
+    assert reloaded.search(reloaded.root, "Groceries").parent.category == "Food"
+
+
+def test_postings_roll_up_to_ancestors():
+    with BudgetStore(":memory:") as store:
+        store.save_tree(_tree().root)
+        store.post_expense("Restaurants", 100)
+        assert store.subtree_total("Food") == 550
+        assert [row[0] for row in store.over_limit()] == ["Food", "Groceries"]
+
+
+def test_saving_again_keeps_postings_made_through_the_store():
+    tree = _tree()
+    with BudgetStore(":memory:") as store:
+        store.save_tree(tree.root)
+        food_id = store.find("Food").node_id
+        store.post_expense("Food", 10)
+        assert store.subtree_total("Food") == 460
+
+        store.save_tree(tree.root)  # unchanged tree: nothing is overwritten
+        assert store.subtree_total("Food") == 460
+        assert [amount for amount, _at in store.postings("Food")] == [10]
+
+        tree.add_category("Food", "Snacks", 50)
+        tree.add_expense("Groceries", 25)
+        tree.search(tree.root, "Travel").limit = 150
+        store.save_tree(tree.root)
+        assert store.find("Food").node_id == food_id
+        assert store.subtree_total("Food") == 485
+        assert store.find("Snacks").limit == 50
+        assert ("Travel", 150, 200) in store.over_limit()
+
+
+def test_reloaded_tree_saves_back_without_double_counting():
+    with BudgetStore(":memory:") as store:
+        store.save_tree(_tree().root)
+        store.post_expense("Travel", 40)
+        reloaded = store.load_into(man_system_test.BudgetTree())
+        assert reloaded.find("Travel").expenses == 240
+
+        reloaded.add_expense("Travel", 10)
+        store.save_tree(reloaded.root)
+        assert store.subtree_total("Travel") == 250
+        assert store.subtree_total("Company Budget") == 700
+
+
+def test_postings_are_flushed_after_the_interval(tmp_path):
+    path = str(tmp_path / "budget.db")
+    with BudgetStore(path, flush_interval=0) as store:
+        store.save_tree(_tree().root)
+        store.post_expense("Travel", 5)
+        # Another connection sees it without any read or close on this store
+        with BudgetStore(path) as other:
+            assert other.subtree_total("Travel") == 205
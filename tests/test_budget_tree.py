@@ -0,0 +1,29 @@
+import man_system_test
+
+
+def test_expenses_propagate_to_every_ancestor():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_category("Groceries", "Organic", 100)
+    tree.add_category(None, "Travel")
+    tree.add_expense("Organic", 30)
+    tree.add_expense("Travel", 70)
+
+    assert tree.find("Groceries").expenses == 30
+    assert tree.find("Food").expenses == 30  # the grandparent, which used to stay at 0
+    assert tree.root.expenses == 100
+
+
+def test_find_does_not_write_the_index():
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    stray = man_system_test.BudgetNode("Stray", 10)  # attached without add_category
+    stray.parent = tree.root
+    tree.root.add_child(stray)
+    index = {name: list(nodes) for name, nodes in tree._by_name.items()}
+
+    assert tree.find("Stray") is stray and tree.find("Food") is not None and tree.find("Missing") is None
+    assert tree._by_name == index
+    tree.reindex()
+    assert tree._by_name["Stray"] == [stray]
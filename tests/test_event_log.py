@@ -0,0 +1,135 @@
+import os
+import threading
+
+from EventLog import BUDGET_ADD_EXPENSE, EventLog, EventSourcedWorkplace
+from man_system_test import BudgetNode, BudgetTree
+
+
+def _expenses(workplace):
+    tree = workplace.budget_tree
+    return {name: tree.find(name).expenses for name in ("Company Budget", "Food", "Groceries", "Travel")}
+
+
+def _populate(workplace):
+    workplace.add_category(None, "Food")
+    workplace.add_category("Food", "Groceries")
+    workplace.add_category(None, "Travel")
+    workplace.add_expense("Groceries", 120)
+    workplace.add_expense("Travel", 300)
+
+
+def test_torn_tail_is_truncated_on_recovery(tmp_path):
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    _populate(workplace)
+    expected = _expenses(workplace)
+    workplace.close()
+    segment = workplace.log.segment_paths()[-1]
+    intact = os.path.getsize(segment)
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\xde\xad")  # a record header cut off mid-write
+
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    assert os.path.getsize(segment) == intact
+    assert workplace.replayed == 5
+    assert _expenses(workplace) == expected
+    workplace.add_expense("Groceries", 30)
+    workplace.close()
+
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    assert workplace.budget_tree.find("Groceries").expenses == 150
+    workplace.close()
+
+
+def test_recovery_replays_only_the_tail_after_a_checkpoint(tmp_path, capsys):
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    _populate(workplace)
+    workplace.checkpoint()
+    workplace.add_category("Travel", "Flights")
+    workplace.add_expense("Flights", 80)
+    expected = _expenses(workplace)
+    workplace.close()
+
+    capsys.readouterr()
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    assert workplace.replayed == 2
+    assert capsys.readouterr().out == ""  # replay does not repeat the messages
+    assert _expenses(workplace) == expected
+    assert workplace.budget_tree.find("Flights").parent is workplace.budget_tree.find("Travel")
+    workplace.close()
+
+
+def test_segments_after_a_damaged_one_are_deleted(tmp_path, capsys):
+    log = EventLog(str(tmp_path), sync=False)
+    log.start()
+    log.append(BUDGET_ADD_EXPENSE, "Food", 1)
+    log.wait(log.append(BUDGET_ADD_EXPENSE, "Food", 2))
+    log.start_segment()
+    log.wait(log.append(BUDGET_ADD_EXPENSE, "Food", 3))
+    log.close()
+    first, second = log.segment_paths()
+    with open(first, "r+b") as f:
+        f.truncate(os.path.getsize(first) - 3)  # tear the second record
+
+    log = EventLog(str(tmp_path), sync=False)
+    assert [fields for _lsn, _type, fields in log.recover()] == [["Food", 1]]
+    assert log.segment_paths() == [first] and log.last_lsn == 1
+    assert os.path.basename(second) in capsys.readouterr().err
+
+
+def test_checkpoint_file_is_written_outside_the_lock(tmp_path):
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False, checkpoint_every=3)
+    write_checkpoint = workplace._write_checkpoint
+    concurrent = []
+
+    def write_while_mutating(lsn, records):
+        workplace.checkpoint_every = 100
+        writer = threading.Thread(target=workplace.add_expense, args=("Travel", 1))
+        writer.start()
+        writer.join(5)
+        concurrent.append(not writer.is_alive())
+        write_checkpoint(lsn, records)
+
+    workplace._write_checkpoint = write_while_mutating
+    _populate(workplace)  # the third record triggers a checkpoint
+    expected = _expenses(workplace)
+    workplace.close()
+    assert concurrent == [True]
+    assert workplace.checkpoint_lsn == 3
+    assert len(workplace.log.segment_paths()) == 1
+
+    workplace = EventSourcedWorkplace.open(str(tmp_path), sync=False)
+    assert workplace.replayed == 3  # the expense added during the checkpoint and the two after it
+    assert _expenses(workplace) == expected
+    workplace.close()
+
+
+def test_log_mutations_go_through_the_tree():
+    class Recorder:
+        def __init__(self):
+            self.added = []
+
+        def add(self, kind, item, text):
+            self.added.append((kind, text))
+
+    tree = BudgetTree()
+    tree.search_index = Recorder()
+    workplace = EventSourcedWorkplace(_NullLog(), budget_tree=tree)
+    workplace.add_category(None, "Food")
+    assert tree.search_index.added == [("category", "Food")]
+
+    # Nodes attached behind the tree's back are still found
+    stray = BudgetNode("Stray", 10)
+    stray.parent = tree.root
+    tree.root.add_child(stray)
+    assert workplace.add_expense("Stray", 5) is stray
+
+
+class _NullLog:
+    last_lsn = 0
+
+    def append(self, event_type, *fields):
+        self.last_lsn += 1
+        return self.last_lsn
+
+    def wait(self, lsn):
+        pass
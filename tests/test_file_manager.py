@@ -0,0 +1,79 @@
+import pytest
+
+from management_system3 import FileManager
+from SearchIndex import TrigramIndex
+
+
+def _manager():
+    manager = FileManager()
+    manager.add_node("root", "docs")
+    manager.add_node("root/docs", "report.txt")
+    manager.add_node("root/docs", "drafts")
+    manager.add_node("root/docs/drafts", "notes.txt")
+    manager.add_node("root", "archive")
+    manager.add_node("root/archive", "notes.txt")
+    return manager
+
+
+def _check_bookkeeping(manager):
+    # files, names and roots must describe exactly the nodes reachable from the roots
+    walked = {}
+    for name, root in manager.roots.items():
+        assert root.name == name and root.parent is None
+        for node, key in manager.walk(root):
+            assert manager.key_of(node) == key
+            walked[key] = node
+    assert manager.files == walked
+    by_name = {}
+    for key, node in walked.items():
+        by_name.setdefault(node.name, {})[key] = node
+    assert manager.names == by_name
+
+
+def test_reparent_rekeys_the_moved_subtree():
+    manager = _manager()
+    drafts = manager.find("drafts")
+    manager.reparent("drafts", "root/archive")
+    _check_bookkeeping(manager)
+    assert drafts.parent is manager.find("archive")
+    assert manager.find("root/archive/drafts/notes.txt") is drafts.children[0]
+    assert "root/docs/drafts" not in manager.files
+    assert sorted(manager.names["notes.txt"]) == ["root/archive/drafts/notes.txt", "root/archive/notes.txt"]
+
+    manager.reparent("root/archive/drafts")  # to the top level
+    _check_bookkeeping(manager)
+    assert manager.roots["drafts"] is drafts
+    assert manager.find("drafts/notes.txt") is drafts.children[0]
+
+
+def test_rejected_moves_leave_the_tree_unchanged():
+    manager = _manager()
+    with pytest.raises(ValueError, match="own subtree"):
+        manager.reparent("docs", "drafts")
+    with pytest.raises(ValueError, match="already exists"):
+        manager.reparent("root/docs/drafts/notes.txt", "archive")
+    with pytest.raises(ValueError, match="ambiguous"):
+        manager.reparent("notes.txt", "docs")
+    _check_bookkeeping(manager)
+    assert manager.find("root/docs/drafts/notes.txt").parent is manager.find("drafts")
+
+
+def test_delete_subtree_drops_keys_names_and_index_entries():
+    manager = _manager()
+    index = TrigramIndex()
+    for key, node in manager.files.items():
+        index.add("file", node, node.name)
+    manager.search_index = index
+
+    docs = manager.delete_subtree("docs")
+    _check_bookkeeping(manager)
+    assert docs.parent is None and manager.find("root").children == [manager.find("archive")]
+    assert "drafts" not in manager.names and "report.txt" not in manager.names
+    # The archive's notes.txt is now the only one, so its bare name resolves again
+    assert manager.find("notes.txt") is manager.files["root/archive/notes.txt"]
+    assert [result.item for result in index.search("notes")] == [manager.find("notes.txt")]
+    assert not index.search("report") and len(index) == 3
+
+    manager.delete_subtree("root")
+    _check_bookkeeping(manager)
+    assert manager.files == {} and manager.roots == {} and len(index) == 0
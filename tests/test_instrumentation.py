@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+import Instrumentation
+import man_system_test
+
+
+@pytest.fixture
+def instrumentation():
+    targets = list(Instrumentation._targets)
+    Instrumentation.reset()
+    yield Instrumentation
+    Instrumentation.disable()
+    Instrumentation.reset()
+    Instrumentation._targets[:] = targets
+
+
+def test_enable_and_disable_restore_the_original_methods(instrumentation):
+    original = man_system_test.BudgetTree.__dict__["search"]
+    instrumentation.register("man_system_test", "BudgetTree", ("search",))  # already a default target
+    instrumentation.register("man_system_test", "BudgetTree", ("search", "find"), ("search",))
+    instrumentation.enable()
+    instrumentation.enable()
+    wrapped = man_system_test.BudgetTree.__dict__["search"]
+    assert wrapped is not original and wrapped.__wrapped__ is original
+
+    tree = man_system_test.BudgetTree()
+    assert tree.search(tree.root, "Company Budget") is tree.root
+    assert instrumentation.snapshot()["calls"]["man_system_test.BudgetTree.search"] == {"ok": 1}
+
+    instrumentation.disable()
+    assert man_system_test.BudgetTree.__dict__["search"] is original
+    assert not instrumentation.is_enabled()
+
+
+def test_recursive_search_counts_nodes_visited(instrumentation):
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Food")
+    tree.add_category("Food", "Groceries")
+    tree.add_category(None, "Travel")
+    instrumentation.enable()
+    assert tree.search(tree.root, "Travel") is not None  # root, Food, Groceries, Travel
+    assert tree.search(tree.root, "Missing") is None
+    visits = instrumentation.snapshot()["nodes_visited"]["man_system_test.BudgetTree.search"]
+    assert visits["count"] == 2 and visits["sum"] == 8
+
+    tree.add_expense("Groceries", 5)  # a name lookup through find, not a walk
+    snapshot = instrumentation.snapshot()
+    assert snapshot["calls"]["man_system_test.BudgetTree.find"] == {"ok": 1}
+    assert snapshot["nodes_visited"]["man_system_test.BudgetTree.search"]["count"] == 2
+
+
+def test_prometheus_text_format(instrumentation):
+    instrumentation.enable()
+    tree = man_system_test.BudgetTree()
+    tree.add_category(None, "Snacks", 10)
+    tree.add_expense("Snacks", 50)
+    instrumentation.cache_hit("demo")
+    text = instrumentation.to_prometheus()
+
+    assert text.endswith("\n")
+    sample = re.compile(r'^[a-z_]+(\{([a-z_]+="[^"]*",?)+\})? \S+$')
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or sample.match(line), line
+    assert 'workplace_events_total{event="budget.exceeded"} 1' in text
+    assert 'workplace_cache_requests_total{cache="demo",result="hit"} 1' in text
+
+    op = 'op="man_system_test.BudgetTree.add_expense"'
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith(f"workplace_latency_seconds_bucket{{{op},")]
+    assert buckets == sorted(buckets) and buckets[-1] == 1  # cumulative, +Inf last
+    assert f"workplace_latency_seconds_count{{{op}}} 1" in text
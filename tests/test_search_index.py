@@ -0,0 +1,49 @@
+import Budget_user
+from SearchIndex import TrigramIndex, item_path
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_compact_renumbers_surviving_entries():
+    index = TrigramIndex()
+    items = [Item(f"report {n}") for n in range(10)]
+    for item in items:
+        index.add("file", item, item.name)
+    for item in items[::2]:
+        index.remove(item)
+    index.compact()
+
+    survivors = items[1::2]
+    assert len(index._items) == len(index._texts) == len(index._folded) == len(index._kinds) == 5
+    assert len(index._gram_counts) == 5
+    assert max(max(posting) for posting in index._postings.values()) == 4
+    assert [result.item for result in index.search("report", limit=10)] == survivors
+    assert [result.item for result in index.search("report 7")] == [items[7]]
+    assert items[0] not in index and items[1] in index
+
+    # Entries added after compaction get fresh ids past the survivors
+    late = Item("late report")
+    index.add("file", late, late.name)
+    assert index.search("late")[0].item is late
+    assert index.remove(items[3]) and not index.search("report 3")
+
+
+def test_budget_user_tree_feeds_the_index():
+    tree = Budget_user.BudgetTree()
+    tree.search_index = TrigramIndex()
+    tree.add_category("Company Budget", "Food")
+    tree.add_category("Food", "Groceries")
+    result = tree.search_index.query("grocer")[0]
+    assert item_path(result.item, lambda node: node.category) == "Company Budget/Food/Groceries"
+
+
+def test_short_queries_only_find_names_that_short():
+    index = TrigramIndex()
+    for name in ("HR", "hr-reports", "Chroma", "IT"):
+        index.add("folder", Item(name), name)
+    assert [result.text for result in index.search("hr")] == ["HR"]
+    assert [result.text for result in index.query("h")] == []
+    assert [result.text for result in index.search("hr-")] == ["hr-reports"]
@@ -0,0 +1,65 @@
+import time
+
+from TkWorker import BackgroundWorker, RefreshScheduler
+
+
+class FakeRoot:
+    """Stands in for tk.Tk: after() callbacks run when run_pending() is called."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.next_id = 0
+        self.reported = []
+
+    def after(self, ms, fn):
+        self.next_id += 1
+        self.scheduled[self.next_id] = fn
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+    def run_pending(self):
+        scheduled, self.scheduled = self.scheduled, {}
+        for fn in scheduled.values():
+            fn()
+
+    def report_callback_exception(self, exc_type, value, tb):
+        self.reported.append(value)
+
+
+def _drain(root, worker, until):
+    deadline = time.monotonic() + 5
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.005)
+        root.run_pending()
+
+
+def test_failing_callback_does_not_stop_later_results():
+    root = FakeRoot()
+    worker = BackgroundWorker(root)
+    results = []
+
+    def fail(value):
+        raise RuntimeError("boom")
+
+    worker.submit(lambda: 1, on_done=fail)
+    worker.submit(lambda: 2, on_done=results.append)
+    _drain(root, worker, lambda: results)
+    worker.submit(lambda: 3, on_done=results.append)
+    _drain(root, worker, lambda: len(results) == 2)
+    worker.shutdown()
+    assert results == [2, 3]
+    assert [str(e) for e in root.reported] == ["boom"]
+
+
+def test_failing_refresh_does_not_drop_the_rest_of_the_batch():
+    root = FakeRoot()
+    scheduler = RefreshScheduler(root)
+    ran = []
+    scheduler.schedule("a", lambda: 1 / 0)
+    scheduler.schedule("b", lambda: ran.append("b"))
+    scheduler.schedule("b", lambda: ran.append("b2"))
+    root.run_pending()
+    assert ran == ["b2"]
+    assert isinstance(root.reported[0], ZeroDivisionError)
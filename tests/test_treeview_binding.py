@@ -0,0 +1,232 @@
+from TreeviewBinding import TreeviewBinding
+
+
+class FakeTreeview:
+    """Just enough of ttk.Treeview for TreeviewBinding."""
+
+    def __init__(self):
+        self.rows = {"": {"text": "", "children": [], "parent": None, "open": False}}
+        self.next_id = 0
+        self.focused = ""
+        self.selected = ()
+
+    def bind(self, event, fn):
+        pass
+
+    def insert(self, parent, index, text="", open=False):
+        self.next_id += 1
+        item_id = f"I{self.next_id}"
+        self.rows[item_id] = {"text": text, "children": [], "parent": parent, "open": open}
+        siblings = self.rows[parent]["children"]
+        siblings.insert(len(siblings) if index == "end" else index, item_id)
+        return item_id
+
+    def delete(self, *item_ids):
+        for item_id in item_ids:
+            row = self.rows.pop(item_id)
+            self.rows[row["parent"]]["children"].remove(item_id)
+            for child in list(row["children"]):
+                self.delete(child)
+
+    def item(self, item_id, option=None, **changes):
+        if option is not None:
+            return self.rows[item_id][option]
+        self.rows[item_id].update(changes)
+
+    def get_children(self, item_id=""):
+        return tuple(self.rows[item_id]["children"])
+
+    def parent(self, item_id):
+        return self.rows[item_id]["parent"]
+
+    def focus(self):
+        return self.focused
+
+    def selection(self):
+        return self.selected
+
+    def texts(self, item_id):
+        return [self.rows[child]["text"] for child in self.get_children(item_id)]
+
+
+class Node:
+    def __init__(self, name, *children):
+        self.name = name
+        self.children = list(children)
+
+
+def _binding(root, page_size=200):
+    view = FakeTreeview()
+    binding = TreeviewBinding(view, lambda node: node.children, lambda node: node.name, lazy=True,
+                              page_size=page_size)
+    binding.rebuild([root])
+    return view, binding
+
+
+def _open(view, binding, node):
+    view.focused = binding.item_id(node)
+    binding._on_open()
+
+
+def test_deferred_insert_after_open_does_not_duplicate():
+    food = Node("Food", Node("X"))
+    root = Node("Company", food)
+    view, binding = _binding(root)
+    _open(view, binding, root)
+
+    groceries = Node("G")
+    food.children.append(groceries)       # model changed on the worker thread
+    _open(view, binding, food)            # user opens Food before the insert is drawn
+    binding.insert(groceries, food)       # deferred insert arrives
+    assert view.texts(binding.item_id(food)) == ["X", "G"]
+
+
+def test_paging_and_insert_into_paged_parent():
+    big = Node("Big", *[Node(f"n{i}") for i in range(5)])
+    view, binding = _binding(big, page_size=2)
+    _open(view, binding, big)
+    assert view.texts(binding.item_id(big)) == ["n0", "n1", "... 3 more"]
+
+    big.children.append(Node("n5"))
+    binding.insert(big.children[-1], big)
+    assert view.texts(binding.item_id(big))[-1] == "... 4 more"
+
+    more_row = view.get_children(binding.item_id(big))[-1]
+    view.selected = (more_row,)
+    binding._on_select()
+    assert view.texts(binding.item_id(big)) == ["n0", "n1", "n2", "n3", "... 2 more"]
+
+
+def test_pages_are_sliced_without_copying_the_child_list():
+    class CountingList(list):
+        copies = 0
+
+        def __iter__(self):
+            CountingList.copies += 1
+            return super().__iter__()
+
+    big = Node("Big")
+    big.children = CountingList(Node(f"n{i}") for i in range(1000))
+    view, binding = _binding(big, page_size=10)
+    _open(view, binding, big)
+    more_row = view.get_children(binding.item_id(big))[-1]
+    view.selected = (more_row,)
+    binding._on_select()
+    assert CountingList.copies == 0
+    assert len(view.get_children(binding.item_id(big))) == 21
+
+
+def test_concat_sequence_slices_across_parts():
+    from TreeviewBinding import ConcatSequence
+
+    view = ConcatSequence([0, 1, 2], (), [3, 4])
+    assert len(view) == 5
+    assert list(view) == [0, 1, 2, 3, 4]
+    assert view[1:4] == [1, 2, 3]
+    assert view[3:] == [3, 4]
+    assert view[-1] == 4 and view[2] == 2
+    assert view[::2] == [0, 2, 4]
+
+
+def test_insert_inside_the_loaded_page_keeps_paging_aligned():
+    folder = Node("Docs", *[Node(f"f{i}") for i in range(5)])
+    view, binding = _binding(folder, page_size=3)
+    _open(view, binding, folder)
+    assert view.texts(binding.item_id(folder)) == ["f0", "f1", "f2", "... 2 more"]
+
+    folder.children.insert(0, Node("d0"))  # a new subfolder sorts before the files
+    binding.insert(folder.children[0], folder, 0)
+    assert view.texts(binding.item_id(folder)) == ["d0", "f0", "f1", "f2", "... 2 more"]
+
+    view.selected = (view.get_children(binding.item_id(folder))[-1],)
+    binding._on_select()
+    assert view.texts(binding.item_id(folder)) == ["d0", "f0", "f1", "f2", "f3", "f4"]
+
+
+def test_delete_and_move_keep_the_more_row_counts():
+    docs = Node("Docs", *[Node(f"f{i}") for i in range(5)])
+    other = Node("Other")
+    root = Node("Root", docs, other)
+    view, binding = _binding(root, page_size=2)
+    _open(view, binding, docs)
+
+    # f4 was never loaded: the model changes off screen and only the count is refreshed
+    moved = docs.children.pop()
+    other.children.append(moved)
+    assert not binding.delete(moved)
+    assert binding.refresh_more(docs)
+    assert view.texts(binding.item_id(docs)) == ["f0", "f1", "... 2 more"]
+
+    # f0 is loaded: it leaves the page, and the next page still starts at f2
+    moved = docs.children.pop(0)
+    other.children.append(moved)
+    assert binding.move(moved, other)
+    assert view.texts(binding.item_id(docs)) == ["f1", "... 2 more"]
+    view.selected = (view.get_children(binding.item_id(docs))[-1],)
+    binding._on_select()
+    assert view.texts(binding.item_id(docs)) == ["f1", "f2", "f3"]
+
+    assert not binding.move(docs.children[0], Node("not shown"))
+
+
+def _eager_binding(*roots):
+    view = FakeTreeview()
+    binding = TreeviewBinding(view, lambda node: node.children, lambda node: node.name)
+    binding.rebuild(roots)
+    return view, binding
+
+
+def test_incremental_updates_touch_only_changed_rows():
+    food = Node("Food", Node("Groceries"))
+    root = Node("Company", food)
+    view, binding = _eager_binding(root)
+    food_item = binding.item_id(food)
+
+    travel = Node("Travel")
+    root.children.append(travel)
+    binding.insert(travel, root)
+    assert view.texts(binding.item_id(root)) == ["Food", "Travel"]
+    assert binding.item_id(food) == food_item  # existing rows are kept
+
+    food.name = "Food (over)"
+    assert binding.update(food) and not binding.update(food)
+    assert view.item(food_item, "text") == "Food (over)"
+
+    groceries = food.children[0]
+    assert binding.delete(groceries) and groceries not in binding
+    assert view.texts(food_item) == [] and not binding.delete(groceries)
+
+
+def test_sync_children_diffs_against_the_model():
+    a, b, c = Node("a"), Node("b"), Node("c")
+    root = Node("root", a, b)
+    view, binding = _eager_binding(root)
+    a_item = binding.item_id(a)
+
+    root.children = [a, c]
+    binding.sync_children(root)
+    assert view.texts(binding.item_id(root)) == ["a", "c"]
+    assert binding.item_id(a) == a_item and b not in binding
+
+
+def test_moving_an_unloaded_node_recounts_the_old_parent():
+    from management_system3 import FileManager
+
+    manager = FileManager()
+    for n in range(5):
+        manager.add_node("root", f"f{n}")
+    manager.add_node("root", "archive")
+    view = FakeTreeview()
+    binding = TreeviewBinding(view, lambda node: node.children, lambda node: node.name, open_items=False,
+                              lazy=True, page_size=3)
+    binding.rebuild(manager.roots.values())
+    root = manager.find("root")
+    _open(view, binding, root)
+    assert view.texts(binding.item_id(root)) == ["f0", "f1", "f2", "... 3 more"]
+
+    # What ManagementApp.on_file_node_moved does once the worker has moved f4 into archive
+    node = manager.reparent("f4", "archive")
+    binding.delete(node)
+    binding.refresh_more(root)
+    binding.insert(node, node.parent)
+    assert view.texts(binding.item_id(root)) == ["f0", "f1", "f2", "... 2 more"]
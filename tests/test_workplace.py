@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import workplace
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_models_import_without_tkinter():
+    code = ("import sys, workplace\n"
+            "for name in workplace.__all__:\n"
+            "    getattr(workplace, name)\n"
+            "print('tkinter' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_headless_modules_fit_the_import_budget(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the measurement must not depend on the caller's directory
+    # Best of three, so one slow start on a busy machine does not fail the check
+    runs = [workplace.measure_import_time() for _ in range(3)]
+    total, per_module, gui_loaded = min(runs, key=lambda run: run[0])
+    assert sorted(per_module) == sorted(workplace.HEADLESS_MODULES)
+    assert not gui_loaded
+    assert total <= workplace.DEFAULT_IMPORT_BUDGET_MS, per_module
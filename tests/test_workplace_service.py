@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from WorkplaceService import MAX_LINE_BYTES, WorkplaceService
+
+
+async def _exchange(service, lines, expected):
+    server = await service.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=MAX_LINE_BYTES)
+        for line in lines:
+            writer.write(line)
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(expected)]
+        writer.close()
+    return responses
+
+
+def _request(request_id, op, **args):
+    return (json.dumps({"id": request_id, "op": op, "args": args}) + "\n").encode()
+
+
+def test_large_batch_is_answered():
+    batch = [{"op": "budget.add_category", "args": {"category": f"Dept{i}", "limit": 1000}} for i in range(1000)]
+    line = (json.dumps({"id": 1, "batch": batch}) + "\n").encode()
+    assert len(line) > 64 * 1024
+    [response] = asyncio.run(_exchange(WorkplaceService(), [line], 1))
+    assert response["ok"] and len(response["result"]) == 1000
+
+
+def test_bad_lines_get_errors_and_keep_the_connection():
+    lines = [b"\xff\xfe not utf-8\n", b"{not json\n", b"x" * 5000 + b"\n", _request(4, "tasks.count")]
+    responses = asyncio.run(_exchange(WorkplaceService(max_line_bytes=1024), lines, 4))
+    errors = [r["error"] for r in responses if r["id"] is None]
+    assert errors[:2] == ["Invalid JSON.", "Invalid JSON."]
+    assert "longer than 1024 bytes" in errors[2]
+    assert responses[-1] == {"id": 4, "ok": True, "result": 0}
+
+
+def test_non_object_args_fail_only_their_operation():
+    batch = [{"op": "tasks.add", "args": "oops"}, {"op": "tasks.add", "args": {"data": "ok"}},
+             {"op": "tasks.count", "args": [1]}]
+    lines = [(json.dumps({"id": 1, "batch": batch}) + "\n").encode(), _request(2, "tasks.add", data="x")]
+    first, second = asyncio.run(_exchange(WorkplaceService(), lines, 2))
+    results = first["result"]
+    assert first["ok"] and [r["ok"] for r in results] == [False, True, False]
+    assert "args must be a JSON object" in results[0]["error"]
+    assert second == {"id": 2, "ok": True, "result": 1}
+
+
+def test_negative_task_indexes_are_rejected():
+    lines = [_request(1, "tasks.add", data="a"), _request(2, "tasks.add", data="b"),
+             _request(3, "tasks.connect", task=0, depends_on=-1)]
+    responses = asyncio.run(_exchange(WorkplaceService(), lines, 3))
+    assert responses[2] == {"id": 3, "ok": False, "error": "Unknown task index."}
+
+
+def test_connection_ends_when_the_client_stops_reading():
+    class BrokenWriter:
+        def write(self, data):
+            raise ConnectionResetError("client gone")
+
+        async def drain(self):
+            pass
+
+        def close(self):
+            pass
+
+    async def run():
+        reader = asyncio.StreamReader()
+        for i in range(20):
+            reader.feed_data(_request(i, "tasks.count"))
+        handler = asyncio.create_task(WorkplaceService(max_inflight=2).handle_connection(reader, BrokenWriter()))
+        done, _pending = await asyncio.wait({handler}, timeout=5)
+        handler.cancel()
+        return handler in done
+
+    assert asyncio.run(run())
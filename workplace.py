@@ -0,0 +1,112 @@
+"""Headless entry point to the workplace models.
+
+Batch jobs and services import the models from here:
+
+    from workplace import BudgetTree, FileManager, TaskDatabase
+
+Each name is imported from its module on first access and nothing here loads
+tkinter, so startup stays fast and no display is needed. Run `python -m
+workplace` to start the GUI, or `python -m workplace importtime` to check the
+import-time budget.
+"""
+import importlib
+import os
+import subprocess
+import sys
+
+# Public model name -> module that defines it
+_EXPORTS = {
+    "BudgetTree": "man_system_test",
+    "BudgetNode": "man_system_test",
+    "Task": "man_system_test",
+    "TaskGraph": "man_system_test",
+    "FileManager": "FileSystem",
+    "FolderNode": "FileSystem",
+    "FileNode": "FileSystem",
+    "TaskDatabase": "TaskSystem",
+    "TaskNode": "TaskSystem",
+    "BudgetLedger": "BudgetSnapshot",
+    "BudgetSnapshot": "BudgetSnapshot",
+    "BudgetScenario": "BudgetScenario",
+    "BudgetStore": "BudgetStore",
+}
+
+# Modules a headless job typically needs, and what they may cost to import
+HEADLESS_MODULES = ["man_system_test", "FileSystem", "TaskSystem", "Budget_user", "management_system3"]
+DEFAULT_IMPORT_BUDGET_MS = 50.0
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'workplace' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
+
+
+def measure_import_time(modules=None):
+    """Import the modules in a fresh interpreter and return (total_ms, per_module_ms, gui_loaded).
+
+    Uses `python -X importtime`, so the numbers are the interpreter's own
+    cumulative import timings and exclude interpreter startup.
+    """
+    modules = modules or HEADLESS_MODULES
+    code = "import sys\n" + "".join(f"import {m}\n" for m in modules) + "print('tkinter' in sys.modules)"
+    # Run next to this file, so the modules are found whatever the caller's directory
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    per_module = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].startswith("import time:"):
+            continue
+        name = parts[2].rstrip()
+        if name.strip() in modules:
+            per_module[name.strip()] = int(parts[1]) / 1000
+            # A module first imported by another one is already inside that one's cumulative time
+            if not name.startswith("  "):
+                total += per_module[name.strip()]
+    gui_loaded = result.stdout.strip() == "True"
+    return total, per_module, gui_loaded
+
+
+def check_import_budget(budget_ms=DEFAULT_IMPORT_BUDGET_MS, modules=None) -> bool:
+    total, per_module, gui_loaded = measure_import_time(modules)
+    for name, ms in per_module.items():
+        print(f"{name:24} {ms:8.2f} ms")
+    print(f"{'total':24} {total:8.2f} ms (budget {budget_ms} ms)")
+    if gui_loaded:
+        print("tkinter was imported by the headless modules.")
+    return total <= budget_ms and not gui_loaded
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "gui"
+    if command == "gui":
+        importlib.import_module("man_system_test").run_application()
+    elif command == "gui3":
+        importlib.import_module("management_system3").main()
+    elif command == "budget":
+        importlib.import_module("Budget_user").main()
+    elif command == "importtime":
+        budget_ms = float(argv[1]) if len(argv) > 1 else DEFAULT_IMPORT_BUDGET_MS
+        return 0 if check_import_budget(budget_ms) else 1
+    else:
+        print("usage: python -m workplace [gui | gui3 | budget | importtime [budget_ms]]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())